@@ -1,6 +1,12 @@
 # auth/__init__.py
 from app.auth.jwt import create_access_token, verify_token, decode_token
-from app.auth.password import verify_password, get_password_hash, create_password_hash
+from app.auth.password import (
+    verify_password,
+    get_password_hash,
+    create_password_hash,
+    verify_password_async,
+    get_password_hash_async,
+)
 
 __all__ = [
     "create_access_token",
@@ -9,4 +15,6 @@ __all__ = [
     "verify_password",
     "get_password_hash",
     "create_password_hash",
+    "verify_password_async",
+    "get_password_hash_async",
 ]
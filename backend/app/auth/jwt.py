@@ -4,10 +4,12 @@ from dataclasses import dataclass
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.config import settings
-from app.database import get_db
+from app.database import get_session
 from app.models.user import User
+from app.auth.user_cache import auth_cache
 
 
 @dataclass
@@ -73,9 +75,39 @@ def decode_token(token: str) -> dict:
         return {}
 
 
+def _resolve_user_id(token: str, credentials_exception: HTTPException) -> int:
+    """令牌对应的用户 id，已验证过的令牌直接读取缓存"""
+    user_id = auth_cache.get_token_user_id(token)
+    if user_id is not None:
+        return user_id
+    try:
+        payload = jwt.decode(
+            token,
+            settings.SECRET_KEY,
+            algorithms=[settings.ALGORITHM]
+        )
+        user_id = int(payload.get("sub"))
+    except (JWTError, TypeError, ValueError):
+        raise credentials_exception
+    auth_cache.set_token_user_id(token, user_id, payload.get("exp"))
+    return user_id
+
+
+def _load_user(db: Session, user_id: int) -> Optional[User]:
+    """读取用户，活跃用户优先使用缓存快照"""
+    user = auth_cache.get_user(db, user_id)
+    if user is None:
+        # 先取失效代次再查询，查询期间有提交时不写回可能过期的快照
+        generation = auth_cache.user_generation(user_id)
+        user = db.query(User).filter(User.id == user_id).first()
+        if user is not None:
+            auth_cache.set_user(user, generation)
+    return user
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ) -> User:
     """获取当前登录用户"""
     credentials_exception = HTTPException(
@@ -84,8 +116,8 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    token_data = verify_token(token, credentials_exception)
-    user = db.query(User).filter(User.id == token_data.user_id).first()
+    user_id = _resolve_user_id(token, credentials_exception)
+    user = await db.run_sync(_load_user, user_id)
     
     if user is None:
         raise credentials_exception
@@ -99,7 +131,7 @@ async def get_current_user(
 
 async def get_current_user_optional(
     token: str = Depends(oauth2_scheme_optional),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ) -> Optional[User]:
     """获取当前登录用户（可选）"""
     if token is None:
@@ -112,8 +144,8 @@ async def get_current_user_optional(
             headers={"WWW-Authenticate": "Bearer"},
         )
         
-        token_data = verify_token(token, credentials_exception)
-        user = db.query(User).filter(User.id == token_data.user_id).first()
+        user_id = _resolve_user_id(token, credentials_exception)
+        user = await db.run_sync(_load_user, user_id)
         
         if user is None:
             return None
@@ -1,4 +1,11 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import bcrypt
+from fastapi import HTTPException, status
+
+from app.config import settings
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -10,8 +17,8 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 
 def get_password_hash(password: str) -> str:
-    """获取密码哈希"""
-    salt = bcrypt.gensalt()
+    """获取密码哈希（成本因子见 BCRYPT_ROUNDS）"""
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
@@ -20,3 +27,60 @@ def get_password_hash(password: str) -> str:
 def create_password_hash(password: str) -> str:
     """创建密码哈希"""
     return get_password_hash(password)
+
+
+class PasswordHasher:
+    """在有界线程池中执行 bcrypt
+
+    一次 bcrypt 计算耗时百毫秒级，直接在 async 接口中调用会阻塞整个事件循环；
+    bcrypt 计算期间释放 GIL，放入线程池即可与其他请求并行。
+    排队（含执行中）的任务超过 max_pending 时返回 503，避免登录洪峰无限堆积。
+    workers 为 0 时在调用线程中直接计算。
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = (
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt") if workers > 0 else None
+        )
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def run(self, func, *args):
+        if self._executor is None:
+            return func(*args)
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="服务繁忙，请稍后重试",
+                    headers={"Retry-After": "1"}
+                )
+            self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING
+)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """在线程池中验证密码，不阻塞事件循环"""
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """在线程池中计算密码哈希，不阻塞事件循环"""
+    return await password_hasher.run(get_password_hash, password)
@@ -0,0 +1,150 @@
+import hashlib
+import time
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.cache_backend import CacheBackend, MemoryLRUCache
+from app.config import settings
+from app.models.user import User
+from app.models.data_version import CHANGED_USERS_KEY
+
+
+# 快照中保存的用户字段（不含密码哈希，未缓存的字段访问时按需加载）。
+# data_version 决定结果缓存键和 ETag，而其他进程的写入不会使本进程的快照失效，因此不缓存，每次单独读取
+SNAPSHOT_FIELDS = ("id", "username", "email", "is_active", "is_verified", "created_at", "updated_at")
+_DATETIME_FIELDS = ("created_at", "updated_at")
+
+
+class AuthCache:
+    """get_current_user 的缓存
+
+    - 已验证令牌：按令牌哈希缓存其中的用户 id，有效期不超过令牌自身的过期时间，省去重复的签名校验；
+    - 活跃用户快照：按用户 id 缓存用户资料，每个请求只按主键读取 data_version 一列。
+    用户资料或启用状态变化时，事务提交后删除对应快照（见下方会话钩子），
+    其他进程的并发读取最多在 ttl 内看到旧资料；data_version 不在快照中，始终是最新值。
+
+    每次删除快照同时写入新的失效代次。读库前先取代次，写回快照时代次已变说明读取期间
+    有提交（异步会话查询时会让出事件循环），读到的可能是旧数据，不写回。
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: int, enabled: bool = True):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+
+    @staticmethod
+    def _token_key(token: str) -> str:
+        return "auth:token:" + hashlib.sha256(token.encode()).hexdigest()
+
+    @staticmethod
+    def _user_key(user_id: int) -> str:
+        return f"auth:user:{user_id}"
+
+    @staticmethod
+    def _generation_key(user_id: int) -> str:
+        return f"auth:generation:{user_id}"
+
+    def user_generation(self, user_id: int) -> Optional[str]:
+        """用户快照的失效代次，读库前取得，传给 set_user"""
+        if not self.enabled:
+            return None
+        return self.backend.get(self._generation_key(user_id))
+
+    def get_token_user_id(self, token: str) -> Optional[int]:
+        if not self.enabled:
+            return None
+        return self.backend.get(self._token_key(token))
+
+    def set_token_user_id(self, token: str, user_id: int, expires_at: Optional[float] = None) -> None:
+        if not self.enabled:
+            return
+        ttl = self.ttl
+        if expires_at is not None:
+            ttl = min(ttl, int(expires_at - time.time()))
+        if ttl > 0:
+            self.backend.set(self._token_key(token), user_id, ttl)
+
+    def get_user(self, db: Session, user_id: int) -> Optional[User]:
+        """由快照和当前的 data_version 得到绑定到 db 的用户对象，未命中返回 None"""
+        if not self.enabled:
+            return None
+        snapshot = self.backend.get(self._user_key(user_id))
+        if snapshot is None:
+            return None
+
+        existing = db.identity_map.get(db.identity_key(User, user_id))
+        if existing is not None:
+            return existing
+
+        data_version = db.scalar(select(User.data_version).where(User.id == user_id))
+        if data_version is None:
+            # 用户已被删除
+            return None
+
+        values = dict(snapshot, data_version=data_version)
+        for field in _DATETIME_FIELDS:
+            if values.get(field) is not None:
+                values[field] = datetime.fromisoformat(values[field])
+        user = User(**values)
+        make_transient_to_detached(user)
+        db.add(user)
+        return user
+
+    def set_user(self, user: User, generation: Optional[str]) -> None:
+        """缓存活跃用户的快照；generation 为读库前的失效代次，已变化时放弃写入"""
+        if not self.enabled or not user.is_active:
+            return
+        if self.backend.get(self._generation_key(user.id)) != generation:
+            return
+        snapshot = {field: getattr(user, field) for field in SNAPSHOT_FIELDS}
+        for field in _DATETIME_FIELDS:
+            if snapshot[field] is not None:
+                snapshot[field] = snapshot[field].isoformat()
+        self.backend.set(self._user_key(user.id), snapshot, self.ttl)
+
+    def invalidate(self, user_ids) -> None:
+        for user_id in user_ids:
+            # 代次需比并发读取存活更久，取快照 ttl 的两倍
+            self.backend.set(self._generation_key(user_id), uuid.uuid4().hex, self.ttl * 2)
+            self.backend.delete(self._user_key(user_id))
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+auth_cache = AuthCache(
+    MemoryLRUCache(max_entries=settings.AUTH_CACHE_MAX_ENTRIES),
+    ttl=settings.AUTH_CACHE_TTL_SECONDS,
+    enabled=settings.AUTH_CACHE_ENABLED
+)
+
+
+def set_auth_cache_backend(backend: CacheBackend) -> None:
+    """替换认证缓存后端（例如在启动时接入共享存储）"""
+    auth_cache.backend = backend
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    """记录本事务中新增、修改、删除的用户（资料或启用状态变化）"""
+    user_ids = {
+        obj.id for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        if isinstance(obj, User)
+    }
+    if user_ids:
+        session.info.setdefault(CHANGED_USERS_KEY, set()).update(user_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    """事务提交后删除变化用户的快照"""
+    auth_cache.invalidate(session.info.pop(CHANGED_USERS_KEY, ()))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session):
+    session.info.pop(CHANGED_USERS_KEY, None)
@@ -0,0 +1,76 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.budget_usage import PENDING_ALERTS_KEY
+
+
+class BudgetAlertBroker:
+    """预算提醒的发布订阅
+
+    记录写入使预算越过阈值时在写入路径中生成提醒（见 app.models.budget_usage），
+    事务提交后发布给该用户的订阅者（SSE 连接），客户端不再需要轮询 /budgets/alerts。
+    默认只在进程内分发；多实例部署时可替换 budget_alert_broker 接入共享消息通道（如 Redis Pub/Sub）。
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)  # user_id -> {(事件循环, 队列)}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        """在当前事件循环中订阅用户的提醒"""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers[user_id].add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if not subscribers:
+                return
+            subscribers.difference_update({s for s in subscribers if s[1] is queue})
+            if not subscribers:
+                del self._subscribers[user_id]
+
+    def subscriber_count(self, user_id: int) -> int:
+        with self._lock:
+            return len(self._subscribers.get(user_id, ()))
+
+    def publish(self, user_id: int, alert: dict) -> None:
+        """发布提醒，可在任意线程调用；订阅者队列已满时丢弃"""
+        with self._lock:
+            targets = list(self._subscribers.get(user_id, ()))
+        for loop, queue in targets:
+            try:
+                loop.call_soon_threadsafe(_put_nowait, queue, alert)
+            except RuntimeError:
+                # 订阅者的事件循环已关闭
+                pass
+
+
+def _put_nowait(queue: asyncio.Queue, alert: dict) -> None:
+    try:
+        queue.put_nowait(alert)
+    except asyncio.QueueFull:
+        pass
+
+
+budget_alert_broker = BudgetAlertBroker()
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending_alerts(session):
+    """事务提交后发布写入路径中产生的提醒"""
+    for alert in session.info.pop(PENDING_ALERTS_KEY, []):
+        budget_alert_broker.publish(alert["user_id"], alert)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_alerts(session):
+    """事务回滚时丢弃未发布的提醒"""
+    session.info.pop(PENDING_ALERTS_KEY, None)
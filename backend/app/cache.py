@@ -0,0 +1,162 @@
+import json
+from datetime import date
+from functools import wraps
+from typing import Any, Optional
+
+from fastapi import Depends, Request, Response
+from sqlalchemy import func, select
+
+from app.cache_backend import CacheBackend, MemoryLRUCache
+from app.config import settings
+from app.models.user import User
+from app.auth.jwt import get_current_user
+
+
+class ResultCache:
+    """按 用户 + 数据版本 + 接口 + 参数 缓存接口结果
+
+    键中包含用户的数据版本号，任何写入都会递增版本，旧结果自然失效，
+    不需要逐条删除。
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: int, enabled: bool = True):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(user_id: int, data_version: int, endpoint: str, params: dict) -> str:
+        return "result:{}:{}:{}:{}".format(
+            user_id,
+            data_version or 0,
+            endpoint,
+            json.dumps(params, sort_keys=True, default=str)
+        )
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self.backend.set(key, value, self.ttl)
+
+    def clear(self) -> None:
+        self.backend.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+result_cache = ResultCache(
+    MemoryLRUCache(max_entries=settings.RESULT_CACHE_MAX_ENTRIES),
+    ttl=settings.RESULT_CACHE_TTL_SECONDS,
+    enabled=settings.RESULT_CACHE_ENABLED
+)
+
+
+def set_cache_backend(backend: CacheBackend) -> None:
+    """替换结果缓存后端（例如在启动时接入共享存储）"""
+    result_cache.backend = backend
+
+
+def cached_result(endpoint: str):
+    """缓存接口返回值的装饰器
+
+    被装饰的接口需要以关键字参数接收 current_user 和 db，其余参数作为缓存键的一部分。
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            if not result_cache.enabled:
+                return await func(*args, **kwargs)
+
+            current_user = kwargs["current_user"]
+            params = {k: v for k, v in kwargs.items() if k not in ("current_user", "db")}
+            key = result_cache.make_key(
+                current_user.id, current_user.data_version, endpoint, params
+            )
+
+            value = result_cache.get(key)
+            if value is None:
+                value = await func(*args, **kwargs)
+                result_cache.set(key, value)
+            return value
+        return wrapper
+    return decorator
+
+
+async def cached_count(db, statement, current_user: User, endpoint: str, params: dict) -> int:
+    """带缓存的 COUNT，键含用户数据版本，写入后自动失效"""
+    count_statement = select(func.count()).select_from(statement.order_by(None).subquery())
+    if not result_cache.enabled:
+        return await db.scalar(count_statement)
+
+    key = result_cache.make_key(current_user.id, current_user.data_version, endpoint, params)
+    total = result_cache.get(key)
+    if total is None:
+        total = await db.scalar(count_statement)
+        result_cache.set(key, total)
+    return total
+
+
+class NotModified(Exception):
+    """客户端缓存仍然有效，由 main 中的异常处理返回 304"""
+
+    def __init__(self, etag: str):
+        self.etag = etag
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """弱比较 If-None-Match 与当前 ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def data_version_etag(vary_by_day: bool = False):
+    """按用户数据版本生成弱 ETag 的依赖
+
+    If-None-Match 命中时在执行接口前抛出 NotModified，不查询业务表也不做序列化；
+    vary_by_day 用于默认时间段依赖当天日期的接口（如概览默认本月）。
+    """
+    def dependency(
+        request: Request,
+        response: Response,
+        current_user: User = Depends(get_current_user)
+    ) -> str:
+        tag = f"{current_user.id}-{current_user.data_version or 0}"
+        if vary_by_day:
+            tag = f"{tag}-{date.today().isoformat()}"
+        etag = f'W/"{tag}"'
+
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            raise NotModified(etag)
+
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "private, no-cache"
+        return etag
+    return dependency
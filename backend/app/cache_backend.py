@@ -0,0 +1,67 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class CacheBackend:
+    """缓存后端接口（结果缓存与认证用户缓存共用）
+
+    默认使用进程内 LRU；多实例部署时可实现本接口接入共享存储（如 Redis），
+    值均为可 JSON 序列化的字典或列表。
+    """
+
+    def get(self, key: str) -> Optional[Any]:
+        """读取缓存，未命中或已过期返回 None"""
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        """写入缓存，ttl 为秒数"""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        """删除缓存，不存在时忽略"""
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        """清空缓存"""
+        raise NotImplementedError
+
+
+class MemoryLRUCache(CacheBackend):
+    """进程内 LRU 缓存（带 TTL）"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
@@ -19,6 +19,22 @@ class Settings(BaseSettings):
     def DATABASE_URL(self) -> str:
         return f"mysql+pymysql://{self.MYSQL_USER}:{self.MYSQL_PASSWORD}@{self.MYSQL_HOST}:{self.MYSQL_PORT}/{self.MYSQL_DATABASE}"
     
+    # 连接池（每个 uvicorn worker 进程各自一个池，连接总数 = worker 数 x (POOL_SIZE + MAX_OVERFLOW)）
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30  # 等待空闲连接的秒数，超时抛出异常
+    DB_POOL_RECYCLE: int = 3600  # 连接最长使用秒数，应小于 MySQL wait_timeout
+    DB_POOL_PRE_PING: str = "idle"  # always: 每次取出都探活；idle: 仅空闲较久的连接；never: 不探活
+    DB_POOL_PRE_PING_IDLE_SECONDS: int = 60
+    
+    # 接口使用原生异步会话（AsyncSession），查询不阻塞事件循环；关闭时沿用同步会话
+    DB_ASYNC: bool = False
+    ASYNC_MYSQL_DRIVER: str = "aiomysql"  # aiomysql 或 asyncmy
+    
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        return f"mysql+{self.ASYNC_MYSQL_DRIVER}://{self.MYSQL_USER}:{self.MYSQL_PASSWORD}@{self.MYSQL_HOST}:{self.MYSQL_PORT}/{self.MYSQL_DATABASE}"
+    
     # JWT
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
@@ -26,6 +42,27 @@ class Settings(BaseSettings):
     
     # Password
     PASSWORD_HASH_ALGORITHM: str = "bcrypt"
+    BCRYPT_ROUNDS: int = 12  # 新哈希的成本因子，已有哈希按其自身成本校验
+    PASSWORD_HASH_WORKERS: int = 2  # bcrypt 线程数，0 表示在事件循环中直接计算
+    PASSWORD_HASH_MAX_PENDING: int = 32  # 排队上限，超出时登录/注册返回 503
+    
+    # Result cache（统计等接口结果缓存）
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_TTL_SECONDS: int = 300
+    RESULT_CACHE_MAX_ENTRIES: int = 1024
+    
+    # 请求计时（Server-Timing 响应头和请求日志中的 SQL 语句数、数据库耗时）
+    REQUEST_TIMING_ENABLED: bool = True
+    SLOW_REQUEST_MS: int = 0  # 超过该耗时的请求记录警告日志并附带 SQL，0 表示关闭
+    SLOW_REQUEST_MAX_STATEMENTS: int = 50  # 慢请求日志最多附带的语句数
+    
+    # 运维接口（/api/v1/ops，缓存和连接池指标）的访问令牌，为空时关闭这些接口
+    OPS_TOKEN: str = ""
+    
+    # Auth cache（get_current_user 的令牌与用户快照缓存）
+    AUTH_CACHE_ENABLED: bool = True
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    AUTH_CACHE_MAX_ENTRIES: int = 4096
     
     class Config:
         env_file = ".env"
@@ -1,8 +1,10 @@
 import os
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 from sqlalchemy.pool import StaticPool
+from fastapi import Depends
 from app.config import settings
+from app.db_pool import configure_engine, pool_options
 
 # 测试引擎（SQLite 内存）
 test_engine = create_engine(
@@ -13,17 +15,25 @@ test_engine = create_engine(
 
 # 生产引擎（MySQL）
 if os.environ.get("TESTING") != "1":
-    engine = create_engine(
-        settings.DATABASE_URL,
-        pool_pre_ping=True,
-        pool_recycle=3600
-    )
+    engine = create_engine(settings.DATABASE_URL, **pool_options())
+    configure_engine(engine)
 else:
     # 测试时使用测试引擎
     engine = test_engine
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 异步引擎（DB_ASYNC=true 时由接口使用；迁移和离线脚本仍使用上面的同步引擎）
+async_engine = None
+AsyncSessionLocal = None
+if settings.DB_ASYNC and os.environ.get("TESTING") != "1":
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(settings.ASYNC_DATABASE_URL, **pool_options(is_async=True))
+    configure_engine(async_engine.sync_engine)
+    # 提交后不过期已加载的对象，避免序列化响应时在事件循环外隐式查询
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 
@@ -35,6 +45,95 @@ def get_db():
         db.close()
 
 
+class _StreamResult:
+    """同步 Result 的异步迭代包装，对应 AsyncSession.stream() 的返回值"""
+
+    def __init__(self, result):
+        self._result = result
+
+    async def partitions(self, size=None):
+        for partition in self._result.partitions(size):
+            yield partition
+
+
+class SyncSessionAdapter:
+    """以 AsyncSession 的接口包装同步 Session（DB_ASYNC=false 时使用）
+
+    接口统一写成 await db.execute(...) 等形式，同步模式下直接在当前线程执行，行为与原先的同步会话一致。
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    @property
+    def info(self) -> dict:
+        return self.sync_session.info
+
+    def get_bind(self):
+        return self.sync_session.get_bind()
+
+    def add(self, instance) -> None:
+        self.sync_session.add(instance)
+
+    def add_all(self, instances) -> None:
+        self.sync_session.add_all(instances)
+
+    async def execute(self, statement, params=None, **kwargs):
+        return self.sync_session.execute(statement, params, **kwargs)
+
+    async def scalar(self, statement, params=None, **kwargs):
+        return self.sync_session.scalar(statement, params, **kwargs)
+
+    async def scalars(self, statement, params=None, **kwargs):
+        return self.sync_session.scalars(statement, params, **kwargs)
+
+    async def stream(self, statement, params=None, **kwargs):
+        return _StreamResult(self.sync_session.execute(statement, params, **kwargs))
+
+    async def get(self, entity, ident, **kwargs):
+        return self.sync_session.get(entity, ident, **kwargs)
+
+    async def delete(self, instance) -> None:
+        self.sync_session.delete(instance)
+
+    async def flush(self, objects=None) -> None:
+        self.sync_session.flush(objects)
+
+    async def refresh(self, instance, attribute_names=None) -> None:
+        self.sync_session.refresh(instance, attribute_names)
+
+    async def commit(self) -> None:
+        self.sync_session.commit()
+
+    async def rollback(self) -> None:
+        self.sync_session.rollback()
+
+    async def close(self) -> None:
+        self.sync_session.close()
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return fn(self.sync_session, *args, **kwargs)
+
+
+async def get_sync_session(db: Session = Depends(get_db)):
+    """DB_ASYNC=false 时接口使用的会话：以 AsyncSession 接口包装 get_db 的同步会话"""
+    yield SyncSessionAdapter(db)
+
+
+async def get_async_session():
+    """DB_ASYNC=true 时接口使用的会话：原生 AsyncSession（aiomysql / asyncmy），查询期间让出事件循环
+
+    不依赖 get_db，请求不会再从同步连接池取出一个用不到的连接。
+    """
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+# 接口使用的数据库会话，导入时按 DB_ASYNC 选定。两种会话提供相同的 await 接口，
+# 复用同步会话的模型层函数（会话钩子、检索、日汇总等）通过 run_sync 调用
+get_session = get_async_session if AsyncSessionLocal is not None else get_sync_session
+
+
 def init_test_db():
     """初始化测试数据库"""
     Base.metadata.create_all(bind=test_engine)
@@ -0,0 +1,179 @@
+import os
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.config import settings
+
+# 获取连接等待时间的直方图桶上界（毫秒），最后一桶为无穷大
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+PRE_PING_STRATEGIES = ("always", "idle", "never")
+
+
+class PoolMetrics:
+    """连接池获取连接的计数和等待时间直方图（进程内，线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def observe(self, wait_ms: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total_ms += wait_ms
+            self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+            for index, bound in enumerate(WAIT_BUCKETS_MS):
+                if wait_ms <= bound:
+                    self.wait_buckets[index] += 1
+                    break
+            else:
+                self.wait_buckets[-1] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            count = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total_ms / count, 3) if count else 0.0,
+                "wait_max_ms": round(self.wait_max_ms, 3),
+                "wait_histogram": [
+                    {"le_ms": bound, "count": n}
+                    for bound, n in zip(WAIT_BUCKETS_MS + (None,), self.wait_buckets)
+                ]
+            }
+
+
+class _InstrumentedPoolMixin:
+    """在 _do_get 外计时：包含排队等待和新建连接的耗时，超时同样计入"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.observe((time.perf_counter() - start) * 1000, timed_out=True)
+            raise
+        self.metrics.observe((time.perf_counter() - start) * 1000)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() 会重建连接池，统计延续到新池
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_options(is_async: bool = False) -> dict:
+    """create_engine / create_async_engine 的连接池参数（来自 Settings）"""
+    if settings.DB_POOL_PRE_PING not in PRE_PING_STRATEGIES:
+        raise ValueError(f"DB_POOL_PRE_PING 必须是 {'/'.join(PRE_PING_STRATEGIES)} 之一")
+    return {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING == "always"
+    }
+
+
+def install_idle_ping(engine, idle_seconds: float) -> None:
+    """只对空闲超过 idle_seconds 的连接在取出时探活
+
+    pool_pre_ping 每次取出连接都多一次往返；连接刚归还时几乎不会失效，
+    因此只在空闲较久（可能已被服务端 wait_timeout 断开）时执行 SELECT 1。
+    探活失败抛出 DisconnectionError，连接池会丢弃该连接并重新获取。
+    """
+    @event.listens_for(engine, "checkin")
+    def _record_checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _ping_idle(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_seconds:
+            return
+        try:
+            cursor = dbapi_connection.cursor()
+            try:
+                cursor.execute("SELECT 1")
+            finally:
+                cursor.close()
+        except Exception:
+            raise exc.DisconnectionError()
+
+
+def configure_engine(engine) -> None:
+    """按 DB_POOL_PRE_PING 安装空闲探活（传入同步 Engine，异步引擎传 .sync_engine）"""
+    if settings.DB_POOL_PRE_PING == "idle":
+        install_idle_ping(engine, settings.DB_POOL_PRE_PING_IDLE_SECONDS)
+
+
+def pool_status(name: str, engine) -> Optional[dict]:
+    """连接池当前状态和累计指标；engine 为 None 时返回 None"""
+    if engine is None:
+        return None
+    pool = engine.pool
+    metrics = getattr(pool, "metrics", None)
+    status = {
+        "name": name,
+        "pool_class": type(pool).__name__,
+        "size": None,
+        "checked_out": None,
+        "checked_in": None,
+        "overflow": None,
+        "max_overflow": None,
+        "timeout": None,
+        "pre_ping": settings.DB_POOL_PRE_PING if metrics else None
+    }
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            # overflow() 在未达到 pool_size 时为负数，只报告实际溢出的连接数
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout()
+        })
+    if metrics:
+        status.update(metrics.snapshot())
+    return status
+
+
+def pools_status(engines: dict) -> dict:
+    """当前进程（一个 uvicorn worker）所有引擎的连接池状态"""
+    return {
+        "pid": os.getpid(),
+        "pools": [
+            status for status in (pool_status(name, engine) for name, engine in engines.items())
+            if status is not None
+        ]
+    }
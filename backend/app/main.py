@@ -1,8 +1,11 @@
 import os
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import Base, engine, get_db
-from app.routers import auth, users, categories, records, projects, budgets, statistics
+from app.database import engine, get_db
+from app.cache import NotModified
+from app.request_timing import RequestTimingMiddleware
+from app.migrations import run_migrations
+from app.routers import auth, users, categories, records, projects, budgets, statistics, ops
 from app import models
 
 app = FastAPI(
@@ -18,8 +21,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Server-Timing"],
 )
 
+# 每个请求的 SQL 语句数和数据库耗时（Server-Timing 响应头 + 请求日志）
+app.add_middleware(RequestTimingMiddleware)
+
+
+@app.exception_handler(NotModified)
+async def not_modified_handler(request: Request, exc: NotModified):
+    """数据未变化时返回 304（无响应体）"""
+    return Response(
+        status_code=304,
+        headers={"ETag": exc.etag, "Cache-Control": "private, no-cache"}
+    )
+
 # Include routers
 app.include_router(auth.router, prefix="/api/v1")
 app.include_router(users.router, prefix="/api/v1")
@@ -28,14 +44,15 @@ app.include_router(records.router, prefix="/api/v1")
 app.include_router(projects.router, prefix="/api/v1")
 app.include_router(budgets.router, prefix="/api/v1")
 app.include_router(statistics.router, prefix="/api/v1")
+app.include_router(ops.router, prefix="/api/v1")
 
 
-# 创建数据库表
+# 创建 / 升级数据库表
 def init_db():
     # 跳过测试环境的自动创建
     if os.environ.get("TESTING") == "1":
         return
-    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
 
 
 @app.on_event("startup")
@@ -0,0 +1,126 @@
+"""版本化数据库迁移
+
+每个迁移是 app/migrations 下的 mXXXX_*.py 模块，提供 VERSION、DESCRIPTION 和
+upgrade(conn)。已执行的版本记录在 schema_migrations 表中，可离线对 SQLite / MySQL 执行：
+
+    python migrate.py            # 升级到最新
+    python migrate.py --status   # 查看状态
+
+迁移必须幂等（先检查再建表 / 加列 / 建索引），以兼容由 create_all 建好的旧库。
+多个 worker 同时启动时由迁移锁串行执行（见 migration_lock），后拿到锁的进程会发现已是最新。
+"""
+import fcntl
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select, text
+
+from app.migrations import (
+    m0001_initial_schema,
+    m0002_user_data_version,
+    m0003_hot_query_indexes,
+    m0004_record_fulltext,
+    m0005_budget_period_usage,
+    m0006_project_records_index,
+    m0007_rollup_key_columns,
+    m0008_record_daily_rollups_backfill,
+    m0009_budget_category_zero,
+)
+
+MIGRATIONS = sorted(
+    [
+        m0001_initial_schema,
+        m0002_user_data_version,
+        m0003_hot_query_indexes,
+        m0004_record_fulltext,
+        m0005_budget_period_usage,
+        m0006_project_records_index,
+        m0007_rollup_key_columns,
+        m0008_record_daily_rollups_backfill,
+        m0009_budget_category_zero,
+    ],
+    key=lambda m: m.VERSION
+)
+
+# MySQL 命名锁的名称和等待上限（秒），迁移（含数据回填）需在此时间内完成
+MIGRATION_LOCK_NAME = "pocketledger_migrations"
+MIGRATION_LOCK_TIMEOUT = 600
+
+_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(200), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def applied_versions(engine) -> List[int]:
+    """已执行的迁移版本"""
+    _metadata.create_all(bind=engine, checkfirst=True)
+    with engine.connect() as conn:
+        return [row[0] for row in conn.execute(
+            select(schema_migrations.c.version).order_by(schema_migrations.c.version)
+        )]
+
+
+def pending_migrations(engine):
+    """尚未执行的迁移模块"""
+    done = set(applied_versions(engine))
+    return [m for m in MIGRATIONS if m.VERSION not in done]
+
+
+@contextmanager
+def migration_lock(engine, timeout: int = MIGRATION_LOCK_TIMEOUT):
+    """跨进程的迁移锁
+
+    MySQL 使用 GET_LOCK 命名锁（在单独的连接上持有，迁移中的 DDL 隐式提交不会释放它）；
+    SQLite 对数据库文件旁的 .migrate.lock 文件加 flock；内存库只在本进程可见，不加锁。
+    """
+    if engine.dialect.name == "mysql":
+        with engine.connect() as conn:
+            acquired = conn.execute(
+                text("SELECT GET_LOCK(:name, :timeout)"),
+                {"name": MIGRATION_LOCK_NAME, "timeout": timeout}
+            ).scalar()
+            if acquired != 1:
+                raise RuntimeError(f"等待迁移锁超时（{timeout} 秒）")
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": MIGRATION_LOCK_NAME})
+        return
+
+    database = engine.url.database if engine.dialect.name == "sqlite" else None
+    if not database or database == ":memory:" or database.startswith("file:"):
+        yield
+        return
+
+    with open(f"{database}.migrate.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def run_migrations(engine) -> List[int]:
+    """按版本顺序执行未执行的迁移，每个迁移单独一个事务，返回本次执行的版本
+
+    整个过程持有迁移锁，拿到锁后才读取待执行的迁移，并发启动的进程不会重复执行。
+    """
+    executed = []
+    with migration_lock(engine):
+        for migration in pending_migrations(engine):
+            with engine.begin() as conn:
+                migration.upgrade(conn)
+                conn.execute(schema_migrations.insert().values(
+                    version=migration.VERSION,
+                    description=migration.DESCRIPTION,
+                    applied_at=datetime.now()
+                ))
+            executed.append(migration.VERSION)
+    return executed
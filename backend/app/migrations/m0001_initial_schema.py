@@ -0,0 +1,123 @@
+"""初始表结构（已有数据库中缺失的表才会创建）
+
+表定义是引入版本化迁移时的快照，不随 ORM 模型变化；之后的列、索引和新表由后续迁移补齐。
+"""
+from sqlalchemy import (
+    Boolean, Column, Date, DateTime, Enum, Float, ForeignKey, Index, Integer, MetaData, String, Table,
+    UniqueConstraint
+)
+
+VERSION = 1
+DESCRIPTION = "初始表结构"
+
+metadata = MetaData()
+
+Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("username", String(50), unique=True, index=True, nullable=False),
+    Column("email", String(100), unique=True, index=True, nullable=False),
+    Column("hashed_password", String(255), nullable=False),
+    Column("is_active", Boolean),
+    Column("is_verified", Boolean),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+Table(
+    "categories", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String(50), nullable=False),
+    Column("type", Enum("INCOME", "EXPENSE", name="categorytype"), nullable=False),
+    Column("level", Enum("PRIMARY", "SECONDARY", name="categorylevel")),
+    Column("icon", String(50), nullable=True),
+    Column("color", String(20), nullable=True),
+    Column("sort_order", Integer),
+    Column("is_system", Boolean),
+    Column("is_active", Boolean),
+    Column("parent_id", Integer, ForeignKey("categories.id"), nullable=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=True),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+Table(
+    "projects", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String(100), nullable=False),
+    Column("description", String(500), nullable=True),
+    Column("budget", Float, nullable=True),
+    Column("status", String(20)),
+    Column("start_date", DateTime, nullable=True),
+    Column("end_date", DateTime, nullable=True),
+    Column("owner_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("created_by_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime, nullable=True),
+)
+
+Table(
+    "records", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("category_id", Integer, ForeignKey("categories.id"), nullable=True),
+    Column("amount", Float, nullable=False),
+    Column("type", Enum("INCOME", "EXPENSE", name="recordtype"), nullable=False),
+    Column("description", String(200), nullable=True),
+    Column("date", DateTime, nullable=False),
+    Column("payer_count", Integer),
+    Column("payer_per_share", Float, nullable=True),
+    Column("is_aa", Boolean),
+    Column("project_id", Integer, ForeignKey("projects.id"), nullable=True),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime, nullable=True),
+)
+
+Table(
+    "budgets", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("category_id", Integer, ForeignKey("categories.id"), nullable=True),
+    Column("name", String(100), nullable=False),
+    Column("amount", Float, nullable=False),
+    Column("period_type", Enum("MONTHLY", "YEARLY", name="budgetperiodtype"), nullable=False),
+    Column("start_date", DateTime, nullable=False),
+    Column("end_date", DateTime, nullable=True),
+    Column("is_active", Boolean),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+Table(
+    "invitations", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("code", String(20), unique=True, index=True, nullable=False),
+    Column("max_uses", Integer),
+    Column("used_count", Integer),
+    Column("created_by_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("is_active", Boolean),
+    Column("created_at", DateTime),
+    Column("expires_at", DateTime, nullable=True),
+)
+
+Table(
+    "record_daily_rollups", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("day", Date, nullable=False),
+    Column("type", Enum("INCOME", "EXPENSE", name="recordtype"), nullable=False),
+    Column("category_id", Integer, ForeignKey("categories.id"), nullable=True),
+    Column("project_id", Integer, ForeignKey("projects.id"), nullable=True),
+    Column("total_amount", Float, nullable=False),
+    Column("record_count", Integer, nullable=False),
+    UniqueConstraint(
+        "user_id", "day", "type", "category_id", "project_id",
+        name="uq_record_daily_rollups_key"
+    ),
+    Index("ix_record_daily_rollups_project_type", "project_id", "type"),
+)
+
+
+def upgrade(conn):
+    # 仅建缺失的表，已有表保持不变，由后续迁移补齐列和索引
+    metadata.create_all(bind=conn, checkfirst=True)
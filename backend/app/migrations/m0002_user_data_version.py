@@ -0,0 +1,11 @@
+"""users.data_version：结果缓存 / ETag 使用的用户数据版本"""
+from sqlalchemy import Column, Integer, text
+
+from app.migrations.ops import add_column
+
+VERSION = 2
+DESCRIPTION = "users 添加 data_version 列"
+
+
+def upgrade(conn):
+    add_column(conn, "users", Column("data_version", Integer, nullable=False, server_default=text("0")))
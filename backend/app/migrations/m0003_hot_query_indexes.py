@@ -0,0 +1,22 @@
+"""热点查询的组合索引"""
+from app.migrations.ops import create_index, has_table
+
+VERSION = 3
+DESCRIPTION = "records / record_daily_rollups / budgets / projects 组合索引"
+
+INDEXES = [
+    # (表, 索引名, 列)
+    ("records", "ix_records_user_date_id", ["user_id", "date", "id"]),
+    ("records", "ix_records_user_type_date", ["user_id", "type", "date"]),
+    ("records", "ix_records_user_category_date", ["user_id", "category_id", "date"]),
+    ("records", "ix_records_project_type", ["project_id", "type"]),
+    ("record_daily_rollups", "ix_record_daily_rollups_project_type", ["project_id", "type"]),
+    ("budgets", "ix_budgets_user_active", ["user_id", "is_active"]),
+    ("projects", "ix_projects_owner_created", ["owner_id", "created_at"]),
+]
+
+
+def upgrade(conn):
+    for table, name, columns in INDEXES:
+        if has_table(conn, table):
+            create_index(conn, table, name, columns)
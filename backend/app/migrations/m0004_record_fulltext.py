@@ -0,0 +1,37 @@
+"""记账记录备注全文索引（MySQL FULLTEXT / SQLite FTS5 影子表）"""
+from app.migrations.ops import has_index, has_table
+
+VERSION = 4
+DESCRIPTION = "records.description 全文索引"
+
+SQLITE_STATEMENTS = [
+    "CREATE VIRTUAL TABLE records_fts USING fts5("
+    "description, content='records', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS records_fts_ai AFTER INSERT ON records BEGIN "
+    "INSERT INTO records_fts(rowid, description) VALUES (new.id, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS records_fts_ad AFTER DELETE ON records BEGIN "
+    "INSERT INTO records_fts(records_fts, rowid, description) VALUES ('delete', old.id, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS records_fts_au AFTER UPDATE OF description ON records BEGIN "
+    "INSERT INTO records_fts(records_fts, rowid, description) VALUES ('delete', old.id, old.description); "
+    "INSERT INTO records_fts(rowid, description) VALUES (new.id, new.description); END",
+    # 回填已有记录
+    "INSERT INTO records_fts(records_fts) VALUES ('rebuild')",
+]
+
+
+def upgrade(conn):
+    if not has_table(conn, "records"):
+        return
+
+    if conn.dialect.name == "sqlite":
+        # 由 create_all 建好的库已随 records 建好影子表
+        if has_table(conn, "records_fts"):
+            return
+        for statement in SQLITE_STATEMENTS:
+            conn.exec_driver_sql(statement)
+    elif conn.dialect.name == "mysql":
+        if not has_index(conn, "records", "ft_records_description"):
+            conn.exec_driver_sql(
+                "ALTER TABLE records ADD FULLTEXT INDEX ft_records_description (description) "
+                "WITH PARSER ngram"
+            )
@@ -0,0 +1,105 @@
+"""budget_period_usage：预算分期用量表，并从日汇总回填"""
+from datetime import date
+
+from sqlalchemy import (
+    Column, Date, DateTime, Float, ForeignKey, Integer, MetaData, String, Table, UniqueConstraint, column, func,
+    select, table
+)
+
+from app.migrations.ops import has_table
+
+VERSION = 5
+DESCRIPTION = "budget_period_usage 预算分期用量"
+
+metadata = MetaData()
+
+# 仅供外键解析，不会创建
+Table("budgets", metadata, Column("id", Integer, primary_key=True))
+
+budget_period_usage = Table(
+    "budget_period_usage", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("budget_id", Integer, ForeignKey("budgets.id"), nullable=False),
+    Column("period_start", Date, nullable=False),
+    Column("spent_amount", Float, nullable=False),
+    Column("record_count", Integer, nullable=False),
+    UniqueConstraint("budget_id", "period_start", name="uq_budget_period_usage_key"),
+)
+
+budgets = table(
+    "budgets",
+    column("id", Integer),
+    column("user_id", Integer),
+    column("category_id", Integer),
+    column("period_type", String),
+    column("start_date", DateTime),
+    column("end_date", DateTime),
+)
+
+record_daily_rollups = table(
+    "record_daily_rollups",
+    column("user_id", Integer),
+    column("day", Date),
+    column("type", String),
+    column("category_id", Integer),
+    column("total_amount", Float),
+    column("record_count", Integer),
+)
+
+
+def _period_start(period_type: str, day: date) -> date:
+    if period_type == "YEARLY":
+        return date(day.year, 1, 1)
+    return date(day.year, day.month, 1)
+
+
+def rebuild_usage(conn, budget_ids=None):
+    """从日汇总重建预算分期用量（可限定预算），供本迁移和之后回填日汇总的迁移使用
+
+    与 rebuild_budget_usage 口径一致：有分类的支出，起止日期按天计（含当天），按自然月 / 自然年分期。
+    """
+    budget_query = select(budgets)
+    delete_query = budget_period_usage.delete()
+    if budget_ids is not None:
+        budget_ids = list(budget_ids)
+        budget_query = budget_query.where(budgets.c.id.in_(budget_ids))
+        delete_query = delete_query.where(budget_period_usage.c.budget_id.in_(budget_ids))
+    conn.execute(delete_query)
+
+    rows = []
+    for budget in conn.execute(budget_query).all():
+        query = select(
+            record_daily_rollups.c.day,
+            func.sum(record_daily_rollups.c.total_amount),
+            func.sum(record_daily_rollups.c.record_count)
+        ).where(
+            record_daily_rollups.c.user_id == budget.user_id,
+            record_daily_rollups.c.type == "EXPENSE",
+            record_daily_rollups.c.category_id.isnot(None),
+            record_daily_rollups.c.day >= budget.start_date.date()
+        ).group_by(record_daily_rollups.c.day)
+        # category_id 为 0 是清除分类后的旧写法，与 NULL 一样统计全部分类
+        if budget.category_id:
+            query = query.where(record_daily_rollups.c.category_id == budget.category_id)
+        if budget.end_date is not None:
+            query = query.where(record_daily_rollups.c.day <= budget.end_date.date())
+
+        periods = {}
+        for day, amount, count in conn.execute(query):
+            start = _period_start(budget.period_type, day)
+            spent, records = periods.get(start, (0.0, 0))
+            periods[start] = (spent + (amount or 0.0), records + (count or 0))
+
+        rows.extend(
+            {"budget_id": budget.id, "period_start": start, "spent_amount": spent, "record_count": records}
+            for start, (spent, records) in periods.items() if records > 0
+        )
+
+    if rows:
+        conn.execute(budget_period_usage.insert(), rows)
+
+
+def upgrade(conn):
+    metadata.create_all(bind=conn, tables=[budget_period_usage], checkfirst=True)
+    if has_table(conn, "budgets") and has_table(conn, "record_daily_rollups"):
+        rebuild_usage(conn)
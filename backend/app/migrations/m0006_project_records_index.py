@@ -0,0 +1,10 @@
+"""项目记录分页索引"""
+from app.migrations.ops import create_index, has_table
+
+VERSION = 6
+DESCRIPTION = "records (project_id, date, id) 索引"
+
+
+def upgrade(conn):
+    if has_table(conn, "records"):
+        create_index(conn, "records", "ix_records_project_date_id", ["project_id", "date", "id"])
@@ -0,0 +1,46 @@
+"""record_daily_rollups：唯一键改用非 NULL 的 category_key / project_key 列"""
+from sqlalchemy import Column, Integer, text
+
+from app.migrations.ops import add_column, create_index, has_index, has_table
+
+VERSION = 7
+DESCRIPTION = "record_daily_rollups 非 NULL 唯一键"
+
+KEY_COLUMNS = ["user_id", "day", "type", "category_key", "project_key"]
+
+
+def upgrade(conn):
+    if not has_table(conn, "record_daily_rollups"):
+        return
+
+    for name in ("category_key", "project_key"):
+        add_column(conn, "record_daily_rollups", Column(name, Integer, nullable=False, server_default=text("0")))
+    conn.exec_driver_sql(
+        "UPDATE record_daily_rollups "
+        "SET category_key = COALESCE(category_id, 0), project_key = COALESCE(project_id, 0)"
+    )
+
+    # 旧唯一约束含可为 NULL 的列，并发写入可能留下同键的多行，合并到 id 最小的一行
+    duplicates = conn.exec_driver_sql(
+        "SELECT MIN(id), SUM(total_amount), SUM(record_count), user_id, day, type, category_key, project_key "
+        "FROM record_daily_rollups GROUP BY user_id, day, type, category_key, project_key "
+        "HAVING COUNT(*) > 1"
+    ).all()
+    for keep_id, total_amount, record_count, *key in duplicates:
+        conn.execute(
+            text("UPDATE record_daily_rollups SET total_amount = :amount, record_count = :count WHERE id = :id"),
+            {"amount": total_amount, "count": record_count, "id": keep_id}
+        )
+        conn.execute(
+            text(
+                "DELETE FROM record_daily_rollups WHERE id <> :id AND user_id = :user_id AND day = :day "
+                "AND type = :type AND category_key = :category_key AND project_key = :project_key"
+            ),
+            {"id": keep_id, **dict(zip(KEY_COLUMNS, key))}
+        )
+
+    create_index(conn, "record_daily_rollups", "uq_record_daily_rollups_slot", KEY_COLUMNS, unique=True)
+    # MySQL 的旧唯一约束是普通唯一索引，新索引同样以 user_id 开头，可以替它支撑外键；
+    # SQLite 的表级约束无法单独删除，它比新索引更宽松，保留不影响写入
+    if conn.dialect.name == "mysql" and has_index(conn, "record_daily_rollups", "uq_record_daily_rollups_key"):
+        conn.exec_driver_sql("ALTER TABLE record_daily_rollups DROP INDEX uq_record_daily_rollups_key")
@@ -0,0 +1,25 @@
+"""record_daily_rollups：从 records 回填升级前已有记录的日汇总"""
+from app.migrations.m0005_budget_period_usage import rebuild_usage
+from app.migrations.ops import has_table
+
+VERSION = 8
+DESCRIPTION = "record_daily_rollups 回填"
+
+
+def upgrade(conn):
+    if not has_table(conn, "records") or not has_table(conn, "record_daily_rollups"):
+        return
+    # 汇总表非空说明已回填过或已由记录写入增量维护，保持不变
+    if conn.exec_driver_sql("SELECT 1 FROM record_daily_rollups LIMIT 1").first() is not None:
+        return
+    # 与 rebuild_rollups 相同的 INSERT ... SELECT
+    conn.exec_driver_sql(
+        "INSERT INTO record_daily_rollups "
+        "(user_id, day, type, category_id, project_id, category_key, project_key, total_amount, record_count) "
+        "SELECT user_id, DATE(date), type, category_id, project_id, "
+        "COALESCE(category_id, 0), COALESCE(project_id, 0), SUM(amount), COUNT(id) "
+        "FROM records GROUP BY user_id, DATE(date), type, category_id, project_id"
+    )
+    # m0005 回填预算用量时日汇总还是空的，按回填后的日汇总重建
+    if has_table(conn, "budgets") and has_table(conn, "budget_period_usage"):
+        rebuild_usage(conn)
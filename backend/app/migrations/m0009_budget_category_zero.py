@@ -0,0 +1,17 @@
+"""budgets.category_id：清除分类时存入的 0 改为 NULL，并重建这些预算的用量"""
+from app.migrations.m0005_budget_period_usage import rebuild_usage
+from app.migrations.ops import has_table
+
+VERSION = 9
+DESCRIPTION = "budgets.category_id 0 改为 NULL"
+
+
+def upgrade(conn):
+    if not has_table(conn, "budgets"):
+        return
+    budget_ids = conn.exec_driver_sql("SELECT id FROM budgets WHERE category_id = 0").scalars().all()
+    if not budget_ids:
+        return
+    conn.exec_driver_sql("UPDATE budgets SET category_id = NULL WHERE category_id = 0")
+    if has_table(conn, "budget_period_usage") and has_table(conn, "record_daily_rollups"):
+        rebuild_usage(conn, budget_ids)
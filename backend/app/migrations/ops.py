@@ -0,0 +1,37 @@
+"""迁移中使用的幂等 DDL 操作
+
+迁移脚本只依赖这里的操作、反射出的表结构和迁移内自带的表定义快照，不引用 ORM 模型，
+避免模型后续变化影响旧迁移。
+"""
+from sqlalchemy import Column, Index, MetaData, Table, inspect
+from sqlalchemy.sql.ddl import CreateColumn
+
+
+def has_table(conn, table: str) -> bool:
+    return inspect(conn).has_table(table)
+
+
+def has_column(conn, table: str, column: str) -> bool:
+    return any(c["name"] == column for c in inspect(conn).get_columns(table))
+
+
+def has_index(conn, table: str, name: str) -> bool:
+    return any(ix["name"] == name for ix in inspect(conn).get_indexes(table))
+
+
+def add_column(conn, table: str, column: Column) -> bool:
+    """列不存在时添加，返回是否执行"""
+    if has_column(conn, table, column.name):
+        return False
+    column_ddl = CreateColumn(column).compile(dialect=conn.dialect)
+    conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column_ddl}")
+    return True
+
+
+def create_index(conn, table: str, name: str, columns, unique: bool = False) -> bool:
+    """索引不存在时创建，返回是否执行"""
+    if has_index(conn, table, name):
+        return False
+    reflected = Table(table, MetaData(), autoload_with=conn)
+    Index(name, *[reflected.c[col] for col in columns], unique=unique).create(conn)
+    return True
@@ -4,6 +4,10 @@ from app.models.record import Record
 from app.models.project import Project
 from app.models.budget import Budget
 from app.models.invitation import Invitation
+from app.models.rollup import RecordDailyRollup
+from app.models.budget_usage import BudgetPeriodUsage
+from app.models import data_version  # noqa: F401  注册数据版本维护钩子
+from app.models import record_search  # noqa: F401  注册全文检索影子表
 
 __all__ = [
     "User",
@@ -12,4 +16,6 @@ __all__ = [
     "Project",
     "Budget",
     "Invitation",
+    "RecordDailyRollup",
+    "BudgetPeriodUsage",
 ]
@@ -0,0 +1,247 @@
+from sqlalchemy import Column, Integer, ForeignKey, Date, Float, UniqueConstraint, delete, event, func, insert, inspect, or_, select
+from sqlalchemy.orm import Session
+from datetime import date, datetime, timedelta
+
+from app.database import Base
+from app.models.budget import Budget, BudgetPeriodType
+from app.models.record import RecordType
+from app.models.rollup import RecordDailyRollup, on_rollup_deltas, upsert_increments
+
+
+class BudgetPeriodUsage(Base):
+    """预算分期用量表
+
+    以 (budget_id, period_start) 为键保存每个预算周期（自然月 / 自然年）内的支出合计和笔数，
+    随记录写入增量维护，超支提醒只读取当前周期的一行。
+    """
+    __tablename__ = "budget_period_usage"
+    __table_args__ = (
+        UniqueConstraint("budget_id", "period_start", name="uq_budget_period_usage_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    budget_id = Column(Integer, ForeignKey("budgets.id"), nullable=False)
+    period_start = Column(Date, nullable=False)  # 周期首日
+    spent_amount = Column(Float, nullable=False, default=0.0)  # 支出合计
+    record_count = Column(Integer, nullable=False, default=0)  # 支出笔数
+
+    def __repr__(self):
+        return f"<BudgetPeriodUsage {self.budget_id} {self.period_start} {self.spent_amount}>"
+
+
+# 影响预算用量归属的预算字段，变化时重建该预算的用量
+_WINDOW_FIELDS = ("user_id", "category_id", "period_type", "start_date", "end_date")
+
+
+def period_start(period_type, day: date) -> date:
+    """day 所在预算周期的首日"""
+    if BudgetPeriodType(period_type) == BudgetPeriodType.YEARLY:
+        return date(day.year, 1, 1)
+    return date(day.year, day.month, 1)
+
+
+def period_end(period_type, start: date) -> date:
+    """预算周期的最后一天"""
+    if BudgetPeriodType(period_type) == BudgetPeriodType.YEARLY:
+        return date(start.year, 12, 31)
+    next_month = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return next_month - timedelta(days=1)
+
+
+def _covers(budget, category_id, day: date) -> bool:
+    """预算是否统计该分类、该日的支出（起止日期按天计，含当天）"""
+    if category_id is None:
+        return False
+    # category_id 为空或 0（旧数据中清除分类的写法）表示统计全部分类
+    if budget.category_id and budget.category_id != category_id:
+        return False
+    if day < budget.start_date.date():
+        return False
+    return budget.end_date is None or day <= budget.end_date.date()
+
+
+# 记录写入使预算越过阈值时产生的提醒，暂存在 session.info 中，提交后由 app.budget_alerts 推送
+PENDING_ALERTS_KEY = "pending_budget_alerts"
+
+# 提醒阈值（占预算比例）及对应的提醒类型，与 /budgets/alerts 一致
+ALERT_THRESHOLDS = ((1.0, "over_budget"), (0.8, "warning"))
+
+
+def alert_level(spent: float, budget_amount: float):
+    """支出所处的提醒类型，未达阈值返回 None"""
+    if budget_amount <= 0:
+        return None
+    for ratio, alert_type in ALERT_THRESHOLDS:
+        if spent / budget_amount >= ratio:
+            return alert_type
+    return None
+
+
+def _queue_threshold_alert(db: Session, budget, start: date, spent_before: float, spent_after: float):
+    """支出向上越过 80% / 100% 阈值时暂存一条提醒"""
+    if spent_after <= spent_before:
+        return
+    level = alert_level(spent_after, budget.amount)
+    if level is None or level == alert_level(spent_before, budget.amount):
+        return
+    db.info.setdefault(PENDING_ALERTS_KEY, []).append({
+        "user_id": budget.user_id,
+        "budget_id": budget.id,
+        "budget_name": budget.name,
+        "category_id": budget.category_id,
+        "budget_amount": budget.amount,
+        "spent_amount": spent_after,
+        "remaining_amount": budget.amount - spent_after,
+        "alert_type": level,
+        "period_start": start.isoformat(),
+        "period_end": period_end(budget.period_type, start).isoformat()
+    })
+
+
+@on_rollup_deltas
+def apply_budget_usage_deltas(db: Session, deltas: dict):
+    """把日汇总增量中的支出计入受影响预算的对应周期（不提交事务）"""
+    # 无分类的支出不计入任何预算（见 _covers）
+    expense = {
+        key: value for key, value in deltas.items()
+        if key[2] == RecordType.EXPENSE and key[3] is not None and (value[0] or value[1])
+    }
+    if not expense:
+        return
+
+    # 只读取统计这些分类（或全部分类）、且起止日期与写入日期相交的预算；
+    # 本次 flush 新增或修改窗口的预算在 after_flush 中整体重建
+    deleted_ids = {obj.id for obj in db.deleted if isinstance(obj, Budget)}
+    days = {key[1] for key in expense}
+    budgets = db.query(
+        Budget.id, Budget.user_id, Budget.category_id, Budget.period_type,
+        Budget.start_date, Budget.end_date, Budget.name, Budget.amount, Budget.is_active
+    ).filter(
+        Budget.user_id.in_({key[0] for key in expense}),
+        or_(Budget.category_id.is_(None), Budget.category_id.in_({key[3] for key in expense} | {0})),
+        Budget.start_date < datetime.combine(max(days) + timedelta(days=1), datetime.min.time()),
+        or_(Budget.end_date.is_(None), Budget.end_date >= datetime.combine(min(days), datetime.min.time()))
+    ).all()
+    budgets_by_id = {budget.id: budget for budget in budgets}
+    today = date.today()
+
+    usage_deltas = {}
+    for (user_id, day, _, category_id, _), (amount, count) in expense.items():
+        for budget in budgets:
+            if budget.user_id != user_id or budget.id in deleted_ids:
+                continue
+            if not _covers(budget, category_id, day):
+                continue
+            key = (budget.id, period_start(budget.period_type, day))
+            spent, records = usage_deltas.get(key, (0.0, 0))
+            usage_deltas[key] = (spent + amount, records + count)
+
+    if not usage_deltas:
+        return
+    # 按键排序，并发事务以相同顺序加行锁
+    keys = sorted(usage_deltas)
+    rows = []
+    for budget_id, start in keys:
+        amount, count = usage_deltas[(budget_id, start)]
+        rows.append({"budget_id": budget_id, "period_start": start, "spent_amount": amount, "record_count": count})
+    upsert_increments(
+        db, BudgetPeriodUsage.__table__, rows,
+        ["budget_id", "period_start"],
+        ["spent_amount", "record_count"]
+    )
+
+    # 只有生效中预算的当前周期需要判断阈值；upsert 已锁定该行，读到的是本事务写入后的值
+    current = [
+        (budget_id, start) for budget_id, start in keys
+        if budgets_by_id[budget_id].is_active
+        and start == period_start(budgets_by_id[budget_id].period_type, today)
+    ]
+    if current:
+        spent_after = {
+            (row.budget_id, row.period_start): row.spent_amount
+            for row in db.execute(select(
+                BudgetPeriodUsage.budget_id, BudgetPeriodUsage.period_start, BudgetPeriodUsage.spent_amount
+            ).where(
+                BudgetPeriodUsage.budget_id.in_({budget_id for budget_id, _ in current}),
+                BudgetPeriodUsage.period_start.in_({start for _, start in current})
+            ))
+        }
+        for key in current:
+            after = spent_after.get(key, 0.0)
+            _queue_threshold_alert(db, budgets_by_id[key[0]], key[1], after - usage_deltas[key][0], after)
+
+    db.execute(delete(BudgetPeriodUsage).where(
+        BudgetPeriodUsage.budget_id.in_({budget_id for budget_id, _ in keys}),
+        BudgetPeriodUsage.record_count <= 0
+    ))
+
+
+def rebuild_budget_usage(conn, budget_ids=None) -> int:
+    """从日汇总重建预算分期用量（可限定预算），返回写入的行数，不提交事务
+
+    只使用 Core 语句，conn 可以是 Session（包括 flush 过程中）或 Connection。
+    """
+    budget_query = select(
+        Budget.id, Budget.user_id, Budget.category_id, Budget.period_type,
+        Budget.start_date, Budget.end_date
+    )
+    delete_query = delete(BudgetPeriodUsage)
+    if budget_ids is not None:
+        budget_ids = list(budget_ids)
+        budget_query = budget_query.where(Budget.id.in_(budget_ids))
+        delete_query = delete_query.where(BudgetPeriodUsage.budget_id.in_(budget_ids))
+    conn.execute(delete_query)
+
+    rows = []
+    for budget in conn.execute(budget_query).all():
+        query = select(
+            RecordDailyRollup.day,
+            func.sum(RecordDailyRollup.total_amount),
+            func.sum(RecordDailyRollup.record_count)
+        ).where(
+            RecordDailyRollup.user_id == budget.user_id,
+            RecordDailyRollup.type == RecordType.EXPENSE,
+            RecordDailyRollup.category_id.isnot(None),
+            RecordDailyRollup.day >= budget.start_date.date()
+        ).group_by(RecordDailyRollup.day)
+        if budget.category_id:
+            query = query.where(RecordDailyRollup.category_id == budget.category_id)
+        if budget.end_date is not None:
+            query = query.where(RecordDailyRollup.day <= budget.end_date.date())
+
+        periods = {}
+        for day, amount, count in conn.execute(query):
+            start = period_start(budget.period_type, day)
+            spent, records = periods.get(start, (0.0, 0))
+            periods[start] = (spent + (amount or 0.0), records + (count or 0))
+
+        rows.extend(
+            {"budget_id": budget.id, "period_start": start, "spent_amount": spent, "record_count": records}
+            for start, (spent, records) in periods.items() if records > 0
+        )
+
+    if rows:
+        conn.execute(insert(BudgetPeriodUsage), rows)
+    return len(rows)
+
+
+@event.listens_for(Session, "before_flush")
+def _delete_budget_usage(session, flush_context, instances):
+    """删除预算前先删除其用量行"""
+    budget_ids = [obj.id for obj in session.deleted if isinstance(obj, Budget)]
+    if budget_ids:
+        session.execute(delete(BudgetPeriodUsage).where(BudgetPeriodUsage.budget_id.in_(budget_ids)))
+
+
+@event.listens_for(Session, "after_flush")
+def _rebuild_changed_budgets(session, flush_context):
+    """新增预算或修改了分类、周期、起止日期的预算，在同一事务内重建用量"""
+    budget_ids = [obj.id for obj in session.new if isinstance(obj, Budget)]
+    for obj in session.dirty:
+        if not isinstance(obj, Budget) or obj in session.deleted:
+            continue
+        state = inspect(obj)
+        if any(state.attrs[field].history.has_changes() for field in _WINDOW_FIELDS):
+            budget_ids.append(obj.id)
+    if budget_ids:
+        rebuild_budget_usage(session, budget_ids)
@@ -0,0 +1,69 @@
+from sqlalchemy import event, inspect, update, select, or_
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.models.record import Record
+from app.models.category import Category
+from app.models.project import Project
+from app.models.budget import Budget
+
+
+# 本事务中资料发生变化的用户 id，提交后由 app.auth.user_cache 失效其缓存快照
+CHANGED_USERS_KEY = "changed_user_ids"
+
+
+def bump_data_version(db: Session, user_ids=(), project_ids=()):
+    """递增用户数据版本（不提交事务）
+
+    project_ids 对应项目的所有者和创建者也会递增，项目统计包含他人记入该项目的记录。
+    """
+    user_ids = {uid for uid in user_ids if uid is not None}
+    project_ids = {pid for pid in project_ids if pid is not None}
+    if not user_ids and not project_ids:
+        return
+
+    conditions = []
+    if user_ids:
+        conditions.append(User.id.in_(user_ids))
+    if project_ids:
+        conditions.append(User.id.in_(select(Project.owner_id).where(Project.id.in_(project_ids))))
+        conditions.append(User.id.in_(select(Project.created_by_id).where(Project.id.in_(project_ids))))
+
+    db.execute(
+        update(User).where(or_(*conditions)).values(
+            data_version=User.data_version + 1,
+            # 数据版本不算资料修改，保持 updated_at 不变
+            updated_at=User.updated_at
+        ).execution_options(synchronize_session=False)
+    )
+
+    # 让会话中已加载的用户重新读取版本号
+    for obj in list(db.identity_map.values()):
+        if isinstance(obj, User):
+            db.expire(obj, ["data_version"])
+
+
+def _history_values(obj, field):
+    """字段当前值及变更前的值"""
+    history = inspect(obj).attrs[field].history
+    return set(history.deleted) | {getattr(obj, field)}
+
+
+@event.listens_for(Session, "before_flush")
+def _bump_on_write(session, flush_context, instances):
+    """记录、分类、项目、预算有写入时递增相关用户的数据版本"""
+    user_ids = set()
+    project_ids = set()
+
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if obj not in session.new and obj not in session.deleted and not session.is_modified(obj):
+            continue
+        if isinstance(obj, Record):
+            user_ids |= _history_values(obj, "user_id")
+            project_ids |= _history_values(obj, "project_id")
+        elif isinstance(obj, (Category, Budget)):
+            user_ids |= _history_values(obj, "user_id")
+        elif isinstance(obj, Project):
+            user_ids |= _history_values(obj, "owner_id") | _history_values(obj, "created_by_id")
+
+    bump_data_version(session, user_ids, project_ids)
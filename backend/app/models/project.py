@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Index, func, select
+from sqlalchemy.orm import relationship, column_property
 from app.database import Base
+from app.models.record import RecordType
+from app.models.rollup import RecordDailyRollup
 from datetime import datetime
 import pytz
 
@@ -15,6 +17,9 @@ class ProjectStatus:
 
 class Project(Base):
     __tablename__ = "projects"
+    __table_args__ = (
+        Index("ix_projects_owner_created", "owner_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
@@ -33,17 +38,29 @@ class Project(Base):
     created_by = relationship("User", foreign_keys=[created_by_id], back_populates="created_projects")
     records = relationship("Record", back_populates="project", cascade="all, delete-orphan")
 
-    def total_expenses(self) -> float:
-        """计算项目总支出"""
-        return sum(record.amount for record in self.records if record.type.value == "expense")
-
-    def total_income(self) -> float:
-        """计算项目总收入"""
-        return sum(record.amount for record in self.records if record.type.value == "income")
+    # 收支合计：数据库侧聚合日汇总（按项目索引），不加载记录。
+    # 默认延迟加载，查询时可用 undefer_group("totals") 随项目一并取回
+    total_expenses = column_property(
+        select(func.coalesce(func.sum(RecordDailyRollup.total_amount), 0.0)).where(
+            RecordDailyRollup.project_id == id,
+            RecordDailyRollup.type == RecordType.EXPENSE
+        ).correlate_except(RecordDailyRollup).scalar_subquery(),
+        deferred=True,
+        group="totals"
+    )
+    total_income = column_property(
+        select(func.coalesce(func.sum(RecordDailyRollup.total_amount), 0.0)).where(
+            RecordDailyRollup.project_id == id,
+            RecordDailyRollup.type == RecordType.INCOME
+        ).correlate_except(RecordDailyRollup).scalar_subquery(),
+        deferred=True,
+        group="totals"
+    )
 
+    @property
     def balance(self) -> float:
-        """计算项目结余"""
-        return self.total_income() - self.total_expenses()
+        """项目结余"""
+        return self.total_income - self.total_expenses
 
     def __repr__(self):
         return f"<Project {self.name}>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Float, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Float, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from app.database import Base
 from datetime import datetime
@@ -15,6 +15,23 @@ class RecordType(str, enum.Enum):
 
 class Record(Base):
     __tablename__ = "records"
+    __table_args__ = (
+        # 列表分页 (date desc, id desc)
+        Index("ix_records_user_date_id", "user_id", "date", "id"),
+        # 按类型的时间段汇总（预算、重建日汇总）
+        Index("ix_records_user_type_date", "user_id", "type", "date"),
+        # 按分类筛选
+        Index("ix_records_user_category_date", "user_id", "category_id", "date"),
+        # 项目统计
+        Index("ix_records_project_type", "project_id", "type"),
+        # 项目记录分页 (date desc, id desc)
+        Index("ix_records_project_date_id", "project_id", "date", "id"),
+        # 备注全文检索（MySQL ngram 分词，支持中文；SQLite 见 record_search 中的 FTS5 影子表）
+        Index(
+            "ft_records_description", "description",
+            mysql_prefix="FULLTEXT", mysql_with_parser="ngram"
+        ).ddl_if(dialect="mysql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
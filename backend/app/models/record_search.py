@@ -0,0 +1,106 @@
+"""记账记录备注全文检索
+
+MySQL 使用 records.description 上的 FULLTEXT 索引（ngram 分词，支持中文）；
+SQLite 使用 FTS5 外部内容影子表 records_fts（trigram 分词），由触发器在 records
+新增、修改、删除时同步，批量插入等绕过 ORM 的写入同样覆盖。
+"""
+from sqlalchemy import DDL, and_, column, event, func, literal, literal_column, or_, select, table
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import Session
+
+from app.models.record import Record, RecordType
+
+# 单次检索最多使用的关键词数
+MAX_SEARCH_TERMS = 8
+
+# 各方言全文索引可检索的最短关键词（字符数），更短的关键词退回 LIKE 过滤
+_MIN_TOKEN_LENGTH = {
+    "sqlite": 3,  # trigram
+    "mysql": 2,   # ngram_token_size 默认值
+}
+
+SQLITE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS records_fts USING fts5("
+    "description, content='records', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS records_fts_ai AFTER INSERT ON records BEGIN "
+    "INSERT INTO records_fts(rowid, description) VALUES (new.id, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS records_fts_ad AFTER DELETE ON records BEGIN "
+    "INSERT INTO records_fts(records_fts, rowid, description) VALUES ('delete', old.id, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS records_fts_au AFTER UPDATE OF description ON records BEGIN "
+    "INSERT INTO records_fts(records_fts, rowid, description) VALUES ('delete', old.id, old.description); "
+    "INSERT INTO records_fts(rowid, description) VALUES (new.id, new.description); END",
+]
+
+for _statement in SQLITE_FTS_DDL:
+    event.listen(Record.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+# records 删除时触发器随表删除，影子表需要单独删除
+event.listen(
+    Record.__table__, "before_drop",
+    DDL("DROP TABLE IF EXISTS records_fts").execute_if(dialect="sqlite")
+)
+
+records_fts = table("records_fts", column("rowid"))
+
+
+def split_terms(q: str):
+    """按空白拆分关键词（多个关键词之间为“且”）"""
+    return q.split()[:MAX_SEARCH_TERMS]
+
+
+def _fts5_query(terms) -> str:
+    # 每个关键词作为短语，避免用户输入被当作 FTS5 语法
+    return " ".join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def _boolean_mode_query(terms) -> str:
+    # 布尔模式下 +"..." 表示必须包含该短语，短语内无法转义双引号
+    return " ".join('+"{}"'.format(term.replace('"', " ")) for term in terms)
+
+
+def search_records(
+    db: Session,
+    user_id: int,
+    q: str,
+    limit: int,
+    after=None,
+    type: RecordType = None
+):
+    """检索用户备注包含全部关键词的记录，按相关度降序、id 降序返回 [(Record, score)]
+
+    after 为上一页最后一条的 (score, id)，用于键集分页。相关度依赖全表词频，
+    两次翻页之间有写入时分数可能略有变化。关键词都短于索引最短长度时退回 LIKE，
+    此时 score 恒为 0，结果按 id 降序。
+    """
+    dialect = db.get_bind().dialect.name
+    min_length = _MIN_TOKEN_LENGTH.get(dialect)
+    terms = split_terms(q)
+    indexed = [t for t in terms if min_length is not None and len(t) >= min_length]
+    short = [t for t in terms if t not in indexed]
+
+    source = select(Record.id.label("id"))
+    conditions = [Record.user_id == user_id]
+    if indexed and dialect == "sqlite":
+        fts = literal_column("records_fts")
+        score = -func.bm25(fts)
+        source = source.join(records_fts, records_fts.c.rowid == Record.id)
+        conditions.append(fts.op("MATCH")(_fts5_query(indexed)))
+    elif indexed and dialect == "mysql":
+        score = match(Record.description, against=_boolean_mode_query(indexed)).in_boolean_mode()
+        conditions.append(score > 0)
+    else:
+        score = literal(0.0)
+    for term in short:
+        conditions.append(Record.description.contains(term, autoescape=True))
+    if type:
+        conditions.append(Record.type == type)
+
+    ranked = source.add_columns(score.label("score")).where(*conditions).subquery()
+
+    query = db.query(Record, ranked.c.score).join(ranked, ranked.c.id == Record.id)
+    if after is not None:
+        last_score, last_id = after
+        query = query.filter(or_(
+            ranked.c.score < last_score,
+            and_(ranked.c.score == last_score, Record.id < last_id)
+        ))
+    return query.order_by(ranked.c.score.desc(), Record.id.desc()).limit(limit).all()
@@ -0,0 +1,240 @@
+from sqlalchemy import Column, Integer, ForeignKey, Date, Float, Index, Enum as SQLEnum, delete, event, func, insert, inspect, text
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.orm import Session
+from datetime import datetime
+
+from app.database import Base
+from app.models.record import Record, RecordType
+
+
+class RecordDailyRollup(Base):
+    """记账记录按日汇总表
+
+    以 (user_id, day, type, category_id, project_id) 为键保存金额合计和笔数，
+    统计接口读取本表，成本随天数而非记录数增长。
+    唯一索引建在 category_key / project_key 上：NULL 在唯一索引中互不相等，无法作为 upsert 的冲突键。
+    """
+    __tablename__ = "record_daily_rollups"
+    __table_args__ = (
+        Index(
+            "uq_record_daily_rollups_slot",
+            "user_id", "day", "type", "category_key", "project_key",
+            unique=True
+        ),
+        Index("ix_record_daily_rollups_project_type", "project_id", "type"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    day = Column(Date, nullable=False)
+    type = Column(SQLEnum(RecordType), nullable=False)
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=True)
+    category_key = Column(Integer, nullable=False, server_default=text("0"))  # category_id，NULL 记为 NULL_KEY
+    project_key = Column(Integer, nullable=False, server_default=text("0"))  # project_id，NULL 记为 NULL_KEY
+    total_amount = Column(Float, nullable=False, default=0.0)  # 金额合计
+    record_count = Column(Integer, nullable=False, default=0)  # 记录笔数
+
+    def __repr__(self):
+        return f"<RecordDailyRollup {self.day} {self.type} {self.total_amount}>"
+
+
+# 汇总键列中代表 NULL 的哨兵值（自增 id 从 1 开始，不会与之冲突）
+NULL_KEY = 0
+
+
+# 影响汇总键或金额的记录字段
+_ROLLUP_FIELDS = ("user_id", "date", "type", "category_id", "project_id", "amount")
+
+
+# 修改这些字段时保留旧值，保证 before_flush 中能拿到变更前的汇总键
+for _field in _ROLLUP_FIELDS:
+    event.listen(getattr(Record, _field), "set", lambda *args: None, active_history=True)
+
+
+def _to_day(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _rollup_key(user_id, date, type, category_id, project_id):
+    if user_id is None or date is None or type is None:
+        return None
+    return (user_id, _to_day(date), RecordType(type), category_id, project_id)
+
+
+def _committed_values(record: Record):
+    """记录变更前（数据库中）的汇总字段取值"""
+    state = inspect(record)
+    values = {}
+    for field in _ROLLUP_FIELDS:
+        # 访问一次以加载过期属性
+        getattr(record, field)
+        history = state.attrs[field].history
+        if history.deleted:
+            values[field] = history.deleted[0]
+        elif history.unchanged:
+            values[field] = history.unchanged[0]
+        else:
+            values[field] = None
+    return values
+
+
+def _add_delta(deltas, values, sign):
+    key = _rollup_key(
+        values["user_id"], values["date"], values["type"],
+        values["category_id"], values["project_id"]
+    )
+    if key is None:
+        return
+    amount, count = deltas.get(key, (0.0, 0))
+    deltas[key] = (amount + sign * (values["amount"] or 0.0), count + sign)
+
+
+# 日汇总增量的订阅者，签名为 listener(db, deltas)，用于维护基于日汇总的派生数据
+_delta_listeners = []
+
+
+def on_rollup_deltas(listener):
+    """注册日汇总增量订阅者（装饰器），ORM 写入和批量插入两条路径都会通知"""
+    _delta_listeners.append(listener)
+    return listener
+
+
+def upsert_increments(db: Session, table, rows: list, key_columns, increment_columns):
+    """按唯一键插入或累加一批行（MySQL ON DUPLICATE KEY UPDATE / SQLite ON CONFLICT DO UPDATE）
+
+    先查后插在并发事务首次写入同一键时会死锁或违反唯一约束，upsert 由数据库在一条语句内完成。
+    rows 应按键排序。
+    """
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        statement = mysql.insert(table).values(rows)
+        statement = statement.on_duplicate_key_update({
+            column: table.c[column] + statement.inserted[column] for column in increment_columns
+        })
+    elif dialect == "sqlite":
+        statement = sqlite.insert(table).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={column: table.c[column] + statement.excluded[column] for column in increment_columns}
+        )
+    else:
+        raise NotImplementedError(f"不支持的数据库: {dialect}")
+    db.execute(statement)
+
+
+def _key_value(value):
+    return NULL_KEY if value is None else value
+
+
+def apply_rollup_deltas(db: Session, deltas: dict):
+    """把 {汇总键: (金额增量, 笔数增量)} 写入汇总表（不提交事务）"""
+    rows = [
+        {
+            "user_id": user_id,
+            "day": day,
+            "type": record_type,
+            "category_id": category_id,
+            "project_id": project_id,
+            "category_key": _key_value(category_id),
+            "project_key": _key_value(project_id),
+            "total_amount": amount,
+            "record_count": count
+        }
+        for (user_id, day, record_type, category_id, project_id), (amount, count) in deltas.items()
+        if count or amount
+    ]
+    # 按键排序，并发事务以相同顺序加行锁
+    rows.sort(key=lambda row: (
+        row["user_id"], row["day"], row["type"].value, row["category_key"], row["project_key"]
+    ))
+    upsert_increments(
+        db, RecordDailyRollup.__table__, rows,
+        ["user_id", "day", "type", "category_key", "project_key"],
+        ["total_amount", "record_count"]
+    )
+    if rows:
+        # 最后一笔记录被删除或移走的汇总行；尚未回填的键扣减后同样落在这里
+        db.execute(delete(RecordDailyRollup).where(
+            RecordDailyRollup.user_id.in_({row["user_id"] for row in rows}),
+            RecordDailyRollup.day.in_({row["day"] for row in rows}),
+            RecordDailyRollup.record_count <= 0
+        ))
+
+    for listener in _delta_listeners:
+        listener(db, deltas)
+
+
+def record_rollup_deltas(rows, sign: int = 1) -> dict:
+    """根据记录字段字典计算汇总增量，供绕过 ORM 会话的批量插入使用"""
+    deltas = {}
+    for row in rows:
+        _add_delta(deltas, {field: row.get(field) for field in _ROLLUP_FIELDS}, sign)
+    return deltas
+
+
+@event.listens_for(Session, "before_flush")
+def _maintain_rollups(session, flush_context, instances):
+    """在同一事务内根据新增、修改、删除的记录维护日汇总"""
+    deltas = {}
+
+    for obj in session.new:
+        if isinstance(obj, Record):
+            _add_delta(deltas, {field: getattr(obj, field) for field in _ROLLUP_FIELDS}, 1)
+
+    for obj in session.dirty:
+        if not isinstance(obj, Record) or not session.is_modified(obj):
+            continue
+        old_values = _committed_values(obj)
+        new_values = {field: getattr(obj, field) for field in _ROLLUP_FIELDS}
+        if old_values == new_values:
+            continue
+        _add_delta(deltas, old_values, -1)
+        _add_delta(deltas, new_values, 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, Record):
+            _add_delta(deltas, _committed_values(obj), -1)
+
+    if deltas:
+        apply_rollup_deltas(session, deltas)
+
+
+def rebuild_rollups(db: Session, user_id: int = None) -> int:
+    """从 records 全量重建日汇总（可限定用户），返回写入的汇总行数"""
+    delete_query = db.query(RecordDailyRollup)
+    if user_id is not None:
+        delete_query = delete_query.filter(RecordDailyRollup.user_id == user_id)
+    delete_query.delete(synchronize_session=False)
+
+    day = func.date(Record.date)
+    source = db.query(
+        Record.user_id,
+        day,
+        Record.type,
+        Record.category_id,
+        Record.project_id,
+        func.coalesce(Record.category_id, NULL_KEY),
+        func.coalesce(Record.project_id, NULL_KEY),
+        func.sum(Record.amount),
+        func.count(Record.id)
+    )
+    if user_id is not None:
+        source = source.filter(Record.user_id == user_id)
+    source = source.group_by(
+        Record.user_id, day, Record.type, Record.category_id, Record.project_id
+    )
+
+    result = db.execute(
+        insert(RecordDailyRollup).from_select(
+            [
+                "user_id", "day", "type", "category_id", "project_id",
+                "category_key", "project_key", "total_amount", "record_count"
+            ],
+            source.statement
+        )
+    )
+    db.commit()
+    return result.rowcount
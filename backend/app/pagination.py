@@ -0,0 +1,44 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+
+from app.models.record import Record
+
+
+def encode_cursor(payload: dict) -> str:
+    """把排序键编码为不透明游标"""
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, parse):
+    """解析游标，parse 把载荷字典转换为排序键，格式不对时返回 400"""
+    try:
+        return parse(json.loads(base64.urlsafe_b64decode(cursor.encode("ascii"))))
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="游标无效"
+        )
+
+
+def encode_record_cursor(record: Record) -> str:
+    """记录按 (date desc, id desc) 分页的游标"""
+    return encode_cursor({"d": record.date.isoformat(), "i": record.id})
+
+
+def decode_record_cursor(cursor: str):
+    """解析记录游标，返回 (date, id)"""
+    return decode_cursor(cursor, lambda p: (datetime.fromisoformat(p["d"]), int(p["i"])))
+
+
+def after_record_cursor(query, cursor: str):
+    """按 (date desc, id desc) 取游标之后的记录"""
+    last_date, last_id = decode_record_cursor(cursor)
+    return query.filter(or_(
+        Record.date < last_date,
+        and_(Record.date == last_date, Record.id < last_id)
+    ))
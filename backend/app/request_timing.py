@@ -0,0 +1,119 @@
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RequestDBStats:
+    """一次请求内执行的 SQL 语句数和累计耗时"""
+
+    def __init__(self, keep_statements: int = 0):
+        self.queries = 0
+        self.db_time_ms = 0.0
+        self.keep_statements = keep_statements
+        self.statements = []  # [(耗时毫秒, SQL)]，仅开启慢请求日志时记录
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        self.queries += 1
+        self.db_time_ms += elapsed_ms
+        if len(self.statements) < self.keep_statements:
+            self.statements.append((round(elapsed_ms, 3), statement))
+
+
+_current_stats: ContextVar[Optional[RequestDBStats]] = ContextVar("request_db_stats", default=None)
+
+
+def current_db_stats() -> Optional[RequestDBStats]:
+    """当前请求的统计；不在请求中（迁移、脚本等）时为 None"""
+    return _current_stats.get()
+
+
+# 挂在 Engine 类上，同步引擎和异步引擎（其 sync_engine）的语句都会计入
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    if stats is None or not conn.info.get("query_start"):
+        return
+    stats.record(statement, (time.perf_counter() - conn.info["query_start"].pop()) * 1000)
+
+
+def server_timing(stats: RequestDBStats, total_ms: float) -> str:
+    return (
+        f'db;dur={stats.db_time_ms:.3f};desc="{stats.queries} queries", '
+        f"app;dur={total_ms:.3f}"
+    )
+
+
+class RequestTimingMiddleware:
+    """统计每个请求的 SQL 语句数和数据库耗时
+
+    响应头带 Server-Timing（db 为响应开始前的数据库耗时，app 为总耗时），
+    响应结束后写一条带结构化字段的日志；超过 SLOW_REQUEST_MS 的请求另写一条警告，附带执行的语句。
+    流式响应在响应开始后执行的查询只计入日志。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.REQUEST_TIMING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        keep_statements = settings.SLOW_REQUEST_MAX_STATEMENTS if settings.SLOW_REQUEST_MS > 0 else 0
+        stats = RequestDBStats(keep_statements=keep_statements)
+        token = _current_stats.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                total_ms = (time.perf_counter() - start) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(stats, total_ms).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_stats.reset(token)
+            self._log(scope, status_code, stats, (time.perf_counter() - start) * 1000)
+
+    @staticmethod
+    def _log(scope, status_code: int, stats: RequestDBStats, duration_ms: float) -> None:
+        fields = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status_code,
+            "duration_ms": round(duration_ms, 3),
+            "db_queries": stats.queries,
+            "db_time_ms": round(stats.db_time_ms, 3)
+        }
+        logger.info(
+            "%s %s %s %.1fms db_queries=%d db_time=%.1fms",
+            fields["method"], fields["path"], status_code, duration_ms, stats.queries, stats.db_time_ms,
+            extra=fields
+        )
+        if 0 < settings.SLOW_REQUEST_MS <= duration_ms:
+            logger.warning(
+                "慢请求 %s %s %.1fms db_queries=%d db_time=%.1fms\n%s",
+                fields["method"], fields["path"], duration_ms, stats.queries, stats.db_time_ms,
+                "\n".join(f"  [{elapsed:.1f}ms] {statement}" for elapsed, statement in stats.statements),
+                extra={**fields, "statements": stats.statements}
+            )
@@ -1,14 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 from pydantic import BaseModel, EmailStr
 
 from app.config import settings
-from app.database import get_db
+from app.database import get_session
 from app.models.user import User
 from app.models.invitation import Invitation
 from app.auth.jwt import create_access_token, get_current_user
-from app.auth.password import verify_password
+from app.auth.password import verify_password_async, get_password_hash_async
 from app.schemas.auth import Token, LoginRequest, RegisterRequest, MessageResponse
 from app.schemas.user import UserCreate, UserResponse
 
@@ -22,27 +23,27 @@ router = APIRouter(prefix="/auth", tags=["认证"])
 
 
 @router.post("/register", response_model=MessageResponse, status_code=status.HTTP_201_CREATED)
-async def register(request: RegisterRequest, db: Session = Depends(get_db)):
+async def register(request: RegisterRequest, db: AsyncSession = Depends(get_session)):
     """用户注册（需要邀请码）"""
     # 检查用户名是否已存在
-    if db.query(User).filter(User.username == request.username).first():
+    if await db.scalar(select(User.id).where(User.username == request.username)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="用户名已存在"
         )
     
     # 检查邮箱是否已注册
-    if db.query(User).filter(User.email == request.email).first():
+    if await db.scalar(select(User.id).where(User.email == request.email)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="邮箱已被注册"
         )
     
     # 验证邀请码
-    invitation = db.query(Invitation).filter(
+    invitation = await db.scalar(select(Invitation).where(
         Invitation.code == request.invitation_code,
         Invitation.is_active == True
-    ).first()
+    ))
     
     if not invitation:
         raise HTTPException(
@@ -66,20 +67,19 @@ async def register(request: RegisterRequest, db: Session = Depends(get_db)):
             detail="邀请码已失效"
         )
     
-    # 创建用户
-    from app.auth.password import get_password_hash
+    # 创建用户（bcrypt 在线程池中计算，不阻塞其他请求）
     user = User(
         username=request.username,
         email=request.email,
-        hashed_password=get_password_hash(request.password)
+        hashed_password=await get_password_hash_async(request.password)
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     
     # 使用邀请码
     invitation.use()
-    db.commit()
+    await db.commit()
     
     return {"message": "注册成功"}
 
@@ -87,13 +87,13 @@ async def register(request: RegisterRequest, db: Session = Depends(get_db)):
 @router.post("/login", response_model=Token)
 async def login(
     request: LoginForm,  # ← 使用 JSON 格式
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
     """用户登录 (JSON 格式)"""
     # 通过 email 查找用户
-    user = db.query(User).filter(User.email == request.email).first()
+    user = await db.scalar(select(User).where(User.email == request.email))
     
-    if not user or not verify_password(request.password, user.hashed_password):
+    if not user or not await verify_password_async(request.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="邮箱或密码错误",
@@ -140,7 +140,7 @@ class RefreshTokenRequest(BaseModel):
 @router.post("/refresh", response_model=Token)
 async def refresh_token(
     request: RefreshTokenRequest,  # ← 使用 JSON 格式
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
     """刷新访问令牌 (JSON 格式)"""
     from app.auth.jwt import decode_token
@@ -154,7 +154,7 @@ async def refresh_token(
             detail="无效的刷新令牌"
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).where(User.id == user_id))
     
     if not user or not user.is_active:
         raise HTTPException(
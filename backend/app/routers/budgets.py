@@ -1,21 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
-from datetime import datetime
+from datetime import date, datetime
 
-from app.database import get_db
+from app.database import get_session
 from app.models.user import User
 from app.models.budget import Budget, BudgetPeriodType
-from app.models.record import Record, RecordType
+from app.models.budget_usage import BudgetPeriodUsage, alert_level, period_start, period_end
 from app.models.category import Category
 from app.auth.jwt import get_current_user
+from app.budget_alerts import budget_alert_broker
+from app.cache import cached_count, data_version_etag
 from app.schemas.budget import (
     BudgetResponse,
     BudgetCreate,
     BudgetUpdate,
     BudgetListResponse,
-    BudgetAlert
+    BudgetAlert,
+    BudgetUsageHistoryResponse
 )
 
 router = APIRouter(prefix="/budgets", tags=["预算管理"])
@@ -29,25 +36,30 @@ class AlertsResponse(BaseModel):
 async def get_budgets(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    include_total: bool = Query(True, description="是否返回总数"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
     """获取预算列表（支持分页）"""
-    query = db.query(Budget).filter(Budget.user_id == current_user.id)
+    query = select(Budget).where(Budget.user_id == current_user.id)
     
-    # 获取总数
-    total = query.count()
+    # 获取总数（可关闭，结果按数据版本缓存）
+    total = None
+    if include_total:
+        total = await cached_count(db, query, current_user, "budgets.total", {})
     
-    # 分页
-    budgets = query.order_by(Budget.created_at.desc()).offset(
+    # 分页（多取一条判断是否还有下一页）
+    budgets = (await db.scalars(query.order_by(Budget.created_at.desc()).offset(
         (page - 1) * page_size
-    ).limit(page_size).all()
+    ).limit(page_size + 1))).all()
+    has_more = len(budgets) > page_size
     
     return {
-        "budgets": budgets,
+        "budgets": budgets[:page_size],
         "total": total,
         "page": page,
-        "page_size": page_size
+        "page_size": page_size,
+        "has_more": has_more
     }
 
 
@@ -55,15 +67,15 @@ async def get_budgets(
 async def create_budget(
     budget_data: BudgetCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
     """创建预算"""
     # 验证分类存在（如果提供了category_id）
     if budget_data.category_id:
-        category = db.query(Category).filter(
+        category = await db.scalar(select(Category).where(
             Category.id == budget_data.category_id,
             Category.user_id == current_user.id
-        ).first()
+        ))
         if not category:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -76,13 +88,13 @@ async def create_budget(
         period_type=BudgetPeriodType(budget_data.period_type),
         start_date=budget_data.start_date,
         end_date=budget_data.end_date,
-        category_id=budget_data.category_id,
+        category_id=budget_data.category_id or None,
         user_id=current_user.id
     )
     
     db.add(budget)
-    db.commit()
-    db.refresh(budget)
+    await db.commit()
+    await db.refresh(budget)
     
     return budget
 
@@ -90,83 +102,118 @@ async def create_budget(
 @router.get("/alerts", response_model=AlertsResponse)
 async def get_budget_alerts(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    etag: str = Depends(data_version_etag(vary_by_day=True)),
+    db: AsyncSession = Depends(get_session)
 ):
-    """获取超支提醒"""
-    alerts = []
+    """获取超支提醒
+
+    按预算的周期类型（自然月 / 自然年）只统计当前周期的支出，
+    读取预先维护的分期用量，成本与预算个数成正比，与记录数无关。
+    """
+    today = date.today()
+    month_start = period_start(BudgetPeriodType.MONTHLY, today)
+    year_start = period_start(BudgetPeriodType.YEARLY, today)
+    current_start = case(
+        (Budget.period_type == BudgetPeriodType.YEARLY, year_start),
+        else_=month_start
+    )
     
-    # 获取所有激活的预算
-    budgets = db.query(Budget).filter(
+    rows = (await db.execute(select(
+        Budget.id,
+        Budget.name,
+        Budget.amount,
+        Budget.period_type,
+        Category.name,
+        func.coalesce(BudgetPeriodUsage.spent_amount, 0.0)
+    ).outerjoin(
+        Category, Category.id == Budget.category_id
+    ).outerjoin(
+        BudgetPeriodUsage,
+        and_(
+            BudgetPeriodUsage.budget_id == Budget.id,
+            BudgetPeriodUsage.period_start == current_start
+        )
+    ).where(
         Budget.user_id == current_user.id,
         Budget.is_active == True
-    ).all()
+    ).order_by(Budget.id))).all()
     
-    for budget in budgets:
-        # 计算该预算周期内的已花费金额
-        filters = [
-            Category.user_id == current_user.id,
-            Record.type == RecordType.EXPENSE,
-            Record.date >= budget.start_date,
-        ]
-        
-        # 如果有结束日期，只计算到结束日期
-        if budget.end_date is not None:
-            filters.append(Record.date <= budget.end_date)
-        
-        spent_amount = db.query(Record).join(Category).filter(*filters)
-        
-        # 如果预算有分类限制，只计算该分类的支出
-        if budget.category_id:
-            spent_amount = spent_amount.filter(Category.id == budget.category_id)
-        
-        spent_amount = spent_amount.with_entities(Record.amount).all()
-        total_spent = sum([s[0] for s in spent_amount]) if spent_amount else 0.0
-        
-        remaining = budget.amount - total_spent
+    alerts = []
+    for budget_id, budget_name, budget_amount, period_type, category_name, total_spent in rows:
+        remaining = budget_amount - total_spent
         
         # 判断警告类型
-        usage_ratio = total_spent / budget.amount if budget.amount > 0 else 0
-        
-        if usage_ratio >= 1.0:
-            alert_type = "over_budget"
-        elif usage_ratio >= 0.8:
-            alert_type = "warning"
-        else:
+        alert_type = alert_level(total_spent, budget_amount)
+        if alert_type is None:
             continue  # 没有达到警告阈值，跳过
         
-        # 获取分类名称
-        category_name = None
-        if budget.category_id:
-            category = db.query(Category).filter(Category.id == budget.category_id).first()
-            if category:
-                category_name = category.name
-        
-        alert = {
-            "budget_id": budget.id,
-            "budget_name": budget.name,
+        start = period_start(period_type, today)
+        alerts.append({
+            "budget_id": budget_id,
+            "budget_name": budget_name,
             "category_name": category_name,
-            "budget_amount": budget.amount,
+            "budget_amount": budget_amount,
             "spent_amount": total_spent,
             "remaining_amount": remaining,
-            "alert_type": alert_type
-        }
-        
-        alerts.append(alert)
+            "alert_type": alert_type,
+            "period_start": start,
+            "period_end": period_end(period_type, start)
+        })
     
     return {"alerts": alerts}
 
 
+# 提醒推送连接上无事件时发送心跳注释的间隔（秒）
+ALERT_STREAM_KEEPALIVE_SECONDS = 15
+
+
+@router.get("/alerts/stream")
+async def stream_budget_alerts(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_session)
+):
+    """订阅超支提醒（Server-Sent Events）
+
+    只在记录写入使某个预算当前周期的支出越过 80% 或 100% 时推送 budget_alert 事件，
+    数据格式同 /budgets/alerts 中的单条提醒。
+    """
+    user_id = current_user.id
+    # 连接会长时间保持，提前归还数据库连接
+    await db.close()
+    queue = budget_alert_broker.subscribe(user_id)
+    
+    async def events():
+        try:
+            yield ": connected\n\n"
+            while not await request.is_disconnected():
+                try:
+                    alert = await asyncio.wait_for(queue.get(), timeout=ALERT_STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield "event: budget_alert\ndata: " + json.dumps(alert, ensure_ascii=False) + "\n\n"
+        finally:
+            budget_alert_broker.unsubscribe(user_id, queue)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/{budget_id}", response_model=BudgetResponse)
 async def get_budget(
     budget_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
     """获取预算详情"""
-    budget = db.query(Budget).filter(
+    budget = await db.scalar(select(Budget).where(
         Budget.id == budget_id,
         Budget.user_id == current_user.id
-    ).first()
+    ))
     
     if not budget:
         raise HTTPException(
@@ -177,18 +224,58 @@ async def get_budget(
     return budget
 
 
+@router.get("/{budget_id}/usage", response_model=BudgetUsageHistoryResponse)
+async def get_budget_usage(
+    budget_id: int,
+    limit: int = Query(12, ge=1, le=120, description="返回最近的周期数"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_session)
+):
+    """获取预算各周期的用量（按周期倒序，只含有支出的周期）"""
+    budget = await db.scalar(select(Budget).where(
+        Budget.id == budget_id,
+        Budget.user_id == current_user.id
+    ))
+    
+    if not budget:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="预算不存在"
+        )
+    
+    usages = (await db.scalars(select(BudgetPeriodUsage).where(
+        BudgetPeriodUsage.budget_id == budget.id
+    ).order_by(BudgetPeriodUsage.period_start.desc()).limit(limit))).all()
+    
+    return {
+        "budget_id": budget.id,
+        "period_type": budget.period_type,
+        "budget_amount": budget.amount,
+        "periods": [
+            {
+                "period_start": usage.period_start,
+                "period_end": period_end(budget.period_type, usage.period_start),
+                "spent_amount": usage.spent_amount,
+                "record_count": usage.record_count,
+                "remaining_amount": budget.amount - usage.spent_amount
+            }
+            for usage in usages
+        ]
+    }
+
+
 @router.put("/{budget_id}", response_model=BudgetResponse)
 async def update_budget(
     budget_id: int,
     budget_data: BudgetUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
     """更新预算"""
-    budget = db.query(Budget).filter(
+    budget = await db.scalar(select(Budget).where(
         Budget.id == budget_id,
         Budget.user_id == current_user.id
-    ).first()
+    ))
     
     if not budget:
         raise HTTPException(
@@ -199,16 +286,17 @@ async def update_budget(
     # 验证分类存在（如果提供了category_id）
     if budget_data.category_id is not None:
         if budget_data.category_id:
-            category = db.query(Category).filter(
+            category = await db.scalar(select(Category).where(
                 Category.id == budget_data.category_id,
                 Category.user_id == current_user.id
-            ).first()
+            ))
             if not category:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="分类不存在"
                 )
-        budget.category_id = budget_data.category_id
+        # category_id=0 表示清除分类限制，存为 NULL（统计全部分类）
+        budget.category_id = budget_data.category_id or None
     
     # 更新字段
     if budget_data.name is not None:
@@ -229,8 +317,8 @@ async def update_budget(
     if budget_data.is_active is not None:
         budget.is_active = budget_data.is_active
     
-    db.commit()
-    db.refresh(budget)
+    await db.commit()
+    await db.refresh(budget)
     
     return budget
 
@@ -239,13 +327,13 @@ async def update_budget(
 async def delete_budget(
     budget_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
     """删除预算"""
-    budget = db.query(Budget).filter(
+    budget = await db.scalar(select(Budget).where(
         Budget.id == budget_id,
         Budget.user_id == current_user.id
-    ).first()
+    ))
     
     if not budget:
         raise HTTPException(
@@ -253,7 +341,7 @@ async def delete_budget(
             detail="预算不存在"
         )
     
-    db.delete(budget)
-    db.commit()
+    await db.delete(budget)
+    await db.commit()
     
     return {"message": "预算删除成功"}
@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
 
-from app.database import get_db
+from app.database import get_session
 from app.models.category import Category, CategoryType, CategoryLevel
 from app.models.user import User
 from app.auth.jwt import get_current_user
+from app.cache import data_version_etag
 from app.schemas.category import CategoryResponse, CategoryCreate, CategoryUpdate, CategoryListResponse
 
 router = APIRouter(prefix="/categories", tags=["分类管理"])
@@ -15,19 +17,20 @@ router = APIRouter(prefix="/categories", tags=["分类管理"])
 async def get_categories(
     type: Optional[CategoryType] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    etag: str = Depends(data_version_etag()),
+    db: AsyncSession = Depends(get_session)
 ):
     """获取一级分类列表"""
-    query = db.query(Category).filter(
+    query = select(Category).where(
         Category.user_id == current_user.id,
         Category.level == CategoryLevel.PRIMARY,
         Category.is_active == True
     )
     
     if type:
-        query = query.filter(Category.type == type)
+        query = query.where(Category.type == type)
     
-    categories = query.order_by(Category.sort_order.asc(), Category.id.asc()).all()
+    categories = (await db.scalars(query.order_by(Category.sort_order.asc(), Category.id.asc()))).all()
     return {"categories": categories}
 
 
@@ -35,16 +38,16 @@ async def get_categories(
 async def create_category(
     category_data: CategoryCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
     """创建一级分类"""
     # 检查分类名称是否重复
-    existing = db.query(Category).filter(
+    existing = await db.scalar(select(Category).where(
         Category.name == category_data.name,
         Category.user_id == current_user.id,
         Category.level == CategoryLevel.PRIMARY,
         Category.is_active == True
-    ).first()
+    ).limit(1))
     
     if existing:
         raise HTTPException(
@@ -65,8 +68,8 @@ async def create_category(
     )
     
     db.add(category)
-    db.commit()
-    db.refresh(category)
+    await db.commit()
+    await db.refresh(category)
     
     return category
 
@@ -76,14 +79,14 @@ async def update_category(
     category_id: int,
     category_data: CategoryUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
     """更新分类"""
-    category = db.query(Category).filter(
+    category = await db.scalar(select(Category).where(
         Category.id == category_id,
         Category.user_id == current_user.id,
         Category.is_active == True
-    ).first()
+    ))
     
     if not category:
         raise HTTPException(
@@ -94,12 +97,12 @@ async def update_category(
     # 更新字段
     if category_data.name:
         # 检查名称是否重复
-        existing = db.query(Category).filter(
+        existing = await db.scalar(select(Category).where(
             Category.name == category_data.name,
             Category.user_id == current_user.id,
             Category.id != category_id,
             Category.is_active == True
-        ).first()
+        ).limit(1))
         
         if existing:
             raise HTTPException(
@@ -117,8 +120,8 @@ async def update_category(
     if category_data.sort_order is not None:
         category.sort_order = category_data.sort_order
     
-    db.commit()
-    db.refresh(category)
+    await db.commit()
+    await db.refresh(category)
     
     return category
 
@@ -127,14 +130,14 @@ async def update_category(
 async def delete_category(
     category_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
     """删除分类（软删除）"""
-    category = db.query(Category).filter(
+    category = await db.scalar(select(Category).where(
         Category.id == category_id,
         Category.user_id == current_user.id,
         Category.is_active == True
-    ).first()
+    ))
     
     if not category:
         raise HTTPException(
@@ -146,12 +149,12 @@ async def delete_category(
     category.is_active = False
     
     # 同时删除所有子分类
-    db.query(Category).filter(
+    await db.execute(update(Category).where(
         Category.parent_id == category_id,
         Category.user_id == current_user.id
-    ).update({"is_active": False})
+    ).values(is_active=False))
     
-    db.commit()
+    await db.commit()
     
     return {"message": "分类删除成功"}
 
@@ -161,10 +164,10 @@ async def get_secondary_categories(
     parent_id: Optional[int] = None,
     type: Optional[CategoryType] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
     """获取二级分类（按父分类筛选）"""
-    query = db.query(Category).filter(
+    query = select(Category).where(
         Category.user_id == current_user.id,
         Category.level == CategoryLevel.SECONDARY,
         Category.is_active == True
@@ -172,12 +175,12 @@ async def get_secondary_categories(
     
     if parent_id:
         # 验证父分类是否存在
-        parent = db.query(Category).filter(
+        parent = await db.scalar(select(Category).where(
             Category.id == parent_id,
             Category.user_id == current_user.id,
             Category.level == CategoryLevel.PRIMARY,
             Category.is_active == True
-        ).first()
+        ))
         
         if not parent:
             raise HTTPException(
@@ -185,12 +188,12 @@ async def get_secondary_categories(
                 detail="父分类不存在"
             )
         
-        query = query.filter(Category.parent_id == parent_id)
+        query = query.where(Category.parent_id == parent_id)
     
     if type:
-        query = query.filter(Category.type == type)
+        query = query.where(Category.type == type)
     
-    categories = query.order_by(Category.sort_order.asc(), Category.id.asc()).all()
+    categories = (await db.scalars(query.order_by(Category.sort_order.asc(), Category.id.asc()))).all()
     
     return {"categories": categories}
 
@@ -199,7 +202,7 @@ async def get_secondary_categories(
 async def create_secondary_category(
     category_data: CategoryCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
     """创建二级分类"""
     if not category_data.parent_id:
@@ -209,12 +212,12 @@ async def create_secondary_category(
         )
     
     # 验证父分类
-    parent = db.query(Category).filter(
+    parent = await db.scalar(select(Category).where(
         Category.id == category_data.parent_id,
         Category.user_id == current_user.id,
         Category.level == CategoryLevel.PRIMARY,
         Category.is_active == True
-    ).first()
+    ))
     
     if not parent:
         raise HTTPException(
@@ -223,13 +226,13 @@ async def create_secondary_category(
         )
     
     # 检查分类名称是否在同一父分类下重复
-    existing = db.query(Category).filter(
+    existing = await db.scalar(select(Category).where(
         Category.name == category_data.name,
         Category.parent_id == category_data.parent_id,
         Category.user_id == current_user.id,
         Category.level == CategoryLevel.SECONDARY,
         Category.is_active == True
-    ).first()
+    ).limit(1))
     
     if existing:
         raise HTTPException(
@@ -251,8 +254,8 @@ async def create_secondary_category(
     )
     
     db.add(category)
-    db.commit()
-    db.refresh(category)
+    await db.commit()
+    await db.refresh(category)
     
     return category
 
@@ -261,17 +264,17 @@ async def create_secondary_category(
 async def get_preset_categories(
     type: Optional[CategoryType] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
     """获取系统预设分类"""
-    query = db.query(Category).filter(
+    query = select(Category).where(
         Category.is_system == True,
         Category.is_active == True
     )
     
     if type:
-        query = query.filter(Category.type == type)
+        query = query.where(Category.type == type)
     
-    categories = query.order_by(Category.sort_order.asc(), Category.id.asc()).all()
+    categories = (await db.scalars(query.order_by(Category.sort_order.asc(), Category.id.asc()))).all()
     
     return {"categories": categories}
@@ -0,0 +1,73 @@
+import secrets
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from pydantic import BaseModel
+from typing import List, Optional
+
+from app.config import settings
+from app.database import async_engine, engine
+from app.db_pool import pools_status
+from app.cache import result_cache
+
+
+def require_ops_token(x_ops_token: Optional[str] = Header(None)):
+    """运维接口鉴权：请求头 X-Ops-Token 必须与 OPS_TOKEN 一致
+
+    指标是进程级的（所有用户共享），不对普通登录用户开放；未配置 OPS_TOKEN 时运维接口不可用。
+    """
+    if not settings.OPS_TOKEN or not x_ops_token or not secrets.compare_digest(
+        x_ops_token.encode("utf-8"), settings.OPS_TOKEN.encode("utf-8")
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not Found"
+        )
+
+
+router = APIRouter(prefix="/ops", tags=["运维监控"], dependencies=[Depends(require_ops_token)])
+
+
+class CacheStatsResponse(BaseModel):
+    enabled: bool
+    backend: str
+    hits: int
+    misses: int
+    hit_rate: float
+
+
+class PoolWaitBucketResponse(BaseModel):
+    le_ms: Optional[int]  # 桶上界，None 表示无穷大
+    count: int
+
+
+class PoolStatsResponse(BaseModel):
+    name: str
+    pool_class: str
+    size: Optional[int] = None
+    checked_out: Optional[int] = None
+    checked_in: Optional[int] = None
+    overflow: Optional[int] = None
+    max_overflow: Optional[int] = None
+    timeout: Optional[float] = None
+    pre_ping: Optional[str] = None
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_avg_ms: float = 0.0
+    wait_max_ms: float = 0.0
+    wait_histogram: List[PoolWaitBucketResponse] = []
+
+
+class PoolsResponse(BaseModel):
+    pid: int
+    pools: List[PoolStatsResponse]
+
+
+@router.get("/cache", response_model=CacheStatsResponse)
+async def get_cache_stats():
+    """获取结果缓存命中统计（当前进程）"""
+    return result_cache.stats()
+
+
+@router.get("/pool", response_model=PoolsResponse)
+async def get_pool_stats():
+    """获取数据库连接池状态和获取连接的等待时间分布（按 worker 进程统计）"""
+    return pools_status({"sync": engine, "async": async_engine})
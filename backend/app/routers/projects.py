@@ -1,51 +1,90 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, undefer_group
 from typing import Optional, List
 
-from app.database import get_db
+from app.database import get_session
 from app.models.user import User
 from app.models.project import Project, ProjectStatus
 from app.models.record import Record, RecordType
+from app.models.rollup import RecordDailyRollup
 from app.auth.jwt import get_current_user
+from app.cache import cached_count
+from app.pagination import after_record_cursor, encode_record_cursor
 from app.schemas.project import (
     ProjectResponse,
     ProjectCreate,
     ProjectUpdate,
     ProjectListResponse,
-    ProjectStats
+    ProjectStats,
+    ProjectDetailResponse,
+    ProjectRecordsResponse
 )
 
 router = APIRouter(prefix="/projects", tags=["项目管理"])
 
 
+async def _page_totals(db: AsyncSession, project_ids: List[int]) -> dict:
+    """一次分组查询得到一页项目的收支合计 {project_id: (收入, 支出)}"""
+    rows = (await db.execute(select(
+        RecordDailyRollup.project_id,
+        func.sum(case((RecordDailyRollup.type == RecordType.INCOME, RecordDailyRollup.total_amount), else_=0.0)),
+        func.sum(case((RecordDailyRollup.type == RecordType.EXPENSE, RecordDailyRollup.total_amount), else_=0.0))
+    ).where(
+        RecordDailyRollup.project_id.in_(project_ids)
+    ).group_by(RecordDailyRollup.project_id))).all()
+    return {project_id: (income or 0.0, expense or 0.0) for project_id, income, expense in rows}
+
+
 @router.get("", response_model=ProjectListResponse)
 async def get_projects(
     status: Optional[str] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    include_total: bool = Query(True, description="是否返回总数"),
+    include_stats: bool = Query(False, description="是否附带每个项目的收支汇总和预算使用率"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
-    """获取项目列表（支持状态筛选和分页）"""
-    query = db.query(Project).filter(Project.owner_id == current_user.id)
+    """获取项目列表（支持状态筛选和分页）
+
+    include_stats=true 时整页项目的收支在一次分组查询中算出，不必逐个请求统计接口。
+    """
+    query = select(Project).where(Project.owner_id == current_user.id)
     
     # 状态筛选
     if status:
-        query = query.filter(Project.status == status)
+        query = query.where(Project.status == status)
     
-    # 获取总数
-    total = query.count()
+    # 获取总数（可关闭，结果按数据版本缓存）
+    total = None
+    if include_total:
+        total = await cached_count(db, query, current_user, "projects.total", {"status": status})
     
-    # 分页
-    projects = query.order_by(Project.created_at.desc()).offset(
+    # 分页（多取一条判断是否还有下一页）
+    projects = (await db.scalars(query.order_by(Project.created_at.desc()).offset(
         (page - 1) * page_size
-    ).limit(page_size).all()
+    ).limit(page_size + 1))).all()
+    has_more = len(projects) > page_size
+    projects = projects[:page_size]
+    
+    if include_stats and projects:
+        totals = await _page_totals(db, [project.id for project in projects])
+        items = []
+        for project in projects:
+            income, expense = totals.get(project.id, (0.0, 0.0))
+            item = ProjectResponse.model_validate(project).model_dump()
+            item["stats"] = _stats_dict(project.budget, income, expense)
+            items.append(item)
+        projects = items
     
     return {
         "projects": projects,
         "total": total,
         "page": page,
-        "page_size": page_size
+        "page_size": page_size,
+        "has_more": has_more
     }
 
 
@@ -53,7 +92,7 @@ async def get_projects(
 async def create_project(
     project_data: ProjectCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
     """创建项目"""
     project = Project(
@@ -68,25 +107,56 @@ async def create_project(
     )
     
     db.add(project)
-    db.commit()
-    db.refresh(project)
+    await db.commit()
+    await db.refresh(project)
     
     return project
 
 
-@router.get("/{project_id}", response_model=ProjectResponse)
+def _stats_dict(budget: Optional[float], income: float, expense: float) -> dict:
+    """由收支合计组装项目统计"""
+    return {
+        "total_budget": budget or 0.0,
+        "total_expenses": expense,
+        "total_income": income,
+        "balance": income - expense,
+        "budget_usage": round(expense / budget * 100, 2) if budget else None
+    }
+
+
+def _project_stats(project: Project) -> dict:
+    """项目收支统计（需以 undefer_group("totals") 加载项目）"""
+    return _stats_dict(project.budget, project.total_income, project.total_expenses)
+
+
+async def _project_records_page(db: AsyncSession, project_id: int, page_size: int, cursor: Optional[str] = None):
+    """按 (date desc, id desc) 键集分页读取项目记录，返回 (records, has_more)"""
+    query = select(Record).options(joinedload(Record.category)).where(
+        Record.project_id == project_id
+    ).order_by(Record.date.desc(), Record.id.desc())
+    if cursor:
+        query = after_record_cursor(query, cursor)
+    records = (await db.scalars(query.limit(page_size + 1))).all()
+    return records[:page_size], len(records) > page_size
+
+
+@router.get("/{project_id}", response_model=ProjectDetailResponse)
 async def get_project(
     project_id: int,
+    include_records: bool = Query(False, description="是否内嵌第一页记录"),
+    records_limit: int = Query(20, ge=1, le=100, description="内嵌记录条数"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
-    """获取项目详情"""
-    project = db.query(Project).options(
-        joinedload(Project.records)
-    ).filter(
+    """获取项目详情
+
+    统计数据在同一查询中聚合得出；记录默认不返回，
+    需要时内嵌第一页，其余通过 /projects/{id}/records 翻页。
+    """
+    project = await db.scalar(select(Project).options(undefer_group("totals")).where(
         Project.id == project_id,
         Project.owner_id == current_user.id
-    ).first()
+    ))
     
     if not project:
         raise HTTPException(
@@ -94,8 +164,11 @@ async def get_project(
             detail="项目不存在"
         )
     
-    # 转换为字典并添加 records 字段
-    result = {
+    records, has_more = [], False
+    if include_records:
+        records, has_more = await _project_records_page(db, project.id, records_limit)
+    
+    return {
         "id": project.id,
         "name": project.name,
         "description": project.description,
@@ -106,13 +179,40 @@ async def get_project(
         "created_by_id": project.created_by_id,
         "created_at": project.created_at,
         "updated_at": project.updated_at,
-        "records": [
-            {k: v for k, v in record.__dict__.items() if not k.startswith('_sa_')}
-            for record in project.records
-        ]
+        "records": records,
+        "records_next_cursor": encode_record_cursor(records[-1]) if has_more else None,
+        "stats": _project_stats(project)
     }
+
+
+@router.get("/{project_id}/records", response_model=ProjectRecordsResponse)
+async def get_project_records(
+    project_id: int,
+    page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_session)
+):
+    """获取项目记录（按日期倒序，键集分页）"""
+    project = await db.scalar(select(Project.id).where(
+        Project.id == project_id,
+        Project.owner_id == current_user.id
+    ))
+    
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="项目不存在"
+        )
     
-    return result
+    records, has_more = await _project_records_page(db, project_id, page_size, cursor)
+    
+    return {
+        "records": records,
+        "page_size": page_size,
+        "has_more": has_more,
+        "next_cursor": encode_record_cursor(records[-1]) if has_more else None
+    }
 
 
 @router.put("/{project_id}", response_model=ProjectResponse)
@@ -120,13 +220,13 @@ async def update_project(
     project_id: int,
     project_data: ProjectUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
     """更新项目"""
-    project = db.query(Project).filter(
+    project = await db.scalar(select(Project).where(
         Project.id == project_id,
         Project.owner_id == current_user.id
-    ).first()
+    ))
     
     if not project:
         raise HTTPException(
@@ -153,8 +253,8 @@ async def update_project(
     if project_data.end_date is not None:
         project.end_date = project_data.end_date
     
-    db.commit()
-    db.refresh(project)
+    await db.commit()
+    await db.refresh(project)
     
     return project
 
@@ -163,13 +263,13 @@ async def update_project(
 async def delete_project(
     project_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
     """删除项目"""
-    project = db.query(Project).filter(
+    project = await db.scalar(select(Project).where(
         Project.id == project_id,
         Project.owner_id == current_user.id
-    ).first()
+    ))
     
     if not project:
         raise HTTPException(
@@ -177,8 +277,8 @@ async def delete_project(
             detail="项目不存在"
         )
     
-    db.delete(project)
-    db.commit()
+    await db.delete(project)
+    await db.commit()
     
     return {"message": "项目删除成功"}
 
@@ -187,13 +287,13 @@ async def delete_project(
 async def get_project_stats(
     project_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
-    """获取项目统计"""
-    project = db.query(Project).filter(
+    """获取项目统计（收支合计在数据库侧聚合，一次查询）"""
+    project = await db.scalar(select(Project).options(undefer_group("totals")).where(
         Project.id == project_id,
         Project.owner_id == current_user.id
-    ).first()
+    ))
     
     if not project:
         raise HTTPException(
@@ -201,24 +301,4 @@ async def get_project_stats(
             detail="项目不存在"
         )
     
-    # 访问 records 以触发加载
-    records = project.records
-    
-    # 计算统计数据
-    total_budget = project.budget or 0.0
-    total_expenses = sum(
-        record.amount for record in records 
-        if record.type == RecordType.EXPENSE
-    )
-    total_income = sum(
-        record.amount for record in records 
-        if record.type == RecordType.INCOME
-    )
-    balance = total_income - total_expenses
-    
-    return {
-        "total_budget": total_budget,
-        "total_expenses": total_expenses,
-        "total_income": total_income,
-        "balance": balance
-    }
+    return _project_stats(project)
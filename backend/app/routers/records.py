@@ -1,77 +1,123 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+import codecs
+import csv
+import io
+import json
+import zlib
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
 from typing import Optional, List
 from datetime import datetime
 
-from app.database import get_db
+from app.database import get_session
 from app.models.user import User
 from app.models.record import Record, RecordType
-from app.models.category import Category
+from app.models.category import Category, CategoryType
 from app.models.project import Project
+from app.models.rollup import apply_rollup_deltas, record_rollup_deltas
+from app.models.data_version import bump_data_version
+from app.models.record_search import search_records
 from app.auth.jwt import get_current_user
+from app.cache import cached_count, data_version_etag
+from app.pagination import after_record_cursor, decode_cursor, encode_cursor, encode_record_cursor
 from app.schemas.record import (
     RecordResponse,
     RecordCreate,
     RecordUpdate,
     RecordListResponse,
-    RecordWithCategory
+    RecordWithCategory,
+    RecordBatchCreate,
+    RecordBatchResponse,
+    RecordSearchResponse
 )
 
 router = APIRouter(prefix="/records", tags=["记账记录"])
 
 
-@router.get("", response_model=RecordListResponse)
-async def get_records(
-    date_from: Optional[datetime] = None,
-    date_to: Optional[datetime] = None,
-    category_id: Optional[int] = None,
-    type: Optional[RecordType] = None,
-    page: int = Query(1, ge=1),
-    page_size: int = Query(20, ge=1, le=100),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """获取记账记录列表（支持筛选和分页）"""
-    query = db.query(Record).filter(Record.user_id == current_user.id)
+async def _apply_record_filters(query, db: AsyncSession, current_user: User, date_from, date_to, category_id, type):
+    """记录列表 / 导出共用的筛选条件"""
+    query = query.where(Record.user_id == current_user.id)
     
     # 日期范围筛选
     if date_from:
-        query = query.filter(Record.date >= date_from)
+        query = query.where(Record.date >= date_from)
     if date_to:
-        query = query.filter(Record.date <= date_to)
+        query = query.where(Record.date <= date_to)
     
     # 分类筛选
     if category_id:
         # 验证分类存在
-        category = db.query(Category).filter(
+        category = await db.scalar(select(Category.id).where(
             Category.id == category_id,
             Category.user_id == current_user.id,
             Category.is_active == True
-        ).first()
+        ))
         if not category:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="分类不存在"
             )
-        query = query.filter(Record.category_id == category_id)
+        query = query.where(Record.category_id == category_id)
     
     # 类型筛选
     if type:
-        query = query.filter(Record.type == type)
+        query = query.where(Record.type == type)
     
-    # 获取总数
-    total = query.count()
+    return query
+
+
+@router.get("", response_model=RecordListResponse)
+async def get_records(
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    category_id: Optional[int] = None,
+    type: Optional[RecordType] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor，提供时忽略 page"),
+    include_total: bool = Query(True, description="是否返回总数（无限滚动可关闭以省去 COUNT）"),
+    current_user: User = Depends(get_current_user),
+    etag: str = Depends(data_version_etag()),
+    db: AsyncSession = Depends(get_session)
+):
+    """获取记账记录列表（支持筛选和分页）
+
+    传入 cursor 时按 (date, id) 键集分页，成本与翻页深度无关；否则沿用 page 偏移分页。
+    """
+    query = await _apply_record_filters(
+        select(Record), db, current_user, date_from, date_to, category_id, type
+    )
     
-    # 分页
-    records = query.order_by(Record.date.desc(), Record.id.desc()).offset(
-        (page - 1) * page_size
-    ).limit(page_size).all()
+    # 获取总数（可关闭，结果按数据版本缓存）
+    total = None
+    if include_total:
+        total = await cached_count(db, query, current_user, "records.total", {
+            "date_from": date_from,
+            "date_to": date_to,
+            "category_id": category_id,
+            "type": type
+        })
+    
+    # 分页（多取一条判断是否还有下一页）
+    query = query.order_by(Record.date.desc(), Record.id.desc())
+    if cursor:
+        query = after_record_cursor(query, cursor)
+    else:
+        query = query.offset((page - 1) * page_size)
+    records = (await db.scalars(query.limit(page_size + 1))).all()
+    has_more = len(records) > page_size
+    records = records[:page_size]
     
     return {
         "records": records,
         "total": total,
         "page": page,
-        "page_size": page_size
+        "page_size": page_size,
+        "has_more": has_more,
+        "next_cursor": encode_record_cursor(records[-1]) if has_more else None
     }
 
 
@@ -79,14 +125,14 @@ async def get_records(
 async def create_record(
     record_data: RecordCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
     """创建记账记录"""
     # 验证分类存在
-    category = db.query(Category).filter(
+    category = await db.scalar(select(Category).where(
         Category.id == record_data.category_id,
         Category.is_active == True
-    ).first()
+    ))
     
     if not category:
         raise HTTPException(
@@ -96,10 +142,10 @@ async def create_record(
     
     # 如果指定了项目，验证项目存在且属于当前用户
     if record_data.project_id:
-        project = db.query(Project).filter(
+        project = await db.scalar(select(Project).where(
             Project.id == record_data.project_id,
             Project.owner_id == current_user.id
-        ).first()
+        ))
         
         if not project:
             raise HTTPException(
@@ -124,23 +170,476 @@ async def create_record(
     record.payer_per_share = record.calculate_per_share()
     
     db.add(record)
-    db.commit()
-    db.refresh(record)
+    await db.commit()
+    await db.refresh(record)
     
     return record
 
 
+def _insert_record_items(db: Session, current_user: User, items: List[RecordCreate]):
+    """校验并批量插入一批记录（一个事务），返回 (创建条数, [(下标, 错误)])
+
+    引用的分类和项目各用一次 IN 查询校验，合法记录以 executemany 批量插入。
+    """
+    # 一次查询校验所有分类
+    category_ids = {item.category_id for item in items}
+    valid_categories = {
+        row.id for row in db.query(Category.id).filter(
+            Category.id.in_(category_ids),
+            Category.is_active == True
+        )
+    }
+    
+    # 一次查询校验所有项目（必须属于当前用户）
+    project_ids = {item.project_id for item in items if item.project_id}
+    valid_projects = set()
+    if project_ids:
+        valid_projects = {
+            row.id for row in db.query(Project.id).filter(
+                Project.id.in_(project_ids),
+                Project.owner_id == current_user.id
+            )
+        }
+    
+    rows = []
+    errors = []
+    for index, item in enumerate(items):
+        if item.category_id not in valid_categories:
+            errors.append((index, "分类不存在"))
+            continue
+        if item.project_id and item.project_id not in valid_projects:
+            errors.append((index, "项目不存在"))
+            continue
+        
+        record = Record(
+            user_id=current_user.id,
+            category_id=item.category_id,
+            amount=item.amount,
+            type=item.type,
+            description=item.description,
+            date=item.date,
+            payer_count=item.payer_count or 1,
+            is_aa=item.is_aa or False,
+            project_id=item.project_id or None
+        )
+        rows.append({
+            "user_id": record.user_id,
+            "category_id": record.category_id,
+            "amount": record.amount,
+            "type": record.type,
+            "description": record.description,
+            "date": record.date,
+            "payer_count": record.payer_count,
+            "payer_per_share": record.calculate_per_share(),
+            "is_aa": record.is_aa,
+            "project_id": record.project_id
+        })
+    
+    if rows:
+        # executemany 批量插入绕过了会话钩子，需同步维护日汇总和数据版本
+        db.execute(insert(Record), rows)
+        apply_rollup_deltas(db, record_rollup_deltas(rows))
+        bump_data_version(db, {current_user.id}, {row["project_id"] for row in rows})
+        db.commit()
+    
+    return len(rows), errors
+
+
+@router.post("/batch", response_model=RecordBatchResponse)
+async def create_records_batch(
+    batch: RecordBatchCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_session)
+):
+    """批量创建记账记录（一个事务，逐条报告错误）
+
+    校验和批量插入复用同步的 _insert_record_items，通过 run_sync 在会话上执行。
+    """
+    created, errors = await db.run_sync(_insert_record_items, current_user, batch.records)
+    
+    return {
+        "created": created,
+        "failed": len(errors),
+        "errors": [{"index": index, "detail": detail} for index, detail in errors]
+    }
+
+
+# 导入时每批插入的行数
+IMPORT_BATCH_SIZE = 500
+
+# 导入支持映射的目标字段
+IMPORT_FIELDS = {
+    "date", "amount", "type", "category", "category_id",
+    "description", "project_id", "payer_count", "is_aa",
+}
+
+_IMPORT_TYPES = {
+    "income": RecordType.INCOME, "收入": RecordType.INCOME,
+    "expense": RecordType.EXPENSE, "支出": RecordType.EXPENSE,
+}
+
+_IMPORT_DATE_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d", "%Y/%m/%d %H:%M:%S", "%Y/%m/%d")
+
+
+def _parse_import_date(value: str, date_format: Optional[str]) -> datetime:
+    value = value.strip()
+    if date_format:
+        return datetime.strptime(value, date_format)
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    for fmt in _IMPORT_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"无法解析日期: {value}")
+
+
+def _parse_import_row(row: dict, mapping: dict, categories: dict, date_format: Optional[str]) -> RecordCreate:
+    """把一行导入数据按列映射转换为 RecordCreate，失败抛出 ValueError"""
+    values = {}
+    for column, field in mapping.items():
+        value = row.get(column)
+        if value is not None and value.strip() != "":
+            values[field] = value.strip()
+    
+    if "date" not in values or "amount" not in values:
+        raise ValueError("缺少日期或金额")
+    
+    amount = float(values["amount"].replace(",", "").replace("¥", ""))
+    if "type" in values:
+        record_type = _IMPORT_TYPES.get(values["type"].lower())
+        if record_type is None:
+            raise ValueError(f"未知类型: {values['type']}")
+    else:
+        # 银行流水常以负数表示支出
+        record_type = RecordType.EXPENSE if amount < 0 else RecordType.INCOME
+    
+    if "category_id" in values:
+        category_id = int(values["category_id"])
+    elif "category" in values:
+        name = values["category"]
+        category_id = categories.get((name, record_type.value), categories.get(name))
+        if category_id is None:
+            raise ValueError(f"分类不存在: {name}")
+    else:
+        raise ValueError("缺少分类")
+    
+    try:
+        return RecordCreate(
+            category_id=category_id,
+            amount=abs(amount),
+            type=record_type,
+            description=values.get("description"),
+            date=_parse_import_date(values["date"], date_format),
+            payer_count=int(values.get("payer_count", 1)),
+            is_aa=values.get("is_aa", "").lower() in ("1", "true", "yes", "是"),
+            project_id=int(values["project_id"]) if "project_id" in values else None
+        )
+    except ValidationError as e:
+        raise ValueError(e.errors()[0]["msg"])
+
+
+@router.post("/import")
+async def import_records(
+    file: UploadFile = File(..., description="CSV 文件（首行为表头）"),
+    mapping: Optional[str] = Form(None, description='列映射 JSON，如 {"日期": "date", "金额": "amount", "分类": "category"}；缺省时表头即字段名'),
+    date_format: Optional[str] = Form(None, description="日期格式，如 %Y/%m/%d；缺省时自动识别"),
+    encoding: str = Form("utf-8-sig", description="文件编码，如 gbk"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_session)
+):
+    """流式导入 CSV 记账记录
+
+    逐行读取上传文件（不整体载入内存），按列映射转换，分类名称通过内存映射解析为 id，
+    每 IMPORT_BATCH_SIZE 行批量插入并提交一次。响应为 NDJSON：每批一行 progress
+    （含本批的行级错误），最后一行 done 汇总。
+    """
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"不支持的编码: {encoding}"
+        )
+    
+    reader = csv.DictReader(io.TextIOWrapper(file.file, encoding=encoding, newline=""))
+    try:
+        header = reader.fieldnames or []
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="文件编码错误"
+        )
+    except csv.Error as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"文件格式错误: {e}"
+        )
+    
+    # 列映射：表头列名 -> RecordCreate 字段
+    if mapping:
+        try:
+            column_mapping = json.loads(mapping)
+        except ValueError:
+            column_mapping = None
+        if not isinstance(column_mapping, dict):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="列映射必须是 JSON 对象"
+            )
+    else:
+        column_mapping = {column: column for column in header if column in IMPORT_FIELDS}
+    
+    unknown_fields = set(column_mapping.values()) - IMPORT_FIELDS
+    missing_columns = set(column_mapping) - set(header)
+    mapped_fields = set(column_mapping.values())
+    if unknown_fields or missing_columns:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"列映射无效: 未知字段 {sorted(unknown_fields)}，缺失列 {sorted(missing_columns)}"
+        )
+    if not {"date", "amount"} <= mapped_fields or not mapped_fields & {"category", "category_id"}:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="至少需要映射 date、amount 和 category（或 category_id）"
+        )
+    
+    # 分类名称 -> id 的内存映射，优先按 (名称, 类型) 匹配
+    categories = {}
+    for category in await db.execute(select(Category.id, Category.name, Category.type).where(
+        Category.user_id == current_user.id,
+        Category.is_active == True
+    )):
+        category_type = CategoryType(category.type).value
+        categories.setdefault((category.name, category_type), category.id)
+        categories.setdefault(category.name, category.id)
+    
+    async def run_import():
+        processed = created = failed = 0
+        pending = []  # (行号, RecordCreate)
+        
+        async def flush_batch():
+            nonlocal created, failed
+            batch_created, batch_errors = await db.run_sync(
+                _insert_record_items, current_user, [item for _, item in pending]
+            )
+            created += batch_created
+            failed += len(batch_errors)
+            errors = [{"row": pending[index][0], "detail": detail} for index, detail in batch_errors]
+            pending.clear()
+            return errors
+        
+        row_errors = []
+        try:
+            # 数据行号从 2 开始（第 1 行为表头）
+            for line_no, row in enumerate(reader, start=2):
+                processed += 1
+                try:
+                    pending.append((line_no, _parse_import_row(row, column_mapping, categories, date_format)))
+                except ValueError as e:
+                    failed += 1
+                    row_errors.append({"row": line_no, "detail": str(e)})
+                
+                if len(pending) >= IMPORT_BATCH_SIZE:
+                    row_errors.extend(await flush_batch())
+                    yield json.dumps({
+                        "type": "progress",
+                        "processed": processed,
+                        "created": created,
+                        "failed": failed,
+                        "errors": row_errors
+                    }, ensure_ascii=False) + "\n"
+                    row_errors = []
+            
+            if pending:
+                row_errors.extend(await flush_batch())
+        except (csv.Error, ValueError) as e:
+            # 读取中途出错（编码错误、字段超长等）：已提交的批次保留，尚未插入的行计为失败
+            await db.rollback()
+            failed += len(pending)
+            pending.clear()
+            if isinstance(e, UnicodeDecodeError):
+                detail = "文件编码错误，导入中止"
+            else:
+                detail = f"文件格式错误，导入中止: {e}"
+            row_errors.append({"row": processed + 2, "detail": detail})
+        
+        yield json.dumps({
+            "type": "done",
+            "processed": processed,
+            "created": created,
+            "failed": failed,
+            "errors": row_errors
+        }, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(run_import(), media_type="application/x-ndjson")
+
+
+# 导出时每次从数据库游标取回的行数
+EXPORT_CHUNK_SIZE = 1000
+
+EXPORT_COLUMNS = [
+    "id", "date", "type", "amount", "category_id", "category_name", "description",
+    "payer_count", "payer_per_share", "is_aa", "project_id", "created_at",
+]
+
+
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, RecordType):
+        return value.value
+    return value
+
+
+@router.get("/export")
+async def export_records(
+    format: str = Query("csv", description="导出格式: csv 或 jsonl"),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    category_id: Optional[int] = None,
+    type: Optional[RecordType] = None,
+    gzip: bool = Query(False, description="是否 gzip 压缩"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_session)
+):
+    """流式导出记账记录（筛选条件同列表）
+
+    通过服务端游标（yield_per / stream_results）分块读取列值，逐块写出，
+    内存占用与记录总数无关。
+    """
+    if format not in ("csv", "jsonl"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="导出格式必须是 csv 或 jsonl"
+        )
+    
+    # 只查询列值而非 ORM 实体，避免流式读取的行堆积在会话中
+    query = (await _apply_record_filters(
+        select(
+            Record.id,
+            Record.date,
+            Record.type,
+            Record.amount,
+            Record.category_id,
+            Category.name.label("category_name"),
+            Record.description,
+            Record.payer_count,
+            Record.payer_per_share,
+            Record.is_aa,
+            Record.project_id,
+            Record.created_at
+        ).outerjoin(Category, Category.id == Record.category_id),
+        db, current_user, date_from, date_to, category_id, type
+    )).order_by(Record.date.desc(), Record.id.desc())
+    
+    async def partitions():
+        # yield_per 隐含 stream_results，MySQL 下使用非缓冲游标
+        result = await db.stream(query.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+        async for rows in result.partitions():
+            yield rows
+    
+    async def generate_text():
+        if format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+            async for rows in partitions():
+                for row in rows:
+                    writer.writerow([_export_value(v) for v in row])
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()
+        else:
+            async for rows in partitions():
+                yield "".join(
+                    json.dumps(
+                        dict(zip(EXPORT_COLUMNS, (_export_value(v) for v in row))),
+                        ensure_ascii=False
+                    ) + "\n"
+                    for row in rows
+                )
+    
+    async def generate():
+        if not gzip:
+            async for chunk in generate_text():
+                yield chunk.encode("utf-8")
+            return
+        compressor = zlib.compressobj(wbits=31)  # gzip 格式
+        async for chunk in generate_text():
+            data = compressor.compress(chunk.encode("utf-8"))
+            if data:
+                yield data
+        yield compressor.flush()
+    
+    filename = f"records.{format}" + (".gz" if gzip else "")
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    if gzip:
+        media_type = "application/gzip"
+    return StreamingResponse(
+        generate(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/search", response_model=RecordSearchResponse)
+async def search_records_by_description(
+    q: str = Query(..., min_length=1, max_length=100, description="关键词，多个用空格分隔"),
+    type: Optional[RecordType] = None,
+    page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_session)
+):
+    """按备注全文检索记账记录，按相关度排序，键集分页"""
+    if not q.split():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="关键词不能为空"
+        )
+    
+    after = None
+    if cursor:
+        after = decode_cursor(cursor, lambda p: (float(p["s"]), int(p["i"])))
+    
+    # 多取一条判断是否还有下一页
+    rows = await db.run_sync(search_records, current_user.id, q, page_size + 1, after=after, type=type)
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    
+    next_cursor = None
+    if has_more:
+        last_record, last_score = rows[-1]
+        next_cursor = encode_cursor({"s": last_score, "i": last_record.id})
+    
+    return {
+        "records": [
+            {**RecordResponse.model_validate(record).model_dump(), "score": score}
+            for record, score in rows
+        ],
+        "page_size": page_size,
+        "has_more": has_more,
+        "next_cursor": next_cursor
+    }
+
+
 @router.get("/{record_id}", response_model=RecordWithCategory)
 async def get_record(
     record_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
     """获取记账记录详情"""
-    record = db.query(Record).filter(
+    # 响应包含分类，随记录一并加载（异步会话不能在序列化时延迟加载）
+    record = await db.scalar(select(Record).options(joinedload(Record.category)).where(
         Record.id == record_id,
         Record.user_id == current_user.id
-    ).first()
+    ))
     
     if not record:
         raise HTTPException(
@@ -156,13 +655,13 @@ async def update_record(
     record_id: int,
     record_data: RecordUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
     """更新记账记录"""
-    record = db.query(Record).filter(
+    record = await db.scalar(select(Record).where(
         Record.id == record_id,
         Record.user_id == current_user.id
-    ).first()
+    ))
     
     if not record:
         raise HTTPException(
@@ -173,10 +672,10 @@ async def update_record(
     # 更新字段
     if record_data.category_id is not None:
         # 验证分类存在
-        category = db.query(Category).filter(
+        category = await db.scalar(select(Category).where(
             Category.id == record_data.category_id,
             Category.is_active == True
-        ).first()
+        ))
         
         if not category:
             raise HTTPException(
@@ -203,10 +702,10 @@ async def update_record(
     if record_data.project_id is not None:
         if record_data.project_id:
             # 验证项目存在且属于当前用户
-            project = db.query(Project).filter(
+            project = await db.scalar(select(Project).where(
                 Project.id == record_data.project_id,
                 Project.owner_id == current_user.id
-            ).first()
+            ))
             
             if not project:
                 raise HTTPException(
@@ -218,8 +717,8 @@ async def update_record(
     # 重新计算人均分摊
     record.payer_per_share = record.calculate_per_share()
     
-    db.commit()
-    db.refresh(record)
+    await db.commit()
+    await db.refresh(record)
     
     return record
 
@@ -228,13 +727,13 @@ async def update_record(
 async def delete_record(
     record_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
     """删除记账记录"""
-    record = db.query(Record).filter(
+    record = await db.scalar(select(Record).where(
         Record.id == record_id,
         Record.user_id == current_user.id
-    ).first()
+    ))
     
     if not record:
         raise HTTPException(
@@ -242,8 +741,8 @@ async def delete_record(
             detail="记录不存在"
         )
     
-    db.delete(record)
-    db.commit()
+    await db.delete(record)
+    await db.commit()
     
     return {"message": "记录删除成功"}
 
@@ -253,14 +752,14 @@ async def link_record_to_project(
     record_id: int,
     project_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
     """将记账记录关联到项目"""
     # 验证记录存在
-    record = db.query(Record).filter(
+    record = await db.scalar(select(Record).where(
         Record.id == record_id,
         Record.user_id == current_user.id
-    ).first()
+    ))
     
     if not record:
         raise HTTPException(
@@ -269,10 +768,10 @@ async def link_record_to_project(
         )
     
     # 验证项目存在且属于当前用户
-    project = db.query(Project).filter(
+    project = await db.scalar(select(Project).where(
         Project.id == project_id,
         Project.owner_id == current_user.id
-    ).first()
+    ))
     
     if not project:
         raise HTTPException(
@@ -282,8 +781,8 @@ async def link_record_to_project(
     
     # 关联项目
     record.project_id = project_id
-    db.commit()
-    db.refresh(record)
+    await db.commit()
+    await db.refresh(record)
     
     return record
 
@@ -293,14 +792,14 @@ async def unlink_record_from_project(
     record_id: int,
     project_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
     """取消记账记录与项目的关联"""
     # 验证记录存在
-    record = db.query(Record).filter(
+    record = await db.scalar(select(Record).where(
         Record.id == record_id,
         Record.user_id == current_user.id
-    ).first()
+    ))
     
     if not record:
         raise HTTPException(
@@ -317,7 +816,7 @@ async def unlink_record_from_project(
     
     # 取消关联
     record.project_id = None
-    db.commit()
-    db.refresh(record)
+    await db.commit()
+    await db.refresh(record)
     
     return record
@@ -1,16 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, case, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
-from app.database import get_db
+from app.database import get_session
 from app.models.user import User
-from app.models.record import Record, RecordType
+from app.models.record import RecordType
 from app.models.category import Category
 from app.models.project import Project
+from app.models.rollup import RecordDailyRollup
 from app.auth.jwt import get_current_user
+from app.cache import cached_result, data_version_etag
 
 router = APIRouter(prefix="/statistics", tags=["统计分析"])
 
@@ -21,6 +23,7 @@ class MonthlyStatisticsResponse(BaseModel):
     total_income: float
     total_expense: float
     balance: float
+    record_count: int = 0
 
 
 class RangeStatisticsResponse(BaseModel):
@@ -29,6 +32,7 @@ class RangeStatisticsResponse(BaseModel):
     total_income: float
     total_expense: float
     balance: float
+    record_count: int = 0
 
 
 class CategoryStatisticsResponse(BaseModel):
@@ -46,20 +50,124 @@ class ProjectStatisticsResponse(BaseModel):
     balance: float
 
 
+class SeriesPointResponse(BaseModel):
+    bucket_start: str
+    bucket_end: str
+    total_income: float
+    total_expense: float
+    balance: float
+    record_count: int = 0
+
+
+class SeriesResponse(BaseModel):
+    bucket: str
+    date_from: str
+    date_to: str
+    points: List[SeriesPointResponse]
+
+
 class OverviewResponse(BaseModel):
     total_income: float
     total_expense: float
     balance: float
+    record_count: int = 0
     top_categories: List[CategoryStatisticsResponse]
     top_projects: List[ProjectStatisticsResponse]
 
 
+# 收入 / 支出条件聚合表达式，供各统计查询复用（读取日汇总表）
+_income_total = func.coalesce(
+    func.sum(case((RecordDailyRollup.type == RecordType.INCOME, RecordDailyRollup.total_amount), else_=0.0)), 0.0
+)
+_expense_total = func.coalesce(
+    func.sum(case((RecordDailyRollup.type == RecordType.EXPENSE, RecordDailyRollup.total_amount), else_=0.0)), 0.0
+)
+
+
+def _totals_query(*columns):
+    """构建收支汇总查询：一次扫描日汇总同时得到收入、支出和笔数（CASE 条件聚合）
+
+    columns 为附加的分组列，调用方负责 group_by。
+    """
+    return select(
+        *columns,
+        _income_total.label("total_income"),
+        _expense_total.label("total_expense"),
+        func.coalesce(func.sum(RecordDailyRollup.record_count), 0).label("record_count")
+    )
+
+
+def _day_range(date_from: datetime, date_to: datetime):
+    """日汇总表的日期范围条件（按天，包含首尾两天）"""
+    return (
+        RecordDailyRollup.day >= date_from.date(),
+        RecordDailyRollup.day <= date_to.date()
+    )
+
+
+# 时间序列最多返回的桶数，防止按天查询超长区间
+SERIES_MAX_BUCKETS = 1000
+
+SERIES_BUCKETS = ("day", "week", "month", "year")
+
+
+def _bucket_start(day: date, bucket: str) -> date:
+    """日期所在桶的起始日（周以周一开始）"""
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    if bucket == "year":
+        return day.replace(month=1, day=1)
+    return day
+
+
+def _next_bucket_start(start: date, bucket: str) -> date:
+    if bucket == "day":
+        return start + timedelta(days=1)
+    if bucket == "week":
+        return start + timedelta(days=7)
+    if bucket == "month":
+        if start.month == 12:
+            return start.replace(year=start.year + 1, month=1)
+        return start.replace(month=start.month + 1)
+    return start.replace(year=start.year + 1)
+
+
+def _bucket_expr(db: AsyncSession, bucket: str):
+    """数据库侧把日汇总的 day 截断到桶起始日（YYYY-MM-DD）"""
+    day = RecordDailyRollup.day
+    if db.get_bind().dialect.name == "sqlite":
+        if bucket == "week":
+            return func.date(day, "weekday 0", "-6 days")
+        if bucket == "month":
+            return func.strftime("%Y-%m-01", day)
+        if bucket == "year":
+            return func.strftime("%Y-01-01", day)
+        return func.date(day)
+    # MySQL
+    if bucket == "week":
+        return func.date_sub(day, text("INTERVAL WEEKDAY(record_daily_rollups.day) DAY"))
+    if bucket == "month":
+        return func.date_format(day, "%Y-%m-01")
+    if bucket == "year":
+        return func.date_format(day, "%Y-01-01")
+    return func.date(day)
+
+
+async def _summarize(db: AsyncSession, *filters):
+    """按条件汇总收入、支出和笔数"""
+    row = (await db.execute(_totals_query().where(*filters))).one()
+    return row.total_income or 0.0, row.total_expense or 0.0, row.record_count or 0
+
+
 @router.get("/monthly", response_model=MonthlyStatisticsResponse)
+@cached_result("statistics.monthly")
 async def get_monthly_statistics(
     year: int,
     month: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
     """获取月度统计"""
     # 验证月份范围
@@ -78,39 +186,30 @@ async def get_monthly_statistics(
     date_from = datetime(year, month, 1)
     date_to = next_month - timedelta(seconds=1)
     
-    # 查询收入
-    income_result = db.query(func.sum(Record.amount)).filter(
-        Record.user_id == current_user.id,
-        Record.type == RecordType.INCOME,
-        Record.date >= date_from,
-        Record.date <= date_to
-    ).scalar()
-    total_income = income_result or 0.0
-    
-    # 查询支出
-    expense_result = db.query(func.sum(Record.amount)).filter(
-        Record.user_id == current_user.id,
-        Record.type == RecordType.EXPENSE,
-        Record.date >= date_from,
-        Record.date <= date_to
-    ).scalar()
-    total_expense = expense_result or 0.0
+    # 一次查询同时汇总收入和支出
+    total_income, total_expense, record_count = await _summarize(
+        db,
+        RecordDailyRollup.user_id == current_user.id,
+        *_day_range(date_from, date_to)
+    )
     
     return {
         "year": year,
         "month": month,
         "total_income": round(total_income, 2),
         "total_expense": round(total_expense, 2),
-        "balance": round(total_income - total_expense, 2)
+        "balance": round(total_income - total_expense, 2),
+        "record_count": record_count
     }
 
 
 @router.get("/range", response_model=RangeStatisticsResponse)
+@cached_result("statistics.range")
 async def get_range_statistics(
     date_from: str = Query(..., description="开始日期 (YYYY-MM-DD)"),
     date_to: str = Query(..., description="结束日期 (YYYY-MM-DD)"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
     """获取自定义时间段统计"""
     try:
@@ -122,40 +221,105 @@ async def get_range_statistics(
             detail="日期格式必须是 YYYY-MM-DD"
         )
     
-    # 查询收入
-    income_result = db.query(func.sum(Record.amount)).filter(
-        Record.user_id == current_user.id,
-        Record.type == RecordType.INCOME,
-        Record.date >= date_from_dt,
-        Record.date <= date_to_dt
-    ).scalar()
-    total_income = income_result or 0.0
-    
-    # 查询支出
-    expense_result = db.query(func.sum(Record.amount)).filter(
-        Record.user_id == current_user.id,
-        Record.type == RecordType.EXPENSE,
-        Record.date >= date_from_dt,
-        Record.date <= date_to_dt
-    ).scalar()
-    total_expense = expense_result or 0.0
+    # 一次查询同时汇总收入和支出
+    total_income, total_expense, record_count = await _summarize(
+        db,
+        RecordDailyRollup.user_id == current_user.id,
+        *_day_range(date_from_dt, date_to_dt)
+    )
     
     return {
         "date_from": date_from,
         "date_to": date_to,
         "total_income": round(total_income, 2),
         "total_expense": round(total_expense, 2),
-        "balance": round(total_income - total_expense, 2)
+        "balance": round(total_income - total_expense, 2),
+        "record_count": record_count
+    }
+
+
+@router.get("/series", response_model=SeriesResponse)
+@cached_result("statistics.series")
+async def get_series_statistics(
+    bucket: str = Query("month", description="时间粒度: day/week/month/year"),
+    date_from: str = Query(..., description="开始日期 (YYYY-MM-DD)"),
+    date_to: str = Query(..., description="结束日期 (YYYY-MM-DD)"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_session)
+):
+    """获取收支时间序列（图表数据，一次分组查询，空桶补零）"""
+    if bucket not in SERIES_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="时间粒度必须是 day、week、month 或 year"
+        )
+    
+    try:
+        date_from_dt = datetime.strptime(date_from, "%Y-%m-%d")
+        date_to_dt = datetime.strptime(date_to, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="日期格式必须是 YYYY-MM-DD"
+        )
+    
+    if date_from_dt > date_to_dt:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="开始日期不能晚于结束日期"
+        )
+    
+    # 生成所有桶的起始日，用于补零
+    bucket_starts = []
+    current = _bucket_start(date_from_dt.date(), bucket)
+    while current <= date_to_dt.date():
+        bucket_starts.append(current)
+        if len(bucket_starts) > SERIES_MAX_BUCKETS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"时间段过长，最多返回 {SERIES_MAX_BUCKETS} 个数据点"
+            )
+        current = _next_bucket_start(current, bucket)
+    
+    # 一次分组聚合得到所有非空桶
+    bucket_col = _bucket_expr(db, bucket).label("bucket_start")
+    results = (await db.execute(_totals_query(bucket_col).where(
+        RecordDailyRollup.user_id == current_user.id,
+        *_day_range(date_from_dt, date_to_dt)
+    ).group_by(bucket_col))).all()
+    totals = {str(r.bucket_start)[:10]: r for r in results}
+    
+    points = []
+    for start in bucket_starts:
+        end = _next_bucket_start(start, bucket) - timedelta(days=1)
+        r = totals.get(start.isoformat())
+        income = (r.total_income or 0.0) if r else 0.0
+        expense = (r.total_expense or 0.0) if r else 0.0
+        points.append({
+            "bucket_start": start.isoformat(),
+            "bucket_end": end.isoformat(),
+            "total_income": round(income, 2),
+            "total_expense": round(expense, 2),
+            "balance": round(income - expense, 2),
+            "record_count": (r.record_count or 0) if r else 0
+        })
+    
+    return {
+        "bucket": bucket,
+        "date_from": date_from,
+        "date_to": date_to,
+        "points": points
     }
 
 
 @router.get("/categories", response_model=List[CategoryStatisticsResponse])
+@cached_result("statistics.categories")
 async def get_category_statistics(
     date_from: str = Query(..., description="开始日期 (YYYY-MM-DD)"),
     date_to: str = Query(..., description="结束日期 (YYYY-MM-DD)"),
     type: str = Query(..., description="类型: income 或 expense"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
     """获取分类占比统计"""
     try:
@@ -180,16 +344,15 @@ async def get_category_statistics(
         )
     
     # 按分类查询金额
-    results = db.query(
+    results = (await db.execute(select(
         Category.id.label("category_id"),
         Category.name.label("category_name"),
-        func.sum(Record.amount).label("amount")
-    ).outerjoin(Record, Category.id == Record.category_id).filter(
-        Record.user_id == current_user.id,
-        Record.type == record_type,
-        Record.date >= date_from_dt,
-        Record.date <= date_to_dt
-    ).group_by(Category.id, Category.name).all()
+        func.sum(RecordDailyRollup.total_amount).label("amount")
+    ).outerjoin(RecordDailyRollup, Category.id == RecordDailyRollup.category_id).where(
+        RecordDailyRollup.user_id == current_user.id,
+        RecordDailyRollup.type == record_type,
+        *_day_range(date_from_dt, date_to_dt)
+    ).group_by(Category.id, Category.name))).all()
     
     # 计算总金额和百分比
     total_amount = sum(r.amount or 0 for r in results)
@@ -212,54 +375,46 @@ async def get_category_statistics(
 
 
 @router.get("/projects", response_model=List[ProjectStatisticsResponse])
+@cached_result("statistics.projects")
 async def get_project_statistics(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
     """获取项目统计"""
-    # 获取所有项目（包括用户创建的和关联的）
-    projects = db.query(Project).filter(
+    # 一次分组聚合得到所有项目（包括用户创建的和关联的）的收支
+    results = (await db.execute(_totals_query(
+        Project.id.label("project_id"),
+        Project.name.label("project_name")
+    ).select_from(Project).outerjoin(
+        RecordDailyRollup, RecordDailyRollup.project_id == Project.id
+    ).where(
         (Project.owner_id == current_user.id) |
         (Project.created_by_id == current_user.id)
-    ).all()
+    ).group_by(Project.id, Project.name).order_by(Project.name, Project.id))).all()
     
     project_stats = []
-    for project in projects:
-        # 查询项目的收入
-        income_result = db.query(func.sum(Record.amount)).filter(
-            Record.project_id == project.id,
-            Record.type == RecordType.INCOME
-        ).scalar()
-        
-        # 查询项目的支出
-        expense_result = db.query(func.sum(Record.amount)).filter(
-            Record.project_id == project.id,
-            Record.type == RecordType.EXPENSE
-        ).scalar()
-        
-        total_income = income_result or 0.0
-        total_expense = expense_result or 0.0
-        
+    for r in results:
+        total_income = r.total_income or 0.0
+        total_expense = r.total_expense or 0.0
         project_stats.append({
-            "project_id": project.id,
-            "project_name": project.name,
+            "project_id": r.project_id,
+            "project_name": r.project_name,
             "total_income": round(total_income, 2),
             "total_expense": round(total_expense, 2),
             "balance": round(total_income - total_expense, 2)
         })
     
-    # 按项目名称排序
-    project_stats.sort(key=lambda x: x["project_name"])
-    
     return project_stats
 
 
 @router.get("/overview", response_model=OverviewResponse)
+@cached_result("statistics.overview")
 async def get_overview_statistics(
     date_from: Optional[str] = Query(None, description="开始日期 (YYYY-MM-DD)"),
     date_to: Optional[str] = Query(None, description="结束日期 (YYYY-MM-DD)"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    etag: str = Depends(data_version_etag(vary_by_day=True)),
+    db: AsyncSession = Depends(get_session)
 ):
     """获取综合概览"""
     # 如果没有提供日期范围，默认当月
@@ -285,38 +440,26 @@ async def get_overview_statistics(
                 detail="日期格式必须是 YYYY-MM-DD"
             )
     
-    # 查询总收入和支出
-    income_result = db.query(func.sum(Record.amount)).filter(
-        Record.user_id == current_user.id,
-        Record.type == RecordType.INCOME,
-        Record.date >= date_from_dt,
-        Record.date <= date_to_dt
-    ).scalar()
-    
-    expense_result = db.query(func.sum(Record.amount)).filter(
-        Record.user_id == current_user.id,
-        Record.type == RecordType.EXPENSE,
-        Record.date >= date_from_dt,
-        Record.date <= date_to_dt
-    ).scalar()
-    
-    total_income = income_result or 0.0
-    total_expense = expense_result or 0.0
+    # 查询总收入和支出（单次查询）
+    total_income, total_expense, record_count = await _summarize(
+        db,
+        RecordDailyRollup.user_id == current_user.id,
+        *_day_range(date_from_dt, date_to_dt)
+    )
     balance = total_income - total_expense
     
     # 获取 Top 分类（按支出排序）
-    category_results = db.query(
+    category_results = (await db.execute(select(
         Category.id.label("category_id"),
         Category.name.label("category_name"),
-        func.sum(Record.amount).label("amount")
-    ).outerjoin(Record, Category.id == Record.category_id).filter(
-        Record.user_id == current_user.id,
-        Record.type == RecordType.EXPENSE,
-        Record.date >= date_from_dt,
-        Record.date <= date_to_dt
+        func.sum(RecordDailyRollup.total_amount).label("amount")
+    ).outerjoin(RecordDailyRollup, Category.id == RecordDailyRollup.category_id).where(
+        RecordDailyRollup.user_id == current_user.id,
+        RecordDailyRollup.type == RecordType.EXPENSE,
+        *_day_range(date_from_dt, date_to_dt)
     ).group_by(Category.id, Category.name).order_by(
-        func.sum(Record.amount).desc()
-    ).limit(5).all()
+        func.sum(RecordDailyRollup.total_amount).desc()
+    ).limit(5))).all()
     
     top_categories = []
     for r in category_results:
@@ -327,39 +470,39 @@ async def get_overview_statistics(
             "percentage": 0  # 概览中不需要百分比
         })
     
-    # 获取 Top 项目
-    project_results = db.query(Project).filter(
+    # 获取 Top 项目（按支出排序，数据库侧完成排序与截取）
+    project_results = (await db.execute(_totals_query(
+        Project.id.label("project_id"),
+        Project.name.label("project_name")
+    ).select_from(Project).join(
+        RecordDailyRollup, RecordDailyRollup.project_id == Project.id
+    ).where(
         (Project.owner_id == current_user.id) |
-        (Project.created_by_id == current_user.id)
-    ).all()
+        (Project.created_by_id == current_user.id),
+        *_day_range(date_from_dt, date_to_dt)
+    ).group_by(Project.id, Project.name).having(
+        _expense_total > 0
+    ).order_by(
+        _expense_total.desc(), Project.id
+    ).limit(5))).all()
     
     top_projects = []
-    for project in project_results:
-        # 查询项目的支出
-        expense_result = db.query(func.sum(Record.amount)).filter(
-            Record.project_id == project.id,
-            Record.type == RecordType.EXPENSE,
-            Record.date >= date_from_dt,
-            Record.date <= date_to_dt
-        ).scalar()
-        
-        if expense_result and expense_result > 0:
-            top_projects.append({
-                "project_id": project.id,
-                "project_name": project.name,
-                "total_income": 0,
-                "total_expense": round(expense_result, 2),
-                "balance": round(-expense_result, 2)
-            })
-    
-    # 按支出排序
-    top_projects.sort(key=lambda x: x["total_expense"], reverse=True)
-    top_projects = top_projects[:5]
+    for r in project_results:
+        project_income = r.total_income or 0.0
+        project_expense = r.total_expense or 0.0
+        top_projects.append({
+            "project_id": r.project_id,
+            "project_name": r.project_name,
+            "total_income": round(project_income, 2),
+            "total_expense": round(project_expense, 2),
+            "balance": round(project_income - project_expense, 2)
+        })
     
     return {
         "total_income": round(total_income, 2),
         "total_expense": round(total_expense, 2),
         "balance": round(balance, 2),
+        "record_count": record_count,
         "top_categories": top_categories,
         "top_projects": top_projects
     }
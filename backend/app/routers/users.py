@@ -1,8 +1,9 @@
 import secrets
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_session
 from app.models.user import User
 from app.models.invitation import Invitation
 from app.auth.jwt import get_current_user
@@ -22,12 +23,12 @@ async def get_user_profile(current_user: User = Depends(get_current_user)):
 async def update_user_profile(
     user_update: UserUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
     """更新当前登录用户的个人资料"""
     # 检查用户名是否被其他用户使用
     if user_update.username and user_update.username != current_user.username:
-        existing_user = db.query(User).filter(User.username == user_update.username).first()
+        existing_user = await db.scalar(select(User).where(User.username == user_update.username))
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -37,7 +38,7 @@ async def update_user_profile(
     
     # 检查邮箱是否被其他用户使用
     if user_update.email and user_update.email != current_user.email:
-        existing_user = db.query(User).filter(User.email == user_update.email).first()
+        existing_user = await db.scalar(select(User).where(User.email == user_update.email))
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -49,15 +50,15 @@ async def update_user_profile(
     if user_update.is_active is not None:
         current_user.is_active = user_update.is_active
     
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(current_user)
     return current_user
 
 
 @router.get("/invitations", response_model=list[InvitationResponse])
-async def get_user_invitations(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_user_invitations(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_session)):
     """获取当前用户创建的所有邀请码"""
-    invitations = db.query(Invitation).filter(Invitation.created_by_id == current_user.id).all()
+    invitations = (await db.scalars(select(Invitation).where(Invitation.created_by_id == current_user.id))).all()
     return invitations
 
 
@@ -65,7 +66,7 @@ async def get_user_invitations(current_user: User = Depends(get_current_user), d
 async def create_invitation(
     request: CreateInvitationRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ):
     """创建新的邀请码"""
     # 生成邀请码 (8位随机字符串)
@@ -78,7 +79,7 @@ async def create_invitation(
     )
     
     db.add(invitation)
-    db.commit()
-    db.refresh(invitation)
+    await db.commit()
+    await db.refresh(invitation)
     
     return invitation
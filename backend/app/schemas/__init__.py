@@ -7,6 +7,10 @@ from app.schemas.record import (
     RecordUpdate,
     RecordListResponse,
     RecordWithCategory,
+    RecordBatchCreate,
+    RecordBatchResponse,
+    RecordSearchHit,
+    RecordSearchResponse,
 )
 from app.schemas.project import (
     ProjectResponse,
@@ -14,6 +18,9 @@ from app.schemas.project import (
     ProjectUpdate,
     ProjectListResponse,
     ProjectStats,
+    ProjectListItem,
+    ProjectDetailResponse,
+    ProjectRecordsResponse,
 )
 from app.schemas.budget import (
     BudgetResponse,
@@ -21,6 +28,8 @@ from app.schemas.budget import (
     BudgetUpdate,
     BudgetListResponse,
     BudgetAlert,
+    BudgetPeriodUsageResponse,
+    BudgetUsageHistoryResponse,
 )
 
 __all__ = [
@@ -40,14 +49,23 @@ __all__ = [
     "RecordUpdate",
     "RecordListResponse",
     "RecordWithCategory",
+    "RecordBatchCreate",
+    "RecordBatchResponse",
+    "RecordSearchHit",
+    "RecordSearchResponse",
     "ProjectResponse",
     "ProjectCreate",
     "ProjectUpdate",
     "ProjectListResponse",
     "ProjectStats",
+    "ProjectListItem",
+    "ProjectDetailResponse",
+    "ProjectRecordsResponse",
     "BudgetResponse",
     "BudgetCreate",
     "BudgetUpdate",
     "BudgetListResponse",
     "BudgetAlert",
+    "BudgetPeriodUsageResponse",
+    "BudgetUsageHistoryResponse",
 ]
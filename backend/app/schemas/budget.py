@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional, List
 
 
@@ -47,9 +47,10 @@ class BudgetUpdate(BaseModel):
 
 class BudgetListResponse(BaseModel):
     budgets: list[BudgetResponse]
-    total: int
+    total: Optional[int] = None  # include_total=false 时为空
     page: int
     page_size: int
+    has_more: bool = False
 
     class Config:
         from_attributes = True
@@ -63,6 +64,23 @@ class BudgetAlert(BaseModel):
     spent_amount: float
     remaining_amount: float
     alert_type: str  # warning/over_budget
+    period_start: Optional[date] = None  # 当前预算周期
+    period_end: Optional[date] = None
 
     class Config:
         from_attributes = True
+
+
+class BudgetPeriodUsageResponse(BaseModel):
+    period_start: date
+    period_end: date
+    spent_amount: float
+    record_count: int
+    remaining_amount: float
+
+
+class BudgetUsageHistoryResponse(BaseModel):
+    budget_id: int
+    period_type: str  # monthly/yearly
+    budget_amount: float
+    periods: list[BudgetPeriodUsageResponse]  # 按周期倒序
@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional, List, Any
+from typing import Optional, List
+from app.schemas.record import RecordWithCategory
 
 
 class ProjectResponse(BaseModel):
@@ -14,7 +15,6 @@ class ProjectResponse(BaseModel):
     created_by_id: int
     created_at: datetime
     updated_at: Optional[datetime] = None
-    records: Optional[List[Any]] = []
 
     class Config:
         from_attributes = True
@@ -43,21 +43,40 @@ class ProjectUpdate(BaseModel):
         from_attributes = True
 
 
+class ProjectStats(BaseModel):
+    total_budget: Optional[float] = None
+    total_expenses: float
+    total_income: float
+    balance: float
+    budget_usage: Optional[float] = None  # 预算使用率（百分比），未设预算时为空
+
+    class Config:
+        from_attributes = True
+
+
+class ProjectListItem(ProjectResponse):
+    stats: Optional[ProjectStats] = None  # include_stats=true 时返回
+
+
 class ProjectListResponse(BaseModel):
-    projects: list[ProjectResponse]
-    total: int
+    projects: list[ProjectListItem]
+    total: Optional[int] = None  # include_total=false 时为空
     page: int
     page_size: int
+    has_more: bool = False
 
     class Config:
         from_attributes = True
 
 
-class ProjectStats(BaseModel):
-    total_budget: Optional[float] = None
-    total_expenses: float
-    total_income: float
-    balance: float
+class ProjectDetailResponse(ProjectResponse):
+    records: List[RecordWithCategory] = []  # include_records=true 时为第一页记录
+    records_next_cursor: Optional[str] = None  # 继续通过 /projects/{id}/records 翻页
+    stats: ProjectStats
 
-    class Config:
-        from_attributes = True
+
+class ProjectRecordsResponse(BaseModel):
+    records: List[RecordWithCategory]
+    page_size: int
+    has_more: bool = False
+    next_cursor: Optional[str] = None
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List
 from app.models.record import RecordType
 
 
@@ -37,6 +37,25 @@ class RecordCreate(BaseModel):
         from_attributes = True
 
 
+# 单次批量创建的最大条数
+RECORD_BATCH_MAX_ITEMS = 5000
+
+
+class RecordBatchCreate(BaseModel):
+    records: List[RecordCreate] = Field(..., min_length=1, max_length=RECORD_BATCH_MAX_ITEMS)
+
+
+class RecordBatchError(BaseModel):
+    index: int  # 在请求 records 中的下标
+    detail: str
+
+
+class RecordBatchResponse(BaseModel):
+    created: int
+    failed: int
+    errors: List[RecordBatchError] = []
+
+
 class RecordUpdate(BaseModel):
     category_id: Optional[int] = None
     amount: Optional[float] = None
@@ -52,14 +71,27 @@ class RecordUpdate(BaseModel):
 
 class RecordListResponse(BaseModel):
     records: list[RecordResponse]
-    total: int
+    total: Optional[int] = None  # include_total=false 时为空
     page: int
     page_size: int
+    has_more: bool = False
+    next_cursor: Optional[str] = None  # 下一页游标，没有更多数据时为空
 
     class Config:
         from_attributes = True
 
 
+class RecordSearchHit(RecordResponse):
+    score: float  # 相关度，越大越相关
+
+
+class RecordSearchResponse(BaseModel):
+    records: list[RecordSearchHit]
+    page_size: int
+    has_more: bool = False
+    next_cursor: Optional[str] = None
+
+
 class CategoryInfo(BaseModel):
     id: int
     name: str
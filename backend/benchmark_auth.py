@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""登录洪峰下其他接口延迟的基准测试
+
+在同一事件循环中发起一批并发登录，同时持续请求健康检查接口，
+对比 bcrypt 直接在事件循环中计算（PASSWORD_HASH_WORKERS=0 的行为）与放入线程池时的探测延迟。
+
+用法:
+    python benchmark_auth.py                     # 50 个并发登录，成本因子 12
+    python benchmark_auth.py --logins 200 --rounds 10 --workers 4
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+# 添加 backend 路径；使用内存 SQLite，不连接 MySQL
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ["TESTING"] = "1"
+
+import httpx
+
+from app.config import settings
+from app.database import Base, SessionLocal, engine
+from app.main import app
+from app.models.user import User
+from app.auth import password
+
+EMAIL = "bench@example.com"
+PASSWORD = "benchmark-password"
+PROBE_INTERVAL_SECONDS = 0.005
+
+
+def seed():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        db.add(User(username="bench", email=EMAIL, hashed_password=password.get_password_hash(PASSWORD)))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def probe(client, stop: asyncio.Event) -> list:
+    """持续请求健康检查，返回每次的延迟（毫秒）
+
+    从请求应当发出的时刻开始计时，事件循环被阻塞导致的调度延迟也计入其中。
+    """
+    latencies = []
+    while not stop.is_set():
+        due = time.perf_counter() + PROBE_INTERVAL_SECONDS
+        await asyncio.sleep(PROBE_INTERVAL_SECONDS)
+        await client.get("/api/v1/health")
+        latencies.append((time.perf_counter() - due) * 1000)
+    return latencies
+
+
+async def run_phase(client, logins: int) -> dict:
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(client, stop))
+    await asyncio.sleep(0.05)
+
+    start = time.perf_counter()
+    if logins:
+        responses = await asyncio.gather(*(
+            client.post("/api/v1/auth/login", json={"email": EMAIL, "password": PASSWORD})
+            for _ in range(logins)
+        ))
+        codes = [response.status_code for response in responses]
+    else:
+        await asyncio.sleep(1)
+        codes = []
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    latencies = sorted(await probe_task)
+    return {
+        "elapsed": elapsed,
+        "ok": codes.count(200),
+        "busy": codes.count(503),
+        "probes": len(latencies),
+        "p50": statistics.median(latencies),
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "max": latencies[-1]
+    }
+
+
+def report(name: str, result: dict):
+    print(
+        f"{name:<18} 耗时 {result['elapsed']:6.2f}s  登录成功 {result['ok']:>4}  503 {result['busy']:>4}  "
+        f"探测 {result['probes']:>5} 次  p50 {result['p50']:7.2f}ms  p99 {result['p99']:8.2f}ms  "
+        f"max {result['max']:8.2f}ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=50, help="并发登录数")
+    parser.add_argument("--rounds", type=int, default=settings.BCRYPT_ROUNDS, help="bcrypt 成本因子")
+    parser.add_argument("--workers", type=int, default=max(settings.PASSWORD_HASH_WORKERS, 1), help="线程池大小")
+    parser.add_argument(
+        "--max-pending", type=int, default=None,
+        help="排队上限（默认等于 --logins，不触发 503）"
+    )
+    args = parser.parse_args()
+
+    settings.BCRYPT_ROUNDS = args.rounds
+    seed()
+    max_pending = args.max_pending or args.logins
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"并发登录 {args.logins} 个，bcrypt 成本因子 {args.rounds}")
+        report("空闲", await run_phase(client, 0))
+
+        password.password_hasher = password.PasswordHasher(workers=0, max_pending=max_pending)
+        report("事件循环内计算", await run_phase(client, args.logins))
+
+        password.password_hasher = password.PasswordHasher(workers=args.workers, max_pending=max_pending)
+        report(f"线程池 x{args.workers}", await run_phase(client, args.logins))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""记账记录全文检索基准测试
+
+生成合成记录后，对比全文检索（FTS5 / FULLTEXT）与 LIKE 全扫描的耗时。
+
+用法:
+    python benchmark_search.py                            # 临时 SQLite 文件，100 万条记录
+    python benchmark_search.py --rows 200000
+    python benchmark_search.py --url "mysql+pymysql://..."  # 指定数据库（会写入测试数据）
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# 添加 backend 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.migrations import run_migrations
+from app.models.user import User
+from app.models.record import Record, RecordType
+from app.models.record_search import search_records
+
+WORDS = [
+    "午餐", "晚餐", "早餐", "咖啡", "地铁", "打车", "超市", "水果", "房租", "电费",
+    "话费", "电影", "书店", "健身", "医院", "药店", "外卖", "奶茶", "加油", "停车",
+    "coffee", "lunch", "dinner", "taxi", "metro", "grocery", "rent", "movie", "gym", "books",
+]
+
+# 最后一个查询无命中，体现 LIKE 需扫描用户全部记录
+QUERIES = ["咖啡 外卖", "和朋友吃午餐", "coffee", "grocery rent", "停车", "不存在的备注"]
+
+INSERT_BATCH_SIZE = 10000
+
+
+def seed(engine, rows: int, users: int) -> int:
+    """写入合成用户和记录，返回第一个用户 id"""
+    rng = random.Random(42)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    try:
+        user_ids = []
+        for i in range(users):
+            name = f"bench_{time.time_ns()}_{i}"
+            user = User(username=name, email=f"{name}@example.com", hashed_password="x")
+            db.add(user)
+            db.flush()
+            user_ids.append(user.id)
+        db.commit()
+
+        start = datetime(2020, 1, 1)
+        for offset in range(0, rows, INSERT_BATCH_SIZE):
+            batch = []
+            for _ in range(min(INSERT_BATCH_SIZE, rows - offset)):
+                words = rng.sample(WORDS, rng.randint(2, 5))
+                if rng.random() < 0.2:
+                    words.insert(0, "和朋友吃" + rng.choice(["午餐", "晚餐"]))
+                batch.append({
+                    "user_id": rng.choice(user_ids),
+                    "amount": round(rng.uniform(1, 500), 2),
+                    "type": RecordType.EXPENSE,
+                    "description": " ".join(words)[:200],
+                    "date": start + timedelta(minutes=rng.randint(0, 60 * 24 * 365 * 4)),
+                    "payer_count": 1,
+                    "is_aa": False,
+                })
+            # 绕过 ORM 会话批量写入，全文索引由数据库侧（触发器 / FULLTEXT）维护
+            db.execute(insert(Record), batch)
+            db.commit()
+            print(f"  已写入 {offset + len(batch)} / {rows}", end="\r")
+        print()
+        return user_ids[0]
+    finally:
+        db.close()
+
+
+def timed(func, repeat: int):
+    """返回 (最后一次结果, 平均毫秒)"""
+    result = None
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - started) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="全文检索基准测试")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="合成记录条数")
+    parser.add_argument("--users", type=int, default=10, help="记录分布到的用户数")
+    parser.add_argument("--url", default=None, help="数据库 URL，默认使用临时 SQLite 文件")
+    parser.add_argument("--repeat", type=int, default=5, help="每个查询重复次数")
+    args = parser.parse_args()
+
+    tmpdir = None
+    url = args.url
+    if url is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+    engine = create_engine(url)
+
+    try:
+        run_migrations(engine)
+        print(f"写入 {args.rows} 条合成记录（{args.users} 个用户）...")
+        started = time.perf_counter()
+        user_id = seed(engine, args.rows, args.users)
+        print(f"写入耗时 {time.perf_counter() - started:.1f}s\n")
+
+        db = sessionmaker(bind=engine)()
+        print(f"{'查询':<16}{'全文检索 ms':>12}{'第2页 ms':>12}{'LIKE 扫描 ms':>14}{'命中':>8}")
+        for q in QUERIES:
+            first, search_ms = timed(lambda: search_records(db, user_id, q, 21), args.repeat)
+            after = None
+            if first:
+                record, score = first[min(len(first), 20) - 1]
+                after = (score, record.id)
+            _, next_ms = timed(lambda: search_records(db, user_id, q, 21, after=after), args.repeat)
+
+            def like_scan():
+                query = db.query(Record).filter(Record.user_id == user_id)
+                for term in q.split():
+                    query = query.filter(Record.description.contains(term, autoescape=True))
+                return query.order_by(Record.id.desc()).limit(21).all()
+
+            _, like_ms = timed(like_scan, args.repeat)
+            db.expunge_all()
+            print(f"{q:<16}{search_ms:>12.1f}{next_ms:>12.1f}{like_ms:>14.1f}{len(first):>8}")
+        db.close()
+    finally:
+        engine.dispose()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
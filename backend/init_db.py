@@ -8,32 +8,18 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from app.database import engine
-from app.models import user, category, record, project, budget, invitation
+from app.migrations import MIGRATIONS, run_migrations
 
 
 def init_db():
-    """创建所有数据库表"""
+    """创建所有数据库表（执行全部未执行的迁移）"""
     print("正在创建数据库表...")
     
     try:
-        # 创建表
-        user.User.metadata.create_all(bind=engine)
-        print("✓ User 表")
-        
-        category.Category.metadata.create_all(bind=engine)
-        print("✓ Category 表")
-        
-        record.Record.metadata.create_all(bind=engine)
-        print("✓ Record 表")
-        
-        project.Project.metadata.create_all(bind=engine)
-        print("✓ Project 表")
-        
-        budget.Budget.metadata.create_all(bind=engine)
-        print("✓ Budget 表")
-        
-        invitation.Invitation.metadata.create_all(bind=engine)
-        print("✓ Invitation 表")
+        executed = set(run_migrations(engine))
+        for migration in MIGRATIONS:
+            mark = "✓" if migration.VERSION in executed else "-"
+            print(f"{mark} {migration.VERSION:04d} {migration.DESCRIPTION}")
         
         print("\n✅ 数据库初始化完成！")
         return True
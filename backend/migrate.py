@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""执行 PocketLedger 数据库迁移
+
+用法:
+    python migrate.py            # 升级到最新版本
+    python migrate.py --status   # 查看已执行 / 待执行的迁移
+"""
+
+import argparse
+import sys
+import os
+
+# 添加 backend 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import engine
+from app.migrations import MIGRATIONS, applied_versions, run_migrations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="执行数据库迁移")
+    parser.add_argument("--status", action="store_true", help="只查看迁移状态")
+    args = parser.parse_args()
+
+    try:
+        if args.status:
+            done = set(applied_versions(engine))
+            for migration in MIGRATIONS:
+                mark = "✓" if migration.VERSION in done else " "
+                print(f"[{mark}] {migration.VERSION:04d} {migration.DESCRIPTION}")
+            return True
+
+        executed = run_migrations(engine)
+        if executed:
+            for version in executed:
+                print(f"✓ 已执行迁移 {version:04d}")
+        else:
+            print("数据库已是最新版本")
+        print("\n✅ 迁移完成！")
+        return True
+    except Exception as e:
+        print(f"\n❌ 迁移失败: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""回填 / 重建记账记录日汇总表 record_daily_rollups 及由其派生的预算分期用量 budget_period_usage
+
+用法:
+    python rebuild_rollups.py              # 重建所有用户
+    python rebuild_rollups.py --user-id 3  # 只重建指定用户
+"""
+
+import argparse
+import sys
+import os
+
+# 添加 backend 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import engine, SessionLocal
+from app.models.budget import Budget
+from app.models.rollup import RecordDailyRollup, rebuild_rollups
+from app.models.budget_usage import BudgetPeriodUsage, rebuild_budget_usage
+
+
+def main():
+    parser = argparse.ArgumentParser(description="从 records 重建日汇总表")
+    parser.add_argument("--user-id", type=int, default=None, help="只重建指定用户的汇总")
+    args = parser.parse_args()
+
+    # 确保汇总表存在
+    RecordDailyRollup.__table__.create(bind=engine, checkfirst=True)
+    BudgetPeriodUsage.__table__.create(bind=engine, checkfirst=True)
+
+    db = SessionLocal()
+    try:
+        count = rebuild_rollups(db, user_id=args.user_id)
+        print(f"✅ 日汇总重建完成，共写入 {count} 行")
+
+        budget_ids = None
+        if args.user_id is not None:
+            budget_ids = [row[0] for row in db.query(Budget.id).filter(Budget.user_id == args.user_id)]
+        count = rebuild_budget_usage(db, budget_ids)
+        db.commit()
+        print(f"✅ 预算分期用量重建完成，共写入 {count} 行")
+        return True
+    except Exception as e:
+        db.rollback()
+        print(f"\n❌ 日汇总重建失败: {e}")
+        return False
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,249 @@
+import os
+import csv
+import io
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from app.database import Base, SyncSessionAdapter, get_session
+from app.main import app
+from app.models.user import User
+from app.models.category import Category, CategoryType, CategoryLevel
+from app.models.project import Project
+from app.auth.password import get_password_hash
+from app.auth.user_cache import auth_cache
+from app.cache import result_cache
+
+# 设置测试环境变量
+os.environ["TESTING"] = "1"
+
+
+@pytest.fixture(scope="function")
+def database_file(tmp_path):
+    """同一个 SQLite 文件：同步引擎建表和准备数据，aiosqlite 引擎供接口使用"""
+    path = tmp_path / "async.db"
+    sync_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=sync_engine)
+    yield path, sync_engine
+    sync_engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def db_session(database_file):
+    """准备测试数据用的同步会话"""
+    _, sync_engine = database_file
+    session = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture(scope="function")
+def client(database_file):
+    """接口使用原生 AsyncSession（aiosqlite）的测试客户端"""
+    path, _ = database_file
+    # TestClient 每次进入都在新的事件循环中运行，不复用连接
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    AsyncTestingSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_session():
+        async with AsyncTestingSessionLocal() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = override_get_session
+    result_cache.clear()
+    auth_cache.clear()
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def test_user(db_session):
+    """创建测试用户"""
+    user = User(
+        username="testuser",
+        email="test@example.com",
+        hashed_password=get_password_hash("testpassword")
+    )
+    db_session.add(user)
+    db_session.commit()
+    db_session.refresh(user)
+    return user
+
+
+@pytest.fixture
+def category(db_session, test_user):
+    """创建支出分类"""
+    category = Category(
+        name="餐饮",
+        type=CategoryType.EXPENSE,
+        level=CategoryLevel.PRIMARY,
+        user_id=test_user.id
+    )
+    db_session.add(category)
+    db_session.commit()
+    db_session.refresh(category)
+    return category
+
+
+@pytest.fixture
+def project(db_session, test_user):
+    """创建项目"""
+    project = Project(
+        name="旅行",
+        budget=1000.0,
+        owner_id=test_user.id,
+        created_by_id=test_user.id
+    )
+    db_session.add(project)
+    db_session.commit()
+    db_session.refresh(project)
+    return project
+
+
+from fastapi.testclient import TestClient
+from app.auth.jwt import create_access_token
+
+
+def get_auth_headers(user):
+    """获取认证头"""
+    token = create_access_token({"sub": user.id, "username": user.username})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _create_record(client, headers, category_id, amount, **extra):
+    response = client.post("/api/v1/records", json={
+        "category_id": category_id,
+        "amount": amount,
+        "type": "expense",
+        "date": "2024-03-15T12:00:00",
+        **extra
+    }, headers=headers)
+    assert response.status_code == 201
+    return response.json()
+
+
+class TestAsyncSession:
+    """DB_ASYNC 模式：接口通过 AsyncSession 访问数据库"""
+
+    def test_sync_adapter_by_default(self):
+        """未启用 DB_ASYNC 时 get_session 包装同步会话"""
+        from app import database
+        assert database.AsyncSessionLocal is None
+        session = sessionmaker()()
+        adapter = SyncSessionAdapter(session)
+        assert adapter.sync_session is session
+        assert adapter.info is session.info
+        assert database.get_session is database.get_sync_session
+
+    def test_async_session_skips_sync_pool(self):
+        """启用 DB_ASYNC 时使用的会话依赖不依赖 get_db，不占用同步连接池"""
+        from fastapi.dependencies.utils import get_dependant
+        from app import database
+        assert get_dependant(path="/", call=database.get_async_session).dependencies == []
+        sync_dependencies = get_dependant(path="/", call=database.get_sync_session).dependencies
+        assert [d.call for d in sync_dependencies] == [database.get_db]
+
+    def test_current_user(self, client, test_user):
+        """认证依赖通过 run_sync 加载用户"""
+        response = client.get("/api/v1/auth/me", headers=get_auth_headers(test_user))
+        assert response.status_code == 200
+        assert response.json()["email"] == "test@example.com"
+        # 经 greenlet 执行的语句同样计入请求计时
+        assert 'desc="1 queries"' in response.headers["Server-Timing"]
+
+    def test_category_crud(self, client, test_user):
+        """分类的增删改查"""
+        headers = get_auth_headers(test_user)
+        response = client.post("/api/v1/categories", json={"name": "交通", "type": "expense"}, headers=headers)
+        assert response.status_code == 201
+        category_id = response.json()["id"]
+
+        response = client.put(f"/api/v1/categories/{category_id}", json={"name": "出行"}, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["name"] == "出行"
+
+        response = client.delete(f"/api/v1/categories/{category_id}", headers=headers)
+        assert response.status_code == 200
+        assert client.get("/api/v1/categories", headers=headers).json()["categories"] == []
+
+    def test_record_crud(self, client, test_user, category, project):
+        """记录的增删改查，详情带分类"""
+        headers = get_auth_headers(test_user)
+        record = _create_record(client, headers, category.id, 88.5, project_id=project.id)
+
+        response = client.get(f"/api/v1/records/{record['id']}", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["category"]["name"] == "餐饮"
+
+        response = client.put(f"/api/v1/records/{record['id']}", json={"amount": 99.0}, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["amount"] == 99.0
+
+        response = client.get("/api/v1/records", params={"category_id": category.id}, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["total"] == 1
+
+        response = client.delete(f"/api/v1/records/{record['id']}", headers=headers)
+        assert response.status_code == 200
+        assert client.get("/api/v1/records", headers=headers).json()["total"] == 0
+
+    def test_batch_export_and_search(self, client, test_user, category):
+        """批量创建（run_sync）、流式导出和全文检索"""
+        headers = get_auth_headers(test_user)
+        response = client.post("/api/v1/records/batch", json={"records": [
+            {"category_id": category.id, "amount": 10.0 * (i + 1), "type": "expense",
+             "date": "2024-03-15T12:00:00", "description": f"午餐 {i}"}
+            for i in range(3)
+        ]}, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["created"] == 3
+
+        response = client.get("/api/v1/records/export", headers=headers)
+        assert response.status_code == 200
+        rows = list(csv.reader(io.StringIO(response.text)))
+        assert len(rows) == 4
+        assert {row[5] for row in rows[1:]} == {"餐饮"}
+
+        response = client.get("/api/v1/records/search", params={"q": "午餐"}, headers=headers)
+        assert response.status_code == 200
+        assert len(response.json()["records"]) == 3
+
+    def test_project_and_statistics(self, client, test_user, category, project):
+        """写入经会话钩子维护日汇总，项目和统计接口读取汇总"""
+        headers = get_auth_headers(test_user)
+        _create_record(client, headers, category.id, 200.0, project_id=project.id)
+
+        response = client.get("/api/v1/projects", params={"include_stats": True}, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["projects"][0]["stats"]["total_expenses"] == 200.0
+
+        response = client.get(f"/api/v1/projects/{project.id}", headers=headers)
+        assert response.status_code == 200
+
+        response = client.get("/api/v1/statistics/monthly", params={"year": 2024, "month": 3}, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["total_expense"] == 200.0
+
+        response = client.get("/api/v1/statistics/projects", headers=headers)
+        assert response.status_code == 200
+        assert response.json()[0]["total_expense"] == 200.0
+
+    def test_budget(self, client, test_user, category):
+        """预算创建和查询"""
+        headers = get_auth_headers(test_user)
+        response = client.post("/api/v1/budgets", json={
+            "name": "餐饮预算",
+            "amount": 500.0,
+            "period_type": "monthly",
+            "start_date": datetime(2024, 3, 1).isoformat(),
+            "category_id": category.id
+        }, headers=headers)
+        assert response.status_code == 201
+        budget_id = response.json()["id"]
+
+        response = client.get(f"/api/v1/budgets/{budget_id}", headers=headers)
+        assert response.status_code == 200
+        assert client.get("/api/v1/budgets", headers=headers).json()["total"] == 1
@@ -1,4 +1,7 @@
+import asyncio
+import threading
 import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -7,7 +10,12 @@ from app.database import Base, get_db
 from app.main import app
 from app.models.user import User
 from app.models.invitation import Invitation
-from app.auth.password import get_password_hash
+from app.auth.password import (
+    PasswordHasher,
+    get_password_hash,
+    get_password_hash_async,
+    verify_password_async,
+)
 
 # 测试数据库
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
@@ -200,3 +208,42 @@ def test_logout(client, db_session):
     )
     assert response.status_code == 200
     assert "message" in response.json()
+
+
+def test_password_hash_async():
+    """测试线程池中的密码哈希与校验"""
+    async def run():
+        hashed = await get_password_hash_async("secret")
+        return (
+            await verify_password_async("secret", hashed),
+            await verify_password_async("wrong", hashed)
+        )
+    
+    assert asyncio.run(run()) == (True, False)
+
+
+def test_password_hasher_queue_limit():
+    """测试排队超过上限时返回 503，且计算不在事件循环线程中执行"""
+    hasher = PasswordHasher(workers=1, max_pending=2)
+    release = threading.Event()
+    threads = []
+    
+    def slow():
+        threads.append(threading.get_ident())
+        release.wait(5)
+        return "done"
+    
+    async def run():
+        first = asyncio.ensure_future(hasher.run(slow))
+        second = asyncio.ensure_future(hasher.run(slow))
+        await asyncio.sleep(0.05)
+        assert hasher.pending == 2
+        with pytest.raises(HTTPException) as exc_info:
+            await hasher.run(slow)
+        assert exc_info.value.status_code == 503
+        release.set()
+        return await asyncio.gather(first, second)
+    
+    assert asyncio.run(run()) == ["done", "done"]
+    assert hasher.pending == 0
+    assert threading.get_ident() not in threads
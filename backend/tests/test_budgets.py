@@ -1,16 +1,19 @@
 import os
+import asyncio
+import json
 import pytest
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from pydantic import BaseModel
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
-from app.database import Base, get_db
+from app.database import Base, SyncSessionAdapter, get_db
 from app.main import app
 from app.models.user import User
 from app.models.category import Category, CategoryType
 from app.models.budget import Budget, BudgetPeriodType
 from app.auth.password import get_password_hash
+from app.cache import result_cache
 
 # 设置测试环境变量
 os.environ["TESTING"] = "1"
@@ -42,6 +45,8 @@ def client(db_session):
         yield db_session
     
     app.dependency_overrides[get_db] = override_get_db
+    # 每个测试重建内存数据库，用户 id 和数据版本会重复，需清空结果缓存
+    result_cache.clear()
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
@@ -65,9 +70,6 @@ from fastapi.testclient import TestClient
 from app.auth.jwt import create_access_token
 
 
-from app.auth.jwt import create_access_token
-
-
 def get_auth_headers(test_user):
     """生成认证请求头"""
     token = create_access_token(data={"sub": test_user.id})
@@ -339,6 +341,192 @@ class TestBudgetAlerts:
         )
         
         assert response.status_code == 200
+
+    def test_alerts_use_current_period_usage(self, client, test_user, db_session):
+        """测试提醒只统计当前周期的支出，且只读取分期用量、不扫描记录"""
+        from app.models.record import Record, RecordType
+        food = Category(name="餐饮", type=CategoryType.EXPENSE, user_id=test_user.id)
+        fun = Category(name="娱乐", type=CategoryType.EXPENSE, user_id=test_user.id)
+        db_session.add_all([food, fun])
+        db_session.commit()
+        
+        today = date.today()
+        month_start = today.replace(day=1)
+        last_month = month_start - timedelta(days=1)
+        start = datetime(today.year - 1, 1, 1)
+        db_session.add_all([
+            Budget(name="餐饮预算", amount=100.0, period_type=BudgetPeriodType.MONTHLY,
+                   start_date=start, category_id=food.id, user_id=test_user.id),
+            Budget(name="娱乐年度预算", amount=1000.0, period_type=BudgetPeriodType.YEARLY,
+                   start_date=start, category_id=fun.id, user_id=test_user.id),
+            Budget(name="总预算", amount=10000.0, period_type=BudgetPeriodType.MONTHLY,
+                   start_date=start, user_id=test_user.id),
+            Budget(name="停用预算", amount=1.0, period_type=BudgetPeriodType.MONTHLY,
+                   start_date=start, user_id=test_user.id, is_active=False),
+        ])
+        db_session.commit()
+        
+        def add(amount, category, day, type=RecordType.EXPENSE):
+            db_session.add(Record(
+                amount=amount, type=type, user_id=test_user.id,
+                category_id=category.id, date=datetime.combine(day, datetime.min.time())
+            ))
+        
+        add(60.0, food, month_start)
+        add(50.0, food, month_start)
+        add(500.0, food, last_month)  # 上个周期，不计入月度预算
+        add(999.0, food, month_start, RecordType.INCOME)
+        add(850.0, fun, month_start)
+        db_session.commit()
+        
+        statements = []
+        
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(test_engine, "before_cursor_execute", capture)
+        try:
+            response = client.get("/api/v1/budgets/alerts", headers=get_auth_headers(test_user))
+        finally:
+            event.remove(test_engine, "before_cursor_execute", capture)
+        
+        assert response.status_code == 200
+        assert not [s for s in statements if "FROM records" in s]
+        assert len([s for s in statements if "budget_period_usage" in s]) == 1
+        alerts = {a["budget_name"]: a for a in response.json()["alerts"]}
+        assert set(alerts) == {"餐饮预算", "娱乐年度预算"}
+        assert alerts["餐饮预算"]["spent_amount"] == 110.0
+        assert alerts["餐饮预算"]["alert_type"] == "over_budget"
+        assert alerts["餐饮预算"]["category_name"] == "餐饮"
+        assert alerts["餐饮预算"]["period_start"] == month_start.isoformat()
+        assert alerts["娱乐年度预算"]["alert_type"] == "warning"
+        assert alerts["娱乐年度预算"]["period_start"] == date(today.year, 1, 1).isoformat()
+
+    def test_usage_maintained_on_record_writes(self, client, test_user, db_session):
+        """测试记录增删改和预算修改时分期用量随之维护，并可查询历史"""
+        from app.models.record import Record, RecordType
+        food = Category(name="餐饮", type=CategoryType.EXPENSE, user_id=test_user.id)
+        db_session.add(food)
+        db_session.commit()
+        
+        # 先有记录后建预算：创建预算时重建用量
+        old = Record(amount=30.0, type=RecordType.EXPENSE, user_id=test_user.id,
+                     category_id=food.id, date=datetime(2024, 1, 15, 12, 0))
+        db_session.add(old)
+        db_session.commit()
+        budget = Budget(name="餐饮预算", amount=100.0, period_type=BudgetPeriodType.MONTHLY,
+                        start_date=datetime(2024, 1, 1), category_id=food.id, user_id=test_user.id)
+        db_session.add(budget)
+        db_session.commit()
+        headers = get_auth_headers(test_user)
+        
+        def history():
+            response = client.get(f"/api/v1/budgets/{budget.id}/usage", headers=headers)
+            assert response.status_code == 200
+            return [(p["period_start"], p["spent_amount"], p["record_count"])
+                    for p in response.json()["periods"]]
+        
+        assert history() == [("2024-01-01", 30.0, 1)]
+        
+        feb = Record(amount=20.0, type=RecordType.EXPENSE, user_id=test_user.id,
+                     category_id=food.id, date=datetime(2024, 2, 3))
+        db_session.add(feb)
+        db_session.commit()
+        assert history() == [("2024-02-01", 20.0, 1), ("2024-01-01", 30.0, 1)]
+        
+        # 修改金额和日期
+        old.amount = 45.0
+        old.date = datetime(2024, 2, 10)
+        db_session.commit()
+        assert history() == [("2024-02-01", 65.0, 2)]
+        
+        db_session.delete(feb)
+        db_session.commit()
+        assert history() == [("2024-02-01", 45.0, 1)]
+        
+        # 改为年度预算后按年重建
+        client.put(f"/api/v1/budgets/{budget.id}", json={"period_type": "yearly"}, headers=headers)
+        data = client.get(f"/api/v1/budgets/{budget.id}/usage", headers=headers).json()
+        assert data["period_type"] == "yearly"
+        assert data["periods"][0]["period_start"] == "2024-01-01"
+        assert data["periods"][0]["period_end"] == "2024-12-31"
+        assert data["periods"][0]["spent_amount"] == 45.0
+        
+        # 删除预算同时删除用量
+        assert client.delete(f"/api/v1/budgets/{budget.id}", headers=headers).status_code == 200
+        from app.models.budget_usage import BudgetPeriodUsage
+        assert db_session.query(BudgetPeriodUsage).count() == 0
+
+    def test_cleared_category_counts_all_categories(self, client, test_user, db_session):
+        """测试 category_id=0 清除预算分类后统计全部分类的支出"""
+        from app.models.record import Record, RecordType
+        food = Category(name="餐饮", type=CategoryType.EXPENSE, user_id=test_user.id)
+        fun = Category(name="娱乐", type=CategoryType.EXPENSE, user_id=test_user.id)
+        db_session.add_all([food, fun])
+        db_session.commit()
+        budget = Budget(name="预算", amount=100.0, period_type=BudgetPeriodType.MONTHLY,
+                        start_date=datetime(2024, 1, 1), category_id=food.id, user_id=test_user.id)
+        db_session.add(budget)
+        db_session.commit()
+        headers = get_auth_headers(test_user)
+        
+        response = client.put(f"/api/v1/budgets/{budget.id}", json={"category_id": 0}, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["category_id"] is None
+        
+        db_session.add(Record(amount=30.0, type=RecordType.EXPENSE, user_id=test_user.id,
+                              category_id=fun.id, date=datetime(2024, 3, 5)))
+        db_session.commit()
+        data = client.get(f"/api/v1/budgets/{budget.id}/usage", headers=headers).json()
+        assert [(p["period_start"], p["spent_amount"]) for p in data["periods"]] == [("2024-03-01", 30.0)]
+        
+        # 旧数据中存为 0 的预算同样统计全部分类
+        from app.models.budget_usage import rebuild_budget_usage
+        budget.category_id = 0
+        db_session.commit()
+        rebuild_budget_usage(db_session, [budget.id])
+        db_session.commit()
+        data = client.get(f"/api/v1/budgets/{budget.id}/usage", headers=headers).json()
+        assert [(p["period_start"], p["spent_amount"]) for p in data["periods"]] == [("2024-03-01", 30.0)]
+
+    def test_record_write_checks_only_covering_budgets(self, test_user, db_session, monkeypatch):
+        """测试写入记录时只读取统计该分类（或全部分类）且日期范围相交的预算"""
+        from app.models import budget_usage
+        from app.models.record import Record, RecordType
+        food = Category(name="餐饮", type=CategoryType.EXPENSE, user_id=test_user.id)
+        fun = Category(name="娱乐", type=CategoryType.EXPENSE, user_id=test_user.id)
+        db_session.add_all([food, fun])
+        db_session.commit()
+        
+        def budget(name, **fields):
+            fields.setdefault("start_date", datetime(2024, 1, 1))
+            return Budget(name=name, amount=100.0, period_type=BudgetPeriodType.MONTHLY,
+                          user_id=test_user.id, **fields)
+        
+        food_budget = budget("餐饮", category_id=food.id)
+        total_budget = budget("全部")
+        fun_budget = budget("娱乐", category_id=fun.id)
+        ended_budget = budget("已结束", start_date=datetime(2023, 1, 1), end_date=datetime(2023, 12, 31))
+        future_budget = budget("未开始", start_date=datetime(2025, 1, 1))
+        db_session.add_all([food_budget, total_budget, fun_budget, ended_budget, future_budget])
+        db_session.commit()
+        
+        checked = []
+        covers = budget_usage._covers
+        
+        def tracking_covers(budget, category_id, day):
+            checked.append(budget.id)
+            return covers(budget, category_id, day)
+        
+        monkeypatch.setattr(budget_usage, "_covers", tracking_covers)
+        db_session.add(Record(amount=30.0, type=RecordType.EXPENSE, user_id=test_user.id,
+                              category_id=food.id, date=datetime(2024, 3, 5)))
+        db_session.commit()
+        
+        assert sorted(checked) == sorted([food_budget.id, total_budget.id])
+        usage = {row.budget_id: row.spent_amount for row in db_session.query(budget_usage.BudgetPeriodUsage)}
+        assert usage == {food_budget.id: 30.0, total_budget.id: 30.0}
+
     """Budget 模型测试类"""
 
     def test_create_budget(self, db_session, test_user):
@@ -524,3 +712,132 @@ class TestBudgetAlerts:
         assert budget.is_active is True
         # created_at 应该自动设置
         assert budget.created_at is not None
+
+
+class _StreamRequest:
+    """只提供 is_disconnected 的请求替身（TestClient 会缓冲整个响应，无法读取不结束的 SSE）"""
+
+    async def is_disconnected(self):
+        return False
+
+
+class TestBudgetAlertStream:
+    """预算提醒推送测试类"""
+
+    def test_threshold_crossing_published_after_commit(self, db_session, test_user):
+        """测试记录写入越过 80% / 100% 阈值时提交后推送，且每个阈值只推送一次"""
+        from app.models.record import Record, RecordType
+        from app.budget_alerts import budget_alert_broker
+        food = Category(name="餐饮", type=CategoryType.EXPENSE, user_id=test_user.id)
+        fun = Category(name="娱乐", type=CategoryType.EXPENSE, user_id=test_user.id)
+        db_session.add_all([food, fun])
+        db_session.commit()
+        budget = Budget(name="餐饮预算", amount=100.0, period_type=BudgetPeriodType.MONTHLY,
+                        start_date=datetime(2024, 1, 1), category_id=food.id, user_id=test_user.id)
+        db_session.add(budget)
+        db_session.commit()
+        user_id, budget_id = test_user.id, budget.id
+        today = datetime.combine(date.today(), datetime.min.time())
+        
+        def add(amount, category=food, day=today):
+            db_session.add(Record(amount=amount, type=RecordType.EXPENSE, user_id=user_id,
+                                  category_id=category.id, date=day))
+        
+        async def scenario():
+            queue = budget_alert_broker.subscribe(user_id)
+            try:
+                add(50.0)  # 50%，未达阈值
+                db_session.commit()
+                add(35.0)  # 85%，越过 80%
+                db_session.commit()
+                add(5.0)  # 90%，仍在 warning 区间
+                db_session.commit()
+                add(500.0, category=fun)  # 其他分类
+                db_session.commit()
+                add(500.0, day=datetime(2024, 1, 5))  # 往期
+                db_session.commit()
+                add(500.0)  # 回滚的写入不推送
+                db_session.flush()
+                db_session.rollback()
+                add(20.0)  # 110%，越过 100%
+                db_session.commit()
+                await asyncio.sleep(0)
+                alerts = []
+                while not queue.empty():
+                    alerts.append(queue.get_nowait())
+                return alerts
+            finally:
+                budget_alert_broker.unsubscribe(user_id, queue)
+        
+        alerts = asyncio.run(scenario())
+        assert [a["alert_type"] for a in alerts] == ["warning", "over_budget"]
+        assert all(a["budget_id"] == budget_id for a in alerts)
+        assert alerts[0]["spent_amount"] == 85.0
+        assert alerts[1]["spent_amount"] == 110.0
+        assert alerts[1]["period_start"] == date.today().replace(day=1).isoformat()
+
+    def test_cleared_category_budget_alerts(self, client, db_session, test_user):
+        """测试清除分类（category_id=0）的预算超支后出现在 /budgets/alerts 中并推送提醒"""
+        from app.models.record import Record, RecordType
+        from app.budget_alerts import budget_alert_broker
+        food = Category(name="餐饮", type=CategoryType.EXPENSE, user_id=test_user.id)
+        fun = Category(name="娱乐", type=CategoryType.EXPENSE, user_id=test_user.id)
+        db_session.add_all([food, fun])
+        db_session.commit()
+        budget = Budget(name="总预算", amount=100.0, period_type=BudgetPeriodType.MONTHLY,
+                        start_date=datetime(2024, 1, 1), category_id=food.id, user_id=test_user.id)
+        db_session.add(budget)
+        db_session.commit()
+        user_id, budget_id = test_user.id, budget.id
+        headers = get_auth_headers(test_user)
+        response = client.put(f"/api/v1/budgets/{budget_id}", json={"category_id": 0}, headers=headers)
+        assert response.status_code == 200
+        
+        async def scenario():
+            queue = budget_alert_broker.subscribe(user_id)
+            try:
+                db_session.add(Record(amount=120.0, type=RecordType.EXPENSE, user_id=user_id,
+                                      category_id=fun.id, date=datetime.combine(date.today(), datetime.min.time())))
+                db_session.commit()
+                await asyncio.sleep(0)
+                alerts = []
+                while not queue.empty():
+                    alerts.append(queue.get_nowait())
+                return alerts
+            finally:
+                budget_alert_broker.unsubscribe(user_id, queue)
+        
+        pushed = asyncio.run(scenario())
+        assert [(a["budget_id"], a["alert_type"]) for a in pushed] == [(budget_id, "over_budget")]
+        
+        alerts = client.get("/api/v1/budgets/alerts", headers=headers).json()["alerts"]
+        assert [(a["budget_id"], a["alert_type"], a["spent_amount"]) for a in alerts] == [
+            (budget_id, "over_budget", 120.0)
+        ]
+        assert alerts[0]["category_name"] is None
+
+    def test_stream_endpoint(self, db_session, test_user):
+        """测试 SSE 接口推送提醒事件，断开后取消订阅"""
+        from app.budget_alerts import budget_alert_broker
+        from app.routers.budgets import stream_budget_alerts
+        user_id = test_user.id
+        
+        async def scenario():
+            response = await stream_budget_alerts(
+                request=_StreamRequest(), current_user=test_user, db=SyncSessionAdapter(db_session)
+            )
+            assert response.media_type == "text/event-stream"
+            body = response.body_iterator
+            first = await body.__anext__()
+            assert budget_alert_broker.subscriber_count(user_id) == 1
+            budget_alert_broker.publish(user_id, {"budget_id": 1, "alert_type": "warning"})
+            chunk = await body.__anext__()
+            await body.aclose()
+            return first, chunk
+        
+        first, chunk = asyncio.run(scenario())
+        assert first.startswith(":")
+        lines = chunk.strip().split("\n")
+        assert lines[0] == "event: budget_alert"
+        assert json.loads(lines[1][len("data: "):]) == {"budget_id": 1, "alert_type": "warning"}
+        assert budget_alert_broker.subscriber_count(user_id) == 0
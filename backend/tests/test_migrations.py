@@ -0,0 +1,395 @@
+import os
+import threading
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.database import Base, get_db
+from app.main import app
+from app.migrations import MIGRATIONS, applied_versions, migration_lock, run_migrations
+from app.models.user import User
+from app.models.category import Category, CategoryType
+from app.models.record import Record, RecordType
+from app.models.project import Project
+from app.auth.password import get_password_hash
+from app.cache import result_cache
+from fastapi.testclient import TestClient
+from app.auth.jwt import create_access_token
+
+# 设置测试环境变量
+os.environ["TESTING"] = "1"
+
+RECORD_INDEXES = {
+    "ix_records_user_date_id",
+    "ix_records_user_type_date",
+    "ix_records_user_category_date",
+    "ix_records_project_type",
+}
+
+
+def new_engine():
+    return create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+
+
+def index_names(engine, table):
+    return {ix["name"] for ix in inspect(engine).get_indexes(table)}
+
+
+class TestMigrations:
+    """迁移执行测试类"""
+
+    def test_fresh_database(self):
+        """测试空库执行全部迁移且可重复执行"""
+        engine = new_engine()
+        executed = run_migrations(engine)
+        assert executed == [m.VERSION for m in MIGRATIONS]
+        assert applied_versions(engine) == executed
+        assert RECORD_INDEXES <= index_names(engine, "records")
+        
+        # 再次执行不做任何事
+        assert run_migrations(engine) == []
+
+    def test_concurrent_startup(self, tmp_path):
+        """测试多个 worker 同时启动时迁移由锁串行执行，只执行一次"""
+        url = f"sqlite:///{tmp_path / 'ledger.db'}"
+        engines = [create_engine(url) for _ in range(4)]
+        results = []
+        errors = []
+
+        def migrate(engine):
+            try:
+                results.append(run_migrations(engine))
+            except Exception as e:
+                errors.append(e)
+
+        # 其他进程持有迁移锁时等待
+        with migration_lock(engines[0]):
+            workers = [threading.Thread(target=migrate, args=(engine,)) for engine in engines]
+            for worker in workers:
+                worker.start()
+            workers[0].join(0.3)
+            assert workers[0].is_alive()
+            assert results == []
+        for worker in workers:
+            worker.join()
+
+        assert errors == []
+        assert sorted(results) == [[], [], [], [m.VERSION for m in MIGRATIONS]]
+        assert applied_versions(engines[0]) == [m.VERSION for m in MIGRATIONS]
+
+    def test_migrated_schema_matches_models(self):
+        """测试空库执行全部迁移后的表、列和索引与 ORM 模型 create_all 的结果一致"""
+        def schema(engine):
+            inspector = inspect(engine)
+            return {
+                table: (
+                    {(c["name"], c["nullable"]) for c in inspector.get_columns(table)},
+                    {ix["name"] for ix in inspector.get_indexes(table)}
+                )
+                for table in inspector.get_table_names() if table != "schema_migrations"
+            }
+
+        migrated = new_engine()
+        run_migrations(migrated)
+        created = new_engine()
+        Base.metadata.create_all(bind=created)
+        assert schema(migrated) == schema(created)
+
+    def test_upgrade_legacy_database(self):
+        """测试由 create_all 建好的旧库（无 data_version 列和组合索引）可升级且保留数据"""
+        engine = new_engine()
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            for table, name in [
+                ("records", "ix_records_user_date_id"),
+                ("records", "ix_records_user_type_date"),
+                ("records", "ix_records_user_category_date"),
+                ("records", "ix_records_project_type"),
+            ]:
+                conn.execute(text(f"DROP INDEX {name}"))
+            conn.execute(text("ALTER TABLE users DROP COLUMN data_version"))
+            conn.execute(text(
+                "INSERT INTO users (username, email, hashed_password, is_active, is_verified) "
+                "VALUES ('old', 'old@example.com', 'x', 1, 0)"
+            ))
+        assert not RECORD_INDEXES & index_names(engine, "records")
+        
+        run_migrations(engine)
+        
+        assert RECORD_INDEXES <= index_names(engine, "records")
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT data_version FROM users WHERE username = 'old'")).scalar() == 0
+
+
+    def test_upgrade_backfills_fulltext_index(self):
+        """测试旧库升级时建立 FTS5 影子表并回填已有记录，之后的写入由触发器同步"""
+        engine = new_engine()
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE records_fts"))
+            for trigger in ("records_fts_ai", "records_fts_ad", "records_fts_au"):
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+            conn.execute(text(
+                "INSERT INTO users (username, email, hashed_password, is_active, is_verified, data_version) "
+                "VALUES ('old', 'old@example.com', 'x', 1, 0, 0)"
+            ))
+            conn.execute(text(
+                "INSERT INTO records (user_id, amount, type, description, date) "
+                "VALUES (1, 5, 'EXPENSE', 'old coffee', '2024-01-01 00:00:00')"
+            ))
+        
+        run_migrations(engine)
+        
+        with engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO records (user_id, amount, type, description, date) "
+                "VALUES (1, 5, 'EXPENSE', 'new coffee', '2024-01-02 00:00:00')"
+            ))
+            matched = conn.execute(text(
+                "SELECT rowid FROM records_fts WHERE records_fts MATCH 'coffee' ORDER BY rowid"
+            )).scalars().all()
+        assert matched == [1, 2]
+
+    def _insert_legacy_data(self, conn):
+        """旧库中的用户、分类、预算和记录（一条无分类、两条无项目）"""
+        conn.execute(text(
+            "INSERT INTO users (username, email, hashed_password, is_active, is_verified, data_version) "
+            "VALUES ('old', 'old@example.com', 'x', 1, 0, 0)"
+        ))
+        conn.execute(text(
+            "INSERT INTO categories (name, type, level, user_id) VALUES ('餐饮', 'EXPENSE', 'PRIMARY', 1)"
+        ))
+        conn.execute(text(
+            "INSERT INTO budgets (user_id, name, amount, period_type, start_date, is_active) "
+            "VALUES (1, '总预算', 1000, 'MONTHLY', '2024-01-01 00:00:00', 1)"
+        ))
+        for category_id, amount, day in [(1, 10, 1), (1, 20, 1), (1, 30, 2), (None, 40, 2)]:
+            conn.execute(text(
+                "INSERT INTO records (user_id, category_id, amount, type, date) "
+                "VALUES (1, :category_id, :amount, 'EXPENSE', :date)"
+            ), {"category_id": category_id, "amount": amount, "date": f"2024-01-0{day} 12:00:00"})
+
+    def test_upgrade_backfills_rollups_and_budget_usage(self):
+        """测试旧库升级时从 records 回填日汇总，并按回填后的日汇总重建预算分期用量"""
+        engine = new_engine()
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE record_daily_rollups"))
+            conn.execute(text("DROP TABLE budget_period_usage"))
+            self._insert_legacy_data(conn)
+
+        run_migrations(engine)
+
+        with engine.connect() as conn:
+            rollups = conn.execute(text(
+                "SELECT day, category_id, category_key, project_key, total_amount, record_count "
+                "FROM record_daily_rollups ORDER BY day, category_key"
+            )).all()
+            usage = conn.execute(text(
+                "SELECT period_start, spent_amount, record_count FROM budget_period_usage"
+            )).all()
+        assert rollups == [
+            ("2024-01-01", 1, 1, 0, 30.0, 2),
+            ("2024-01-02", None, 0, 0, 40.0, 1),
+            ("2024-01-02", 1, 1, 0, 30.0, 1),
+        ]
+        # 预算只统计有分类的支出
+        assert usage == [("2024-01-01", 60.0, 3)]
+
+    def test_upgrade_budget_category_zero(self):
+        """测试清除分类时存为 0 的预算改为 NULL，并按全部分类重建用量"""
+        engine = new_engine()
+        run_migrations(engine)
+        with engine.begin() as conn:
+            self._insert_legacy_data(conn)
+            conn.execute(text("UPDATE budgets SET category_id = 0"))
+            conn.execute(text("DELETE FROM schema_migrations WHERE version = 9"))
+        session = sessionmaker(bind=engine)()
+        session.add(Record(user_id=1, category_id=1, amount=5.0, type=RecordType.EXPENSE, date=datetime(2024, 1, 3)))
+        session.commit()
+        session.close()
+        # 旧版本按分类 0 统计，用量为空
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM budget_period_usage"))
+
+        assert run_migrations(engine) == [9]
+
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT category_id FROM budgets")).scalar() is None
+            usage = conn.execute(text(
+                "SELECT period_start, spent_amount, record_count FROM budget_period_usage"
+            )).all()
+        assert usage == [("2024-01-01", 5.0, 1)]
+
+    def test_upgrade_rollup_key_columns(self):
+        """测试旧日汇总表补齐非 NULL 键列、合并 NULL 键重复行，之后的写入按新唯一索引累加"""
+        engine = new_engine()
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE record_daily_rollups"))
+            conn.execute(text(
+                "CREATE TABLE record_daily_rollups ("
+                "id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, day DATE NOT NULL, "
+                "type VARCHAR(7) NOT NULL, category_id INTEGER, project_id INTEGER, "
+                "total_amount FLOAT NOT NULL, record_count INTEGER NOT NULL, "
+                "CONSTRAINT uq_record_daily_rollups_key UNIQUE (user_id, day, type, category_id, project_id))"
+            ))
+            self._insert_legacy_data(conn)
+            # 并发首次写入在 NULL 键上留下的重复行
+            conn.execute(text(
+                "INSERT INTO record_daily_rollups "
+                "(user_id, day, type, category_id, project_id, total_amount, record_count) VALUES "
+                "(1, '2024-01-01', 'EXPENSE', 1, NULL, 10, 1), (1, '2024-01-01', 'EXPENSE', 1, NULL, 20, 1), "
+                "(1, '2024-01-02', 'EXPENSE', 1, NULL, 30, 1), (1, '2024-01-02', 'EXPENSE', NULL, NULL, 40, 1)"
+            ))
+
+        run_migrations(engine)
+
+        assert "uq_record_daily_rollups_slot" in index_names(engine, "record_daily_rollups")
+        session = sessionmaker(bind=engine)()
+        session.add(Record(
+            user_id=1, category_id=None, amount=5.0, type=RecordType.EXPENSE, date=datetime(2024, 1, 2, 18)
+        ))
+        session.commit()
+        session.close()
+        with engine.connect() as conn:
+            rollups = conn.execute(text(
+                "SELECT day, category_key, project_key, total_amount, record_count "
+                "FROM record_daily_rollups ORDER BY day, category_key"
+            )).all()
+        assert rollups == [
+            ("2024-01-01", 1, 0, 30.0, 2),
+            ("2024-01-02", 0, 0, 45.0, 2),
+            ("2024-01-02", 1, 0, 30.0, 1),
+        ]
+
+# ---------- 查询计划测试 ----------
+
+test_engine = new_engine()
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+
+
+@pytest.fixture(scope="function")
+def db_session():
+    """创建测试数据库会话（通过迁移建表）"""
+    run_migrations(test_engine)
+    session = TestingSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=test_engine)
+    with test_engine.begin() as conn:
+        conn.execute(text("DROP TABLE schema_migrations"))
+
+
+@pytest.fixture(scope="function")
+def client(db_session):
+    """创建测试客户端"""
+    def override_get_db():
+        yield db_session
+    
+    app.dependency_overrides[get_db] = override_get_db
+    result_cache.clear()
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def test_user(db_session):
+    """创建测试用户及数据"""
+    user = User(
+        username="testuser",
+        email="test@example.com",
+        hashed_password=get_password_hash("testpassword")
+    )
+    db_session.add(user)
+    db_session.commit()
+    
+    category = Category(name="餐饮", type=CategoryType.EXPENSE, user_id=user.id)
+    project = Project(name="旅行", owner_id=user.id, created_by_id=user.id)
+    db_session.add_all([category, project])
+    db_session.commit()
+    for i in range(20):
+        db_session.add(Record(
+            user_id=user.id,
+            category_id=category.id,
+            project_id=project.id if i % 2 else None,
+            amount=10.0 + i,
+            type=RecordType.EXPENSE,
+            date=datetime(2024, 1, 1 + i)
+        ))
+    db_session.commit()
+    db_session.refresh(user)
+    return user
+
+
+def get_auth_headers(test_user):
+    """生成认证请求头"""
+    token = create_access_token(data={"sub": test_user.id})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def query_plans(client, url, headers, table):
+    """执行请求，返回其中访问指定表的 SELECT 的 EXPLAIN QUERY PLAN"""
+    captured = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and f"FROM {table}" in statement:
+            captured.append((statement, parameters))
+
+    event.listen(test_engine, "before_cursor_execute", before_execute)
+    try:
+        response = client.get(url, headers=headers)
+    finally:
+        event.remove(test_engine, "before_cursor_execute", before_execute)
+    assert response.status_code == 200
+    assert captured
+
+    plans = []
+    with test_engine.connect() as conn:
+        for statement, parameters in captured:
+            rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            plans.append(" | ".join(row[-1] for row in rows))
+    return plans
+
+
+class TestQueryPlans:
+    """热点查询使用组合索引的测试类"""
+
+    def test_records_list_uses_user_date_index(self, client, test_user):
+        """测试记录列表按 (user_id, date, id) 索引检索"""
+        plans = query_plans(
+            client, "/api/v1/records?include_total=false",
+            get_auth_headers(test_user), "records"
+        )
+        assert all("ix_records_user_date_id" in plan for plan in plans), plans
+
+    def test_records_category_filter_uses_category_index(self, client, test_user, db_session):
+        """测试按分类筛选使用 (user_id, category_id, date) 索引"""
+        category_id = db_session.query(Category.id).scalar()
+        plans = query_plans(
+            client, f"/api/v1/records?category_id={category_id}&include_total=false",
+            get_auth_headers(test_user), "records"
+        )
+        assert any("ix_records_user_category_date" in plan for plan in plans), plans
+
+    def test_monthly_statistics_uses_rollup_key(self, client, test_user):
+        """测试月度统计按日汇总的 (user_id, day) 前缀检索"""
+        plans = query_plans(
+            client, "/api/v1/statistics/monthly?year=2024&month=1",
+            get_auth_headers(test_user), "record_daily_rollups"
+        )
+        assert all("USING INDEX" in plan and "user_id=?" in plan for plan in plans), plans
+
+    def test_project_statistics_uses_project_index(self, client, test_user):
+        """测试项目统计按 project_id 索引关联日汇总"""
+        plans = query_plans(
+            client, "/api/v1/statistics/projects",
+            get_auth_headers(test_user), "projects"
+        )
+        assert any("ix_record_daily_rollups_project_type" in plan for plan in plans), plans
@@ -0,0 +1,123 @@
+import os
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import StaticPool
+from fastapi.testclient import TestClient
+from app.main import app
+from app.config import settings
+from app.cache import result_cache
+from app.db_pool import InstrumentedQueuePool, install_idle_ping, pool_status
+
+# 设置测试环境变量
+os.environ["TESTING"] = "1"
+
+OPS_TOKEN = "test-ops-token"
+
+test_engine = create_engine(
+    "sqlite:///:memory:",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+
+
+@pytest.fixture(scope="function")
+def client(monkeypatch):
+    """运维接口不访问数据库，只需配置令牌"""
+    monkeypatch.setattr(settings, "OPS_TOKEN", OPS_TOKEN)
+    result_cache.clear()
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+OPS_HEADERS = {"X-Ops-Token": OPS_TOKEN}
+
+
+class TestOpsRouter:
+    """运维接口鉴权和指标"""
+
+    @pytest.mark.parametrize("path", ["/api/v1/ops/cache", "/api/v1/ops/pool"])
+    def test_requires_ops_token(self, client, path, monkeypatch):
+        """测试缺少或错误的令牌、未配置令牌时均不可访问"""
+        assert client.get(path).status_code == 404
+        assert client.get(path, headers={"X-Ops-Token": "wrong"}).status_code == 404
+        assert client.get(path, headers=OPS_HEADERS).status_code == 200
+
+        monkeypatch.setattr(settings, "OPS_TOKEN", "")
+        assert client.get(path, headers={"X-Ops-Token": ""}).status_code == 404
+
+    def test_statistics_no_longer_exposes_process_metrics(self, client):
+        """测试进程级指标不再挂在面向用户的 /statistics 下"""
+        # 路由存在时未认证返回 401，不存在时返回 404
+        assert client.get("/api/v1/statistics/cache").status_code == 404
+        assert client.get("/api/v1/statistics/pool").status_code == 404
+
+    def test_cache_stats(self, client):
+        """测试结果缓存命中统计"""
+        result_cache.get("missing")
+        data = client.get("/api/v1/ops/cache", headers=OPS_HEADERS).json()
+        assert data["misses"] == 1
+        assert data["hits"] == 0
+
+    def test_pool_stats(self, client, monkeypatch):
+        """测试连接池状态接口（StaticPool 无排队指标，未启用异步引擎时不返回 async）"""
+        # 接口读取模块级引擎，替换为测试引擎，不依赖导入时 TESTING 是否已设置
+        monkeypatch.setattr("app.routers.ops.engine", test_engine)
+        monkeypatch.setattr("app.routers.ops.async_engine", None)
+        response = client.get("/api/v1/ops/pool", headers=OPS_HEADERS)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["pid"] == os.getpid()
+        assert [pool["name"] for pool in data["pools"]] == ["sync"]
+        assert data["pools"][0]["pool_class"] == "StaticPool"
+
+
+class TestPoolMetrics:
+    """数据库连接池指标"""
+
+    def test_instrumented_pool_wait_and_timeout(self, tmp_path):
+        """测试获取连接计数、超时计数和等待直方图"""
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'pool.db'}",
+            poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.05
+        )
+        held = engine.connect()
+        with pytest.raises(Exception):
+            engine.connect()
+        status = pool_status("sync", engine)
+        assert status["size"] == 1
+        assert status["checked_out"] == 1
+        assert status["overflow"] == 0
+        assert status["checkouts"] == 1
+        assert status["timeouts"] == 1
+        assert status["wait_max_ms"] >= 50
+        assert sum(bucket["count"] for bucket in status["wait_histogram"]) == 2
+        
+        held.close()
+        engine.dispose()
+        assert engine.pool.metrics.checkouts == 1
+
+    def test_idle_ping(self, tmp_path):
+        """测试只对空闲超过阈值的连接探活，探活失败时换新连接"""
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'ping.db'}", poolclass=InstrumentedQueuePool, pool_size=1
+        )
+        install_idle_ping(engine, idle_seconds=60)
+        connections = []
+        event.listen(engine, "connect", lambda dbapi_connection, record: connections.append(dbapi_connection))
+        
+        with engine.connect():
+            pass
+        # 刚归还的连接不探活，原连接即使已关闭也照常取出
+        connections[0].close()
+        with pytest.raises(Exception):
+            with engine.connect() as conn:
+                conn.exec_driver_sql("SELECT 1")
+        
+        engine.dispose()
+        install_idle_ping(engine, idle_seconds=0)
+        with engine.connect():
+            pass
+        connections[-1].close()
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql("SELECT 1").scalar() == 1
+        assert len(connections) == 3
@@ -1,7 +1,7 @@
 import os
 import pytest
 from datetime import datetime
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 from app.database import Base, get_db
@@ -10,6 +10,7 @@ from app.models.user import User
 from app.models.project import Project
 from app.models.record import Record, RecordType
 from app.auth.password import get_password_hash
+from app.cache import result_cache
 
 # 设置测试环境变量
 os.environ["TESTING"] = "1"
@@ -41,6 +42,8 @@ def client(db_session):
         yield db_session
     
     app.dependency_overrides[get_db] = override_get_db
+    # 每个测试重建内存数据库，用户 id 和数据版本会重复，需清空结果缓存
+    result_cache.clear()
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
@@ -223,6 +226,22 @@ class TestProjectModel:
         total = sum(r.amount for r in project.records)
         assert total == 600.00
 
+    def test_project_sql_totals(self, db_session, test_user):
+        """测试项目收支合计由数据库聚合得出"""
+        project = Project(name="装修", owner_id=test_user.id, created_by_id=test_user.id)
+        db_session.add(project)
+        db_session.commit()
+        for amount, record_type in [(100.0, RecordType.EXPENSE), (250.0, RecordType.EXPENSE), (80.0, RecordType.INCOME)]:
+            db_session.add(Record(
+                user_id=test_user.id, amount=amount, type=record_type,
+                date=datetime(2024, 3, 1), project_id=project.id
+            ))
+        db_session.commit()
+        
+        assert project.total_expenses == 350.0
+        assert project.total_income == 80.0
+        assert project.balance == -270.0
+
     def test_multiple_projects_per_user(self, db_session, test_user):
         """测试用户可以有多个项目"""
         projects = [
@@ -420,16 +439,175 @@ class TestProjectRouter:
                 headers=get_auth_headers(test_user)
             )
         
-        # 验证项目详情包含记录
+        # 默认不内嵌记录，统计数据内联返回
         response = client.get(
             f"/api/v1/projects/{project_id}",
             headers=get_auth_headers(test_user)
         )
         
+        assert response.status_code == 200
+        data = response.json()
+        assert data["records"] == []
+        assert data["stats"]["total_expenses"] == 300.00
+        
+        # 验证项目详情包含记录
+        response = client.get(
+            f"/api/v1/projects/{project_id}?include_records=true",
+            headers=get_auth_headers(test_user)
+        )
+        
         assert response.status_code == 200
         data = response.json()
         assert "records" in data
         assert len(data["records"]) == 2
+        assert data["records"][0]["category"]["name"] == "测试分类"
+        assert data["records_next_cursor"] is None
+
+    def test_project_records_pagination(self, client, test_user, db_session):
+        """测试项目记录键集分页及内嵌第一页"""
+        from app.models.category import Category, CategoryType
+        project = Project(name="装修", owner_id=test_user.id, created_by_id=test_user.id)
+        category = Category(name="材料", type=CategoryType.EXPENSE, user_id=test_user.id)
+        db_session.add_all([project, category])
+        db_session.commit()
+        project_id, category_id = project.id, category.id
+        for i in range(7):
+            db_session.add(Record(
+                user_id=test_user.id, category_id=category_id, amount=1.0 + i, type=RecordType.EXPENSE,
+                date=datetime(2024, 3, 1 + i % 3), project_id=project_id
+            ))
+        db_session.add(Record(
+            user_id=test_user.id, category_id=category_id, amount=99.0, type=RecordType.EXPENSE,
+            date=datetime(2024, 3, 1)
+        ))
+        db_session.commit()
+        headers = get_auth_headers(test_user)
+        
+        detail = client.get(
+            f"/api/v1/projects/{project_id}?include_records=true&records_limit=3", headers=headers
+        ).json()
+        assert len(detail["records"]) == 3
+        assert detail["records_next_cursor"]
+        
+        seen = [r["id"] for r in detail["records"]]
+        cursor = detail["records_next_cursor"]
+        while cursor:
+            data = client.get(
+                f"/api/v1/projects/{project_id}/records",
+                params={"page_size": 3, "cursor": cursor},
+                headers=headers
+            ).json()
+            seen.extend(r["id"] for r in data["records"])
+            cursor = data["next_cursor"]
+        
+        assert len(seen) == 7
+        assert len(set(seen)) == 7
+        
+        first_page = client.get(f"/api/v1/projects/{project_id}/records", headers=headers).json()
+        assert [r["id"] for r in first_page["records"]] == seen
+        assert first_page["has_more"] is False
+        
+        response = client.get("/api/v1/projects/999/records", headers=headers)
+        assert response.status_code == 404
+
+    def test_project_stats_sql_aggregate(self, client, test_user, db_session):
+        """测试项目统计在数据库侧聚合，不加载记录"""
+        project = Project(name="装修", budget=1000.0, owner_id=test_user.id, created_by_id=test_user.id)
+        db_session.add(project)
+        db_session.commit()
+        project_id = project.id
+        for i in range(30):
+            db_session.add(Record(
+                user_id=test_user.id,
+                amount=10.0,
+                type=RecordType.INCOME if i % 3 == 0 else RecordType.EXPENSE,
+                date=datetime(2024, 3, 1 + i % 28),
+                project_id=project_id
+            ))
+        db_session.commit()
+        
+        statements = []
+        
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(test_engine, "before_cursor_execute", capture)
+        try:
+            response = client.get(
+                f"/api/v1/projects/{project_id}/stats",
+                headers=get_auth_headers(test_user)
+            )
+        finally:
+            event.remove(test_engine, "before_cursor_execute", capture)
+        
+        assert response.status_code == 200
+        assert response.json() == {
+            "total_budget": 1000.0,
+            "total_expenses": 200.0,
+            "total_income": 100.0,
+            "balance": -100.0,
+            "budget_usage": 20.0
+        }
+        assert not [s for s in statements if "FROM records" in s]
+        assert len([s for s in statements if "FROM projects" in s]) == 1
+
+    def test_project_list_with_stats(self, client, test_user, db_session):
+        """测试项目列表附带收支汇总：整页只需一次分组查询"""
+        projects = [
+            Project(name=f"项目{i}", budget=100.0 if i % 2 == 0 else None,
+                    owner_id=test_user.id, created_by_id=test_user.id)
+            for i in range(5)
+        ]
+        db_session.add_all(projects)
+        db_session.commit()
+        project_ids = [project.id for project in projects]
+        for i, project_id in enumerate(project_ids[:4]):
+            db_session.add_all([
+                Record(user_id=test_user.id, amount=10.0 * (i + 1), type=RecordType.EXPENSE,
+                       date=datetime(2024, 3, 1), project_id=project_id),
+                Record(user_id=test_user.id, amount=5.0, type=RecordType.INCOME,
+                       date=datetime(2024, 3, 2), project_id=project_id)
+            ])
+        db_session.commit()
+        headers = get_auth_headers(test_user)
+        
+        # 默认不附带统计
+        data = client.get("/api/v1/projects", headers=headers).json()
+        assert all(project["stats"] is None for project in data["projects"])
+        assert all("records" not in project for project in data["projects"])
+        
+        statements = []
+        
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(test_engine, "before_cursor_execute", capture)
+        try:
+            response = client.get(
+                "/api/v1/projects?include_stats=true&include_total=false",
+                headers=headers
+            )
+        finally:
+            event.remove(test_engine, "before_cursor_execute", capture)
+        
+        assert response.status_code == 200
+        stats = {project["id"]: project["stats"] for project in response.json()["projects"]}
+        assert stats[project_ids[0]] == {
+            "total_budget": 100.0,
+            "total_expenses": 10.0,
+            "total_income": 5.0,
+            "balance": -5.0,
+            "budget_usage": 10.0
+        }
+        assert stats[project_ids[1]]["total_expenses"] == 20.0
+        assert stats[project_ids[1]]["budget_usage"] is None
+        assert stats[project_ids[4]]["total_expenses"] == 0.0
+        assert stats[project_ids[4]]["balance"] == 0.0
+        
+        # 用户认证之外只有分页查询和一次分组汇总
+        page_statements = [s for s in statements if "FROM users" not in s]
+        assert len(page_statements) == 2
+        assert not [s for s in statements if "FROM records" in s]
 
     def test_unauthorized_access(self, client):
         """测试未授权访问"""
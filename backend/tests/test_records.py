@@ -1,7 +1,11 @@
 import os
+import csv
+import gzip
+import io
+import json
 import pytest
 from datetime import datetime
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 from app.database import Base, get_db
@@ -11,6 +15,7 @@ from app.models.category import Category, CategoryType, CategoryLevel
 from app.models.project import Project
 from app.models.record import Record, RecordType
 from app.auth.password import get_password_hash
+from app.cache import result_cache
 
 # 设置测试环境变量
 os.environ["TESTING"] = "1"
@@ -42,6 +47,8 @@ def client(db_session):
         yield db_session
     
     app.dependency_overrides[get_db] = override_get_db
+    # 每个测试重建内存数据库，用户 id 和数据版本会重复，需清空结果缓存
+    result_cache.clear()
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
@@ -530,7 +537,439 @@ class TestRecordRouter:
         )
         assert response.json()["project_id"] == project_id
 
+    def test_get_records_cursor_pagination(self, client, test_user, sample_categories, db_session):
+        """测试游标分页遍历全部记录且与偏移分页顺序一致"""
+        category = sample_categories[0]
+        same_day = datetime(2024, 5, 1, 12, 0)
+        for i in range(7):
+            db_session.add(Record(
+                user_id=test_user.id,
+                category_id=category.id,
+                amount=10.0 + i,
+                type=RecordType.EXPENSE,
+                # 部分记录日期相同，依赖 id 决定顺序
+                date=same_day if i % 2 else datetime(2024, 5, 1 + i, 8, 0)
+            ))
+        db_session.commit()
+        headers = get_auth_headers(test_user)
+        
+        expected = [
+            r["id"] for r in client.get(
+                "/api/v1/records?page_size=100", headers=headers
+            ).json()["records"]
+        ]
+        
+        seen = []
+        url = "/api/v1/records?page_size=3"
+        while True:
+            data = client.get(url, headers=headers).json()
+            seen.extend(r["id"] for r in data["records"])
+            if not data["next_cursor"]:
+                break
+            url = f"/api/v1/records?page_size=3&cursor={data['next_cursor']}"
+        assert seen == expected
+
+    def test_get_records_without_total(self, client, test_user, sample_categories, db_session):
+        """测试关闭总数时只取 page_size+1 条判断 has_more，且不执行 COUNT"""
+        category = sample_categories[0]
+        for i in range(3):
+            db_session.add(Record(
+                user_id=test_user.id,
+                category_id=category.id,
+                amount=10.0,
+                type=RecordType.EXPENSE,
+                date=datetime(2024, 6, 1 + i)
+            ))
+        db_session.commit()
+        headers = get_auth_headers(test_user)
+        
+        statements = []
+        
+        def before_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(test_engine, "before_cursor_execute", before_execute)
+        try:
+            data = client.get("/api/v1/records?page_size=2&include_total=false", headers=headers).json()
+        finally:
+            event.remove(test_engine, "before_cursor_execute", before_execute)
+        assert data["total"] is None
+        assert data["has_more"] is True
+        assert len(data["records"]) == 2
+        assert not any("count(" in statement.lower() for statement in statements)
+        
+        data = client.get("/api/v1/records?page=2&page_size=2", headers=headers).json()
+        assert data["total"] == 3
+        assert data["has_more"] is False
+        assert len(data["records"]) == 1
+
+    def test_get_records_total_cached_until_write(self, client, test_user, sample_categories):
+        """测试总数缓存在写入后失效"""
+        category = sample_categories[0]
+        headers = get_auth_headers(test_user)
+        assert client.get("/api/v1/records", headers=headers).json()["total"] == 0
+        assert client.get("/api/v1/records", headers=headers).json()["total"] == 0
+        assert result_cache.hits == 1
+        
+        client.post("/api/v1/records", json={
+            "category_id": category.id,
+            "amount": 30.00,
+            "type": "expense",
+            "date": datetime.now().isoformat()
+        }, headers=headers)
+        assert client.get("/api/v1/records", headers=headers).json()["total"] == 1
+
+    def test_get_records_invalid_cursor(self, client, test_user):
+        """测试无效游标"""
+        response = client.get("/api/v1/records?cursor=not-a-cursor", headers=get_auth_headers(test_user))
+        assert response.status_code == 400
+
+    def test_create_records_batch(self, client, test_user, sample_categories, db_session):
+        """测试批量创建记录：一次校验、批量插入、逐条报告错误"""
+        category, income_category = sample_categories
+        project = Project(name="旅行", owner_id=test_user.id, created_by_id=test_user.id)
+        db_session.add(project)
+        db_session.commit()
+        
+        day = datetime(2024, 7, 1, 12, 0).isoformat()
+        items = [
+            {"category_id": category.id, "amount": 10.0 + i, "type": "expense", "date": day}
+            for i in range(50)
+        ]
+        items.append({"category_id": income_category.id, "amount": 100.0, "type": "income",
+                      "date": day, "project_id": project.id})
+        items.append({"category_id": 9999, "amount": 1.0, "type": "expense", "date": day})
+        items.append({"category_id": category.id, "amount": 1.0, "type": "expense",
+                      "date": day, "project_id": 9999})
+        items.append({"category_id": category.id, "amount": 9.0, "type": "expense", "date": day,
+                      "is_aa": True, "payer_count": 3})
+        
+        statements = []
+        
+        def before_execute(conn, cursor, statement, parameters, context, executemany):
+            if "records" in statement and "record_daily_rollups" not in statement:
+                statements.append(statement)
+        
+        event.listen(test_engine, "before_cursor_execute", before_execute)
+        try:
+            response = client.post(
+                "/api/v1/records/batch",
+                json={"records": items},
+                headers=get_auth_headers(test_user)
+            )
+        finally:
+            event.remove(test_engine, "before_cursor_execute", before_execute)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["created"] == 52
+        assert data["failed"] == 2
+        assert [(e["index"], e["detail"]) for e in data["errors"]] == [(51, "分类不存在"), (52, "项目不存在")]
+        # 分类、项目各一次查询，记录一次 executemany
+        assert len(statements) == 3
+        
+        assert db_session.query(Record).count() == 52
+        aa_record = db_session.query(Record).filter(Record.is_aa == True).one()
+        assert aa_record.payer_per_share == 3.0
+        
+        # 日汇总同步更新
+        now = datetime(2024, 7, 1)
+        stats = client.get(
+            f"/api/v1/statistics/monthly?year={now.year}&month={now.month}",
+            headers=get_auth_headers(test_user)
+        ).json()
+        assert stats["record_count"] == 52
+        assert stats["total_income"] == 100.0
+
+    def test_create_records_batch_limits(self, client, test_user):
+        """测试批量创建的条数限制"""
+        response = client.post(
+            "/api/v1/records/batch",
+            json={"records": []},
+            headers=get_auth_headers(test_user)
+        )
+        assert response.status_code == 422
+
+    def test_import_records_csv(self, client, test_user, sample_categories, db_session, monkeypatch):
+        """测试流式导入：列映射、分类名称解析、分批插入、进度与行级错误"""
+        monkeypatch.setattr("app.routers.records.IMPORT_BATCH_SIZE", 10)
+        lines = ["交易日期,金额,分类,摘要"]
+        for i in range(25):
+            lines.append(f"2024/08/{1 + i % 28:02d},-{10 + i},餐饮,午餐{i}")
+        lines.append("2024-08-30 09:00:00,5000,工资,八月工资")
+        lines.append("2024-08-31,12,不存在的分类,")
+        lines.append("not-a-date,12,餐饮,")
+        content = "\n".join(lines).encode("utf-8")
+        
+        response = client.post(
+            "/api/v1/records/import",
+            files={"file": ("bank.csv", content, "text/csv")},
+            data={"mapping": json.dumps({"交易日期": "date", "金额": "amount", "分类": "category", "摘要": "description"})},
+            headers=get_auth_headers(test_user)
+        )
+        assert response.status_code == 200
+        messages = [json.loads(line) for line in response.text.splitlines()]
+        assert [m["type"] for m in messages] == ["progress", "progress", "done"]
+        assert [m["processed"] for m in messages[:2]] == [10, 20]
+        
+        done = messages[-1]
+        assert done["processed"] == 28
+        assert done["created"] == 26
+        assert done["failed"] == 2
+        errors = [e for m in messages for e in m["errors"]]
+        assert [e["row"] for e in errors] == [28, 29]
+        
+        assert db_session.query(Record).filter(Record.type == RecordType.EXPENSE).count() == 25
+        income = db_session.query(Record).filter(Record.type == RecordType.INCOME).one()
+        assert income.amount == 5000.0
+        assert income.category_id == sample_categories[1].id
+
+    def test_import_records_malformed_csv(self, client, test_user, sample_categories, db_session, monkeypatch):
+        """测试读取中途遇到格式错误（字段超长）时保留已提交的批次，并以 done 行结束"""
+        monkeypatch.setattr("app.routers.records.IMPORT_BATCH_SIZE", 10)
+        lines = ["date,amount,category"]
+        lines += [f"2024-08-{1 + i:02d},-{10 + i},餐饮" for i in range(12)]
+        lines.append("2024-08-20,-1," + "x" * (csv.field_size_limit() + 1))
+        lines.append("2024-08-21,-1,餐饮")
+        content = "\n".join(lines).encode("utf-8")
+        
+        response = client.post(
+            "/api/v1/records/import",
+            files={"file": ("bad.csv", content, "text/csv")},
+            headers=get_auth_headers(test_user)
+        )
+        assert response.status_code == 200
+        messages = [json.loads(line) for line in response.text.splitlines()]
+        assert [m["type"] for m in messages] == ["progress", "done"]
+        
+        done = messages[-1]
+        assert done["processed"] == 12
+        assert done["created"] == 10
+        assert done["failed"] == 2
+        assert done["errors"][0]["row"] == 14
+        assert "文件格式错误" in done["errors"][0]["detail"]
+        assert db_session.query(Record).count() == 10
+
+    def test_import_records_invalid_mapping(self, client, test_user):
+        """测试导入缺少必需列时拒绝"""
+        response = client.post(
+            "/api/v1/records/import",
+            files={"file": ("a.csv", "date,amount\n2024-01-01,1\n".encode("utf-8"), "text/csv")},
+            headers=get_auth_headers(test_user)
+        )
+        assert response.status_code == 400
+
+    @pytest.mark.parametrize("fmt", ["csv", "jsonl"])
+    def test_export_records(self, client, test_user, sample_categories, db_session, monkeypatch, fmt):
+        """测试流式导出全部记录（跨多个游标分块）并支持筛选"""
+        monkeypatch.setattr("app.routers.records.EXPORT_CHUNK_SIZE", 7)
+        category, income_category = sample_categories
+        for i in range(30):
+            db_session.add(Record(
+                user_id=test_user.id,
+                category_id=income_category.id if i % 3 == 0 else category.id,
+                amount=1.0 + i,
+                type=RecordType.INCOME if i % 3 == 0 else RecordType.EXPENSE,
+                description=f"备注,{i}",
+                date=datetime(2024, 9, 1 + i % 28, 12, 0)
+            ))
+        db_session.commit()
+        headers = get_auth_headers(test_user)
+        
+        response = client.get(f"/api/v1/records/export?format={fmt}", headers=headers)
+        assert response.status_code == 200
+        assert f"records.{fmt}" in response.headers["content-disposition"]
+        if fmt == "csv":
+            rows = list(csv.DictReader(io.StringIO(response.text)))
+        else:
+            rows = [json.loads(line) for line in response.text.splitlines()]
+        assert len(rows) == 30
+        assert rows[0]["category_name"] in ("餐饮", "工资")
+        assert {r["description"] for r in rows} == {f"备注,{i}" for i in range(30)}
+        
+        response = client.get(f"/api/v1/records/export?format={fmt}&type=income", headers=headers)
+        text = response.text
+        count = len(text.splitlines()) - (1 if fmt == "csv" else 0)
+        assert count == 10
+
+    def test_export_records_gzip(self, client, test_user, sample_categories, db_session):
+        """测试 gzip 压缩导出"""
+        db_session.add(Record(
+            user_id=test_user.id,
+            category_id=sample_categories[0].id,
+            amount=12.5,
+            type=RecordType.EXPENSE,
+            date=datetime(2024, 9, 1)
+        ))
+        db_session.commit()
+        
+        response = client.get(
+            "/api/v1/records/export?format=jsonl&gzip=true",
+            headers=get_auth_headers(test_user)
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/gzip"
+        lines = gzip.decompress(response.content).decode("utf-8").splitlines()
+        assert json.loads(lines[0])["amount"] == 12.5
+
+    def test_export_records_invalid_format(self, client, test_user):
+        """测试不支持的导出格式"""
+        response = client.get("/api/v1/records/export?format=xml", headers=get_auth_headers(test_user))
+        assert response.status_code == 400
+
+    def test_search_records_synced(self, client, test_user, sample_categories):
+        """测试全文检索随创建、修改、删除同步"""
+        category = sample_categories[0]
+        headers = get_auth_headers(test_user)
+        
+        def create(description):
+            response = client.post("/api/v1/records", json={
+                "category_id": category.id,
+                "amount": 10.0,
+                "type": "expense",
+                "description": description,
+                "date": "2024-09-01T12:00:00"
+            }, headers=headers)
+            return response.json()["id"]
+        
+        lunch_id = create("和同事吃午餐 lunch")
+        dinner_id = create("家庭晚餐 dinner")
+        
+        def search(q):
+            response = client.get("/api/v1/records/search", params={"q": q}, headers=headers)
+            assert response.status_code == 200
+            return [r["id"] for r in response.json()["records"]]
+        
+        assert search("吃午餐") == [lunch_id]
+        assert search("lunch 同事") == [lunch_id]
+        assert search("dinner") == [dinner_id]
+        
+        client.put(f"/api/v1/records/{dinner_id}", json={"description": "周末早餐 brunch"}, headers=headers)
+        assert search("dinner") == []
+        assert search("brunch") == [dinner_id]
+        
+        client.delete(f"/api/v1/records/{lunch_id}", headers=headers)
+        assert search("lunch") == []
+        
+        # 短于索引分词长度的关键词退回 LIKE
+        assert search("早餐") == [dinner_id]
+
+    def test_search_records_ranked_pagination(self, client, test_user, sample_categories, db_session):
+        """测试检索结果按相关度排序并键集分页，且只返回当前用户的记录"""
+        category = sample_categories[0]
+        other = User(username="other", email="other@example.com", hashed_password="x")
+        db_session.add(other)
+        db_session.flush()
+        for i in range(7):
+            db_session.add(Record(
+                user_id=test_user.id,
+                category_id=category.id,
+                amount=1.0,
+                type=RecordType.EXPENSE,
+                description="coffee " * (i + 1) + f"#{i}",
+                date=datetime(2024, 9, 1)
+            ))
+        db_session.add(Record(
+            user_id=other.id, amount=1.0, type=RecordType.EXPENSE,
+            description="coffee", date=datetime(2024, 9, 1)
+        ))
+        db_session.commit()
+        headers = get_auth_headers(test_user)
+        
+        seen = []
+        cursor = None
+        while True:
+            params = {"q": "coffee", "page_size": 3}
+            if cursor:
+                params["cursor"] = cursor
+            data = client.get("/api/v1/records/search", params=params, headers=headers).json()
+            seen.extend(data["records"])
+            cursor = data["next_cursor"]
+            if not data["has_more"]:
+                assert cursor is None
+                break
+        
+        assert len(seen) == 7
+        assert len({r["id"] for r in seen}) == 7
+        assert all(r["user_id"] == test_user.id for r in seen)
+        scores = [r["score"] for r in seen]
+        assert scores == sorted(scores, reverse=True)
+        assert seen[0]["description"].count("coffee") == 7
+
+    def test_search_records_invalid(self, client, test_user):
+        """测试空关键词和无效游标"""
+        headers = get_auth_headers(test_user)
+        assert client.get("/api/v1/records/search", params={"q": "  "}, headers=headers).status_code == 400
+        response = client.get(
+            "/api/v1/records/search", params={"q": "coffee", "cursor": "bad"}, headers=headers
+        )
+        assert response.status_code == 400
+
+    def test_records_etag_not_modified(self, client, test_user, sample_categories):
+        """测试记录列表 ETag：数据未变化返回 304，写入后变化"""
+        category = sample_categories[0]
+        headers = get_auth_headers(test_user)
+        
+        response = client.get("/api/v1/records", headers=headers)
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+        assert etag.startswith('W/"')
+        
+        response = client.get("/api/v1/records", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+        
+        client.post("/api/v1/records", json={
+            "category_id": category.id,
+            "amount": 20.00,
+            "type": "expense",
+            "date": datetime.now().isoformat()
+        }, headers=headers)
+        
+        response = client.get("/api/v1/records", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        assert response.json()["total"] == 1
+
     def test_unauthorized_access(self, client):
         """测试未授权访问"""
         response = client.get("/api/v1/records")
         assert response.status_code == 401
+
+    def test_server_timing_counts_queries(self, client, test_user, sample_categories):
+        """测试 Server-Timing 响应头中的 SQL 语句数与实际执行一致"""
+        headers = get_auth_headers(test_user)
+        statements = []
+        
+        def before_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(test_engine, "before_cursor_execute", before_execute)
+        try:
+            response = client.get("/api/v1/records", headers=headers)
+        finally:
+            event.remove(test_engine, "before_cursor_execute", before_execute)
+        assert response.status_code == 200
+        db_timing, app_timing = response.headers["Server-Timing"].split(", ")
+        assert db_timing.startswith("db;dur=")
+        assert db_timing.endswith(f';desc="{len(statements)} queries"')
+        assert app_timing.startswith("app;dur=")
+
+    def test_slow_request_log(self, client, test_user, sample_categories, monkeypatch, caplog):
+        """测试慢请求日志附带执行的语句"""
+        from app.config import settings
+        monkeypatch.setattr(settings, "SLOW_REQUEST_MS", 1)
+        monkeypatch.setattr(settings, "SLOW_REQUEST_MAX_STATEMENTS", 1)
+        headers = get_auth_headers(test_user)
+        
+        with caplog.at_level("INFO", logger="app.request_timing"):
+            client.get("/api/v1/records", headers=headers)
+        
+        request_log, slow_log = caplog.records[-2:]
+        assert request_log.path == "/api/v1/records"
+        assert request_log.status == 200
+        assert request_log.db_queries > 1
+        assert slow_log.levelname == "WARNING"
+        assert len(slow_log.statements) == 1
+        assert "SELECT" in slow_log.statements[0][1]
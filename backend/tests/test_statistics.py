@@ -1,7 +1,8 @@
 import os
 import pytest
+from contextlib import contextmanager
 from datetime import datetime
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 from app.database import Base, get_db
@@ -10,9 +11,12 @@ from app.models.user import User
 from app.models.category import Category, CategoryType
 from app.models.record import Record, RecordType
 from app.models.project import Project
+from app.models.budget import Budget, BudgetPeriodType
+from app.models.rollup import RecordDailyRollup, apply_rollup_deltas, rebuild_rollups
 from app.auth.password import get_password_hash
 from fastapi.testclient import TestClient
 from app.auth.jwt import create_access_token
+from app.cache import MemoryLRUCache, result_cache
 
 # 设置测试环境变量
 os.environ["TESTING"] = "1"
@@ -43,6 +47,8 @@ def client(db_session):
         yield db_session
     
     app.dependency_overrides[get_db] = override_get_db
+    # 每个测试重建内存数据库，用户 id 和数据版本会重复，需清空结果缓存
+    result_cache.clear()
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
@@ -150,6 +156,24 @@ def get_auth_headers(test_user):
     return {"Authorization": f"Bearer {token}"}
 
 
+@contextmanager
+def count_record_queries():
+    """统计期间对 records / record_daily_rollups 表执行的 SELECT 语句"""
+    statements = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and (
+            "records" in statement or "record_daily_rollups" in statement
+        ):
+            statements.append(statement)
+
+    event.listen(test_engine, "before_cursor_execute", before_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(test_engine, "before_cursor_execute", before_execute)
+
+
 class TestStatisticsAPI:
     """Statistics API 测试类"""
 
@@ -166,6 +190,23 @@ class TestStatisticsAPI:
         assert "total_expense" in data
         assert "balance" in data
 
+    def test_monthly_statistics_single_query(self, client, test_user, test_records):
+        """测试月度统计一次查询得到收入、支出和笔数"""
+        now = datetime.now()
+        headers = get_auth_headers(test_user)
+        with count_record_queries() as statements:
+            response = client.get(
+                f"/api/v1/statistics/monthly?year={now.year}&month={now.month}",
+                headers=headers
+            )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total_income"] == 5000.00
+        assert data["total_expense"] == 800.00
+        assert data["balance"] == 4200.00
+        assert data["record_count"] == 3
+        assert len(statements) == 1
+
     def test_range_statistics(self, client, test_user, test_records):
         """测试时间段统计"""
         now = datetime.now()
@@ -241,6 +282,40 @@ class TestStatisticsAPI:
         assert response.status_code == 200
         data = response.json()
         assert isinstance(data, list)
+        assert data[0]["project_id"] == test_project.id
+        assert data[0]["total_income"] == 2000.00
+        assert data[0]["total_expense"] == 1000.00
+        assert data[0]["balance"] == 1000.00
+
+    @pytest.mark.parametrize("project_count", [1, 20, 200])
+    def test_project_statistics_constant_queries(self, client, test_user, db_session, project_count):
+        """测试项目统计的查询次数不随项目数量增长"""
+        now = datetime.now()
+        for i in range(project_count):
+            project = Project(
+                name=f"项目{i:03d}",
+                owner_id=test_user.id,
+                created_by_id=test_user.id
+            )
+            db_session.add(project)
+            db_session.flush()
+            db_session.add(Record(
+                user_id=test_user.id,
+                project_id=project.id,
+                amount=10.0,
+                type=RecordType.EXPENSE,
+                date=now
+            ))
+        db_session.commit()
+        
+        headers = get_auth_headers(test_user)
+        with count_record_queries() as statements:
+            response = client.get("/api/v1/statistics/projects", headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) == project_count
+        assert all(p["total_expense"] == 10.0 for p in data)
+        assert len(statements) == 1
 
     def test_overview_statistics(self, client, test_user, test_records):
         """测试综合概览"""
@@ -260,7 +335,283 @@ class TestStatisticsAPI:
         assert "top_categories" in data
         assert "top_projects" in data
 
+    def test_overview_top_projects(self, client, test_user, db_session):
+        """测试概览 Top 项目按支出排序并包含收入"""
+        now = datetime.now()
+        for i in range(8):
+            project = Project(
+                name=f"项目{i}",
+                owner_id=test_user.id,
+                created_by_id=test_user.id
+            )
+            db_session.add(project)
+            db_session.flush()
+            db_session.add(Record(
+                user_id=test_user.id,
+                project_id=project.id,
+                amount=100.0 * (i + 1),
+                type=RecordType.EXPENSE,
+                date=now
+            ))
+            db_session.add(Record(
+                user_id=test_user.id,
+                project_id=project.id,
+                amount=50.0,
+                type=RecordType.INCOME,
+                date=now
+            ))
+        db_session.commit()
+        
+        headers = get_auth_headers(test_user)
+        with count_record_queries() as statements:
+            response = client.get("/api/v1/statistics/overview", headers=headers)
+        assert response.status_code == 200
+        top_projects = response.json()["top_projects"]
+        assert [p["total_expense"] for p in top_projects] == [800.0, 700.0, 600.0, 500.0, 400.0]
+        assert all(p["total_income"] == 50.0 for p in top_projects)
+        assert top_projects[0]["balance"] == -750.0
+        # 总计、Top 分类、Top 项目各一次查询
+        assert len(statements) == 3
+
+    @pytest.mark.parametrize("bucket,expected", [
+        ("day", [("2024-01-30", 100.0), ("2024-01-31", 0.0), ("2024-02-01", 0.0), ("2024-02-02", 0.0)]),
+        ("week", [("2024-01-29", 100.0)]),
+        ("month", [("2024-01-01", 100.0), ("2024-02-01", 0.0)]),
+        ("year", [("2024-01-01", 100.0)]),
+    ])
+    def test_series_statistics(self, client, test_user, test_category, db_session, bucket, expected):
+        """测试时间序列按粒度分组并补零"""
+        for amount, day in [(60.0, datetime(2024, 1, 30, 8)), (40.0, datetime(2024, 1, 30, 20)),
+                            (5000.0, datetime(2024, 2, 5))]:
+            db_session.add(Record(
+                user_id=test_user.id,
+                category_id=test_category.id,
+                amount=amount,
+                type=RecordType.EXPENSE,
+                date=day
+            ))
+        db_session.commit()
+        
+        headers = get_auth_headers(test_user)
+        with count_record_queries() as statements:
+            response = client.get(
+                f"/api/v1/statistics/series?bucket={bucket}&date_from=2024-01-30&date_to=2024-02-02",
+                headers=headers
+            )
+        assert response.status_code == 200
+        points = response.json()["points"]
+        assert [(p["bucket_start"], p["total_expense"]) for p in points] == expected
+        assert all(p["balance"] == -p["total_expense"] for p in points)
+        assert len(statements) == 1
+
+    def test_series_statistics_invalid_params(self, client, test_user):
+        """测试时间序列参数校验"""
+        headers = get_auth_headers(test_user)
+        response = client.get(
+            "/api/v1/statistics/series?bucket=hour&date_from=2024-01-01&date_to=2024-01-31",
+            headers=headers
+        )
+        assert response.status_code == 400
+        response = client.get(
+            "/api/v1/statistics/series?bucket=day&date_from=2000-01-01&date_to=2024-01-31",
+            headers=headers
+        )
+        assert response.status_code == 400
+
+    def test_overview_etag_not_modified(self, client, test_user, test_records):
+        """测试概览 ETag 命中时不查询记录"""
+        headers = get_auth_headers(test_user)
+        response = client.get("/api/v1/statistics/overview", headers=headers)
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+        
+        with count_record_queries() as statements:
+            response = client.get(
+                "/api/v1/statistics/overview",
+                headers={**headers, "If-None-Match": f'"other", {etag}'}
+            )
+        assert response.status_code == 304
+        assert statements == []
+
     def test_unauthorized_access(self, client):
         """测试未授权访问"""
         response = client.get("/api/v1/statistics/monthly?year=2024&month=1")
         assert response.status_code == 401
+
+
+class TestRecordDailyRollups:
+    """日汇总表维护测试类"""
+
+    def _rollup_rows(self, db_session):
+        db_session.expire_all()
+        return [
+            (r.day, r.type, r.category_id, r.project_id, round(r.total_amount, 2), r.record_count)
+            for r in db_session.query(RecordDailyRollup).order_by(
+                RecordDailyRollup.day, RecordDailyRollup.type, RecordDailyRollup.category_id
+            ).all()
+        ]
+
+    def test_rollups_follow_record_writes(self, client, test_user, test_category, test_project, db_session):
+        """测试创建、修改、关联项目、删除记录时同步维护日汇总"""
+        headers = get_auth_headers(test_user)
+        day = datetime(2024, 3, 15, 12, 0)
+        
+        ids = []
+        for amount in (100.0, 50.0):
+            response = client.post("/api/v1/records", json={
+                "category_id": test_category.id,
+                "amount": amount,
+                "type": "expense",
+                "date": day.isoformat()
+            }, headers=headers)
+            assert response.status_code == 201
+            ids.append(response.json()["id"])
+        assert self._rollup_rows(db_session) == [
+            (day.date(), RecordType.EXPENSE, test_category.id, None, 150.0, 2)
+        ]
+        
+        # 修改金额和日期
+        response = client.put(f"/api/v1/records/{ids[1]}", json={
+            "amount": 80.0,
+            "date": datetime(2024, 3, 16, 9, 0).isoformat()
+        }, headers=headers)
+        assert response.status_code == 200
+        assert self._rollup_rows(db_session) == [
+            (day.date(), RecordType.EXPENSE, test_category.id, None, 100.0, 1),
+            (datetime(2024, 3, 16).date(), RecordType.EXPENSE, test_category.id, None, 80.0, 1),
+        ]
+        
+        # 关联项目后汇总键变化
+        response = client.post(
+            f"/api/v1/records/{ids[0]}/project?project_id={test_project.id}",
+            headers=headers
+        )
+        assert response.status_code == 200
+        assert self._rollup_rows(db_session)[0] == (
+            day.date(), RecordType.EXPENSE, test_category.id, test_project.id, 100.0, 1
+        )
+        
+        # 删除记录后清除空汇总行
+        for record_id in ids:
+            assert client.delete(f"/api/v1/records/{record_id}", headers=headers).status_code == 200
+        assert self._rollup_rows(db_session) == []
+
+    def test_apply_deltas_upserts_null_keys(self, test_user, test_category, db_session):
+        """测试 category_id / project_id 为 NULL 的汇总键按哨兵值累加到同一行，扣减不存在的行不留痕迹"""
+        day = datetime(2024, 3, 15).date()
+        null_key = (test_user.id, day, RecordType.EXPENSE, None, None)
+        for _ in range(2):
+            apply_rollup_deltas(db_session, {null_key: (10.0, 1)})
+            db_session.commit()
+        apply_rollup_deltas(db_session, {(test_user.id, day, RecordType.EXPENSE, test_category.id, None): (-5.0, -1)})
+        db_session.commit()
+        assert self._rollup_rows(db_session) == [(day, RecordType.EXPENSE, None, None, 20.0, 2)]
+
+        apply_rollup_deltas(db_session, {null_key: (-20.0, -2)})
+        db_session.commit()
+        assert self._rollup_rows(db_session) == []
+
+    def test_rebuild_rollups(self, test_user, test_records, db_session):
+        """测试从 records 重建日汇总与增量维护结果一致"""
+        maintained = self._rollup_rows(db_session)
+        assert maintained
+        
+        db_session.query(RecordDailyRollup).delete()
+        db_session.commit()
+        assert self._rollup_rows(db_session) == []
+        
+        rebuild_rollups(db_session, user_id=test_user.id)
+        assert self._rollup_rows(db_session) == maintained
+
+    def test_statistics_do_not_scan_records(self, client, test_user, test_records):
+        """测试统计接口只读取日汇总，不扫描 records"""
+        now = datetime.now()
+        headers = get_auth_headers(test_user)
+        with count_record_queries() as statements:
+            response = client.get(
+                f"/api/v1/statistics/monthly?year={now.year}&month={now.month}",
+                headers=headers
+            )
+        assert response.status_code == 200
+        assert response.json()["total_expense"] == 800.00
+        assert statements
+        assert not any("FROM records" in statement for statement in statements)
+
+
+class TestResultCache:
+    """统计结果缓存测试类"""
+
+    def test_cache_hit_until_write(self, client, test_user, test_category, test_records, db_session):
+        """测试重复请求命中缓存，写入记录后失效"""
+        now = datetime.now()
+        url = f"/api/v1/statistics/monthly?year={now.year}&month={now.month}"
+        headers = get_auth_headers(test_user)
+        
+        with count_record_queries() as statements:
+            first = client.get(url, headers=headers).json()
+            second = client.get(url, headers=headers).json()
+        assert first == second
+        assert len(statements) == 1
+        assert result_cache.hits == 1
+        assert result_cache.misses == 1
+        
+        response = client.post("/api/v1/records", json={
+            "category_id": test_category.id,
+            "amount": 200.0,
+            "type": "expense",
+            "date": now.isoformat()
+        }, headers=headers)
+        assert response.status_code == 201
+        
+        with count_record_queries() as statements:
+            data = client.get(url, headers=headers).json()
+        assert data["total_expense"] == first["total_expense"] + 200.0
+        assert len(statements) == 1
+        
+        stats = result_cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 2
+
+    def test_cache_key_includes_params(self, client, test_user, test_records):
+        """测试不同参数分别缓存"""
+        headers = get_auth_headers(test_user)
+        client.get("/api/v1/statistics/monthly?year=2024&month=1", headers=headers)
+        client.get("/api/v1/statistics/monthly?year=2024&month=2", headers=headers)
+        assert result_cache.hits == 0
+        assert result_cache.misses == 2
+
+    def test_data_version_bumped_by_writes(self, test_user, test_category, db_session):
+        """测试分类、项目、预算写入递增用户数据版本"""
+        version = test_user.data_version
+        
+        test_category.name = "外卖"
+        db_session.commit()
+        assert test_user.data_version == version + 1
+        
+        project = Project(name="装修", owner_id=test_user.id, created_by_id=test_user.id)
+        db_session.add(project)
+        db_session.commit()
+        assert test_user.data_version == version + 2
+        
+        db_session.add(Budget(
+            name="月预算",
+            amount=1000.0,
+            period_type=BudgetPeriodType.MONTHLY,
+            start_date=datetime.now(),
+            user_id=test_user.id
+        ))
+        db_session.commit()
+        assert test_user.data_version == version + 3
+
+    def test_memory_lru_cache_eviction_and_ttl(self):
+        """测试进程内 LRU 淘汰与过期"""
+        cache = MemoryLRUCache(max_entries=2)
+        cache.set("a", 1, ttl=60)
+        cache.set("b", 2, ttl=60)
+        assert cache.get("a") == 1
+        cache.set("c", 3, ttl=60)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        cache.set("d", 4, ttl=-1)
+        assert cache.get("d") is None
+
@@ -1,13 +1,16 @@
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 from app.database import Base, get_db
 from app.main import app
 from app.models.user import User
 from app.models.invitation import Invitation
+from app.models.category import Category, CategoryType
 from app.auth.password import get_password_hash
+from app.auth.jwt import create_access_token
+from app.auth.user_cache import auth_cache
 
 # 测试数据库
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
@@ -36,6 +39,8 @@ def client(db_session):
         yield db_session
     
     app.dependency_overrides[get_db] = override_get_db
+    # 每个测试重建内存数据库，用户 id 会重复，需清空认证缓存
+    auth_cache.clear()
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
@@ -137,7 +142,7 @@ def test_get_invitations(client, test_user, auth_headers, db_session):
         headers=auth_headers
     )
     assert response.status_code == 200
-    assert len(response.json()) == 1
+    assert len(response.json()["categories"]) == 1
     assert response.json()[0]["code"] == "TESTINVITE"
     assert response.json()[0]["max_uses"] == 5
 
@@ -174,3 +179,130 @@ def test_get_profile_without_token(client):
     """测试无 token 访问被拒绝"""
     response = client.get("/api/v1/users/profile")
     assert response.status_code == 401
+
+
+def get_auth_headers(user):
+    """直接签发令牌获取认证头"""
+    token = create_access_token({"sub": user.id, "username": user.username})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _user_queries(db_session, request):
+    """执行请求并返回其中读取 users 表的语句"""
+    db_session.expunge_all()
+    statements = []
+    
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(test_engine, "before_cursor_execute", capture)
+    try:
+        response = request()
+    finally:
+        event.remove(test_engine, "before_cursor_execute", capture)
+    return response, [s for s in statements if "FROM users" in s]
+
+
+def _selects_only_data_version(statement):
+    """语句是否只读取 users.data_version 一列"""
+    columns = statement.split("FROM users")[0]
+    return "users.data_version" in columns and "users.username" not in columns
+
+
+def test_current_user_cached(client, test_user, db_session):
+    """测试已认证用户走缓存快照，只读取 data_version 一列"""
+    auth_headers = get_auth_headers(test_user)
+    get_profile = lambda: client.get("/api/v1/users/profile", headers=auth_headers)
+    
+    response, queries = _user_queries(db_session, get_profile)
+    assert response.status_code == 200
+    assert len(queries) == 1
+    assert not _selects_only_data_version(queries[0])
+    
+    response, queries = _user_queries(db_session, get_profile)
+    assert response.status_code == 200
+    assert response.json()["username"] == "testuser"
+    assert len(queries) == 1
+    assert _selects_only_data_version(queries[0])
+    
+    # 数据版本变化不使快照失效，读到的是最新版本
+    user_id = test_user.id
+    db_session.add(Category(name="餐饮", type=CategoryType.EXPENSE, user_id=user_id))
+    db_session.commit()
+    response, queries = _user_queries(db_session, get_profile)
+    assert len(queries) == 1
+    assert _selects_only_data_version(queries[0])
+    db_session.expunge_all()
+    assert auth_cache.get_user(db_session, user_id).data_version == 1
+
+
+def test_current_user_data_version_not_cached(client, test_user, db_session):
+    """测试其他进程递增数据版本（本进程快照未失效）后，结果缓存和 ETag 随之更新"""
+    auth_headers = get_auth_headers(test_user)
+    db_session.add(Category(name="餐饮", type=CategoryType.EXPENSE, user_id=test_user.id))
+    db_session.commit()
+    
+    response = client.get("/api/v1/categories", headers=auth_headers)
+    assert response.status_code == 200
+    etag = response.headers.get("ETag")
+    assert len(response.json()["categories"]) == 1
+    
+    # 模拟另一个工作进程写入：直接改库，不经过本进程的会话钩子，快照保持不变
+    with test_engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO categories (name, type, level, sort_order, is_system, is_active, user_id, created_at) "
+            "VALUES ('交通', 'EXPENSE', 'PRIMARY', 0, 0, 1, ?, CURRENT_TIMESTAMP)",
+            (test_user.id,)
+        )
+        conn.exec_driver_sql("UPDATE users SET data_version = data_version + 1 WHERE id = ?", (test_user.id,))
+    db_session.expunge_all()
+    
+    headers = dict(auth_headers)
+    if etag:
+        headers["If-None-Match"] = etag
+    response = client.get("/api/v1/categories", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()["categories"]) == 2
+    assert response.headers.get("ETag") != etag
+
+
+def test_current_user_cache_invalidated_on_profile_update(client, test_user, db_session):
+    """测试修改资料、停用账号后缓存快照失效"""
+    auth_headers = get_auth_headers(test_user)
+    client.get("/api/v1/users/profile", headers=auth_headers)
+    
+    response = client.put("/api/v1/users/profile", headers=auth_headers, json={"username": "renamed"})
+    assert response.status_code == 200
+    db_session.expunge_all()
+    assert client.get("/api/v1/users/profile", headers=auth_headers).json()["username"] == "renamed"
+    
+    response = client.put("/api/v1/users/profile", headers=auth_headers, json={"is_active": False})
+    assert response.status_code == 200
+    db_session.expunge_all()
+    response = client.get("/api/v1/users/profile", headers=auth_headers)
+    assert response.status_code == 403
+
+
+def test_current_user_stale_snapshot_not_cached(client, test_user, db_session):
+    """测试读取用户期间有提交（使快照失效）时，不写回读到的旧快照"""
+    from app.auth.jwt import _load_user
+    user_id = test_user.id
+    db_session.expunge_all()
+    
+    def commit_during_select(conn, cursor, statement, parameters, context, executemany):
+        if "FROM users" in statement:
+            # 模拟异步会话查询让出事件循环时，另一个请求提交写入并使快照失效
+            auth_cache.invalidate([user_id])
+    
+    event.listen(test_engine, "before_cursor_execute", commit_during_select)
+    try:
+        assert _load_user(db_session, user_id).id == user_id
+    finally:
+        event.remove(test_engine, "before_cursor_execute", commit_during_select)
+    db_session.expunge_all()
+    assert auth_cache.get_user(db_session, user_id) is None
+    
+    # 没有并发提交时正常写回
+    _load_user(db_session, user_id)
+    db_session.expunge_all()
+    assert auth_cache.get_user(db_session, user_id).id == user_id
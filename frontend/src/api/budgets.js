@@ -29,6 +29,79 @@ export const budgets = {
   // 获取超支提醒
   async getAlerts() {
     return await client.get('/budgets/alerts')
+  },
+
+  // 订阅超支提醒推送（SSE），返回取消订阅函数
+  // EventSource 无法携带 Authorization 头，这里用 fetch 读取事件流。
+  // 连接断开或失败时按指数退避（1 秒起，最长 30 秒）重连，重连成功后调用 onReconnect 补取断开期间的提醒；
+  // 令牌失效（401 / 403）时不再重连
+  subscribeAlerts(onAlert, onReconnect) {
+    const controller = new AbortController()
+    const minDelay = 1000
+    const maxDelay = 30000
+    let delay = minDelay
+    let connected = false
+
+    const wait = (ms) => new Promise((resolve) => {
+      const timer = setTimeout(resolve, ms)
+      controller.signal.addEventListener('abort', () => {
+        clearTimeout(timer)
+        resolve()
+      }, { once: true })
+    })
+
+    const connect = async () => {
+      const token = localStorage.getItem('token')
+      const response = await fetch(`${client.defaults.baseURL}/budgets/alerts/stream`, {
+        headers: token ? { Authorization: `Bearer ${token}` } : {},
+        signal: controller.signal
+      })
+      if (response.status === 401 || response.status === 403) return false
+      if (!response.ok || !response.body) return true
+
+      delay = minDelay
+      if (connected && onReconnect) onReconnect()
+      connected = true
+
+      const reader = response.body.pipeThrough(new TextDecoderStream()).getReader()
+      let buffer = ''
+      while (true) {
+        const { value, done } = await reader.read()
+        if (done) break
+        buffer += value
+        let index
+        while ((index = buffer.indexOf('\n\n')) >= 0) {
+          const message = buffer.slice(0, index)
+          buffer = buffer.slice(index + 2)
+          const data = message
+            .split('\n')
+            .filter((line) => line.startsWith('data: '))
+            .map((line) => line.slice(6))
+            .join('\n')
+          if (data) onAlert(JSON.parse(data))
+        }
+      }
+      return true
+    }
+
+    const run = async () => {
+      while (!controller.signal.aborted) {
+        let retry = true
+        try {
+          retry = await connect()
+        } catch (error) {
+          if (error.name === 'AbortError') return
+          console.error('超支提醒推送连接失败', error)
+        }
+        if (!retry || controller.signal.aborted) return
+        // 加入随机抖动，避免服务重启后所有客户端同时重连
+        await wait(delay / 2 + Math.random() * delay / 2)
+        delay = Math.min(delay * 2, maxDelay)
+      }
+    }
+
+    run()
+    return () => controller.abort()
   }
 }
 
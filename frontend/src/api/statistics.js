@@ -11,6 +11,11 @@ export const statistics = {
     return await client.get('/statistics/monthly', { params: { year, month } })
   },
 
+  // 获取收支时间序列（bucket: day/week/month/year）
+  async getSeries(params = {}) {
+    return await client.get('/statistics/series', { params })
+  },
+
   // 获取时间段统计
   async getRange(date_from, date_to) {
     return await client.get('/statistics/range', { params: { date_from, date_to } })